@@ -14,8 +14,43 @@ def create_app():
 
     app.config.from_object(Config)
 
+    # 结构化日志（异步写入JSON Lines文件）
+    from app.structured_log import configure_logging
+    configure_logging(app)
+
+    # 各阶段耗时（Server-Timing响应头）、采样性能分析和内存跟踪
+    from app.instrumentation import init_instrumentation
+    from app.profiling import init_profiling
+    from app.memory_tracking import init_memory_tracking
+    init_instrumentation(app)
+    init_profiling(app)
+    init_memory_tracking(app)
+
+    # 静态资源清单（指纹URL）和构建命令
+    from app.assets import init_assets
+    init_assets(app)
+
+    # 生成结果存储
+    from app.result_store import init_result_store
+    init_result_store(app)
+
+    # 高开销请求的准入控制
+    from app.admission import init_admission
+    init_admission(app)
+
     # 注册路由
     from app.routes import main
     app.register_blueprint(main)
 
+    # 异步批量生成任务队列
+    from app.jobs import init_jobs
+    init_jobs(app)
+
+    # 预热配置生成器：在处理请求（以及预分叉服务器fork worker）之前加载并编译全部模板
+    from app.template_engine import get_shared_generator
+    get_shared_generator(
+        template_dir=app.config.get('TEMPLATE_DIR'),
+        supported_vendors=app.config.get('SUPPORTED_VENDORS')
+    )
+
     return app
@@ -0,0 +1,37 @@
+"""
+管理接口鉴权模块
+配置了 ADMIN_TOKEN 时需在请求头 X-Admin-Token 中提供相同的令牌（不接受查询参数，避免令牌写入访问日志和Referer）；
+未配置时默认拒绝，只有显式开启 ADMIN_ALLOW_LOCAL 后才允许本机回环地址访问
+"""
+
+import hmac
+import ipaddress
+import functools
+
+from flask import current_app, request, jsonify
+
+def _is_loopback(address: str) -> bool:
+    try:
+        return ipaddress.ip_address(address or '').is_loopback
+    except ValueError:
+        return False
+
+def is_admin_request() -> bool:
+    """检查当前请求是否具有管理权限"""
+    token = current_app.config.get('ADMIN_TOKEN')
+    if not token:
+        return bool(current_app.config.get('ADMIN_ALLOW_LOCAL')) and _is_loopback(request.remote_addr)
+    provided = request.headers.get('X-Admin-Token') or ''
+    return hmac.compare_digest(provided.encode('utf-8'), token.encode('utf-8'))
+
+def admin_required(view):
+    """视图装饰器：无管理权限时返回403"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin_request():
+            return jsonify({
+                'success': False,
+                'error': '需要管理权限'
+            }), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,181 @@
+"""
+准入控制模块
+渲染前估算请求的开销（展开后的端口数、VLAN数等，只计算不展开），
+高开销请求进入单独的有界队列并限制并发，队列已满时直接拒绝（429），
+避免少数大请求占满工作线程、拖慢其他用户的普通请求
+"""
+
+import threading
+from typing import Any, Dict
+
+from flask import current_app
+
+# 按端口范围展开的参数
+PORT_FIELDS = (
+    'interface',
+    'interfaces',
+    'edge_port_interface',
+    'root_protection_interface',
+    'loop_protection_interface',
+    'interface_name',
+    'interface_auth_interface'
+)
+
+# 按VLAN列表展开的参数
+VLAN_FIELDS = ('vlan_id',)
+
+class AdmissionRejected(Exception):
+    """高开销请求队列已满，请求被拒绝"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _count_vlans(vlan_str: str) -> int:
+    """统计VLAN列表中的VLAN数量（只计算不展开）"""
+    count = 0
+    for part in vlan_str.split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = part.split('-', 1)
+            count += max(int(end) - int(start) + 1, 0)
+        elif part:
+            count += 1
+    return count
+
+def estimate_cost(config_type: str, parameters: Dict[str, Any]) -> int:
+    """估算一次生成的开销，单位约等于模板中需要展开的循环次数
+
+    端口数按范围语法直接计算，不展开端口列表（展开只在之后的智能处理中进行一次）；
+    格式错误的参数不计入开销，交给后续的参数验证处理。
+    """
+    from app.routes import count_ports
+
+    cost = 1
+    for field in PORT_FIELDS:
+        value = parameters.get(field)
+        if isinstance(value, str) and value.strip():
+            cost += count_ports(value)
+
+    for field in VLAN_FIELDS:
+        value = parameters.get(field)
+        if isinstance(value, str) and value.strip():
+            try:
+                cost += _count_vlans(value)
+            except ValueError:
+                pass
+
+    # 路由条目、地址池等列表参数
+    for value in parameters.values():
+        if isinstance(value, list):
+            cost += len(value)
+
+    return cost
+
+class AdmissionTicket:
+    """准入许可，使用完毕后释放（可重复调用release）"""
+
+    def __init__(self, controller: 'AdmissionController' = None):
+        self._controller = controller
+
+    def release(self):
+        if self._controller is not None:
+            controller, self._controller = self._controller, None
+            controller._slots.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+class AdmissionController:
+    """高开销请求的并发限制和有界等待队列（每个进程独立计数）"""
+
+    def __init__(self, cost_threshold: int = 500, max_concurrent: int = 1,
+                 max_queue: int = 2, queue_timeout: float = 10.0, retry_after: int = 5):
+        self.cost_threshold = cost_threshold
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+        self.admitted = 0
+        self.rejected = 0
+
+    def is_expensive(self, cost: int) -> bool:
+        """判断是否为高开销请求"""
+        return cost >= self.cost_threshold
+
+    def admit(self, cost: int) -> AdmissionTicket:
+        """申请执行许可；普通请求直接放行，高开销请求排队，排队已满或等待超时时抛出 AdmissionRejected"""
+        if not self.is_expensive(cost):
+            return AdmissionTicket()
+
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected('服务器正忙，大批量配置请求过多，请稍后重试', self.retry_after)
+            self._waiting += 1
+
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise AdmissionRejected('服务器正忙，大批量配置请求等待超时，请稍后重试', self.retry_after)
+
+        with self._lock:
+            self.admitted += 1
+        return AdmissionTicket(self)
+
+    def stats(self) -> Dict[str, int]:
+        """获取准入统计信息"""
+        with self._lock:
+            return {
+                'waiting': self._waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'cost_threshold': self.cost_threshold,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue
+            }
+
+def queue_limit(threads: int, max_concurrent: int) -> int:
+    """在 threads 个处理线程中，高开销请求最多可排队的数量
+
+    排队的请求阻塞在处理线程中，执行和排队的高开销请求合计少于线程数，至少留一个线程处理普通请求。
+    """
+    return threads - max_concurrent - 1
+
+def init_admission(app):
+    """根据应用配置创建准入控制器；高开销请求可能占满全部处理线程时启动报错"""
+    threads = app.config.get('SERVER_THREADS', 4)
+    max_concurrent = app.config.get('ADMISSION_MAX_CONCURRENT', 1)
+    limit = queue_limit(threads, max_concurrent)
+    max_queue = app.config.get('ADMISSION_MAX_QUEUE')
+    if max_queue is None:
+        max_queue = limit
+    if limit < 0 or max_queue > limit:
+        raise ValueError(f'ADMISSION_MAX_CONCURRENT（{max_concurrent}）与 ADMISSION_MAX_QUEUE（{max_queue}）之和'
+                         f'必须小于 SERVER_THREADS（{threads}），否则高开销请求会占满全部处理线程')
+
+    app.extensions['admission'] = AdmissionController(
+        cost_threshold=app.config.get('ADMISSION_COST_THRESHOLD', 500),
+        max_concurrent=max_concurrent,
+        max_queue=max_queue,
+        queue_timeout=app.config.get('ADMISSION_QUEUE_TIMEOUT', 10.0),
+        retry_after=app.config.get('ADMISSION_RETRY_AFTER', 5)
+    )
+
+def get_admission() -> AdmissionController:
+    """获取当前应用的准入控制器"""
+    return current_app.extensions['admission']
@@ -0,0 +1,128 @@
+"""
+批量配置归档模块
+将多台设备的生成结果边渲染边写入zip流，内存占用与设备数量无关
+"""
+
+import io
+import json
+import zipfile
+import hashlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+from app.utils import sanitize_filename, format_timestamp
+
+class _ChunkBuffer(io.RawIOBase):
+    """只追加的写缓冲区，供ZipFile按流式（不可seek）模式写入"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        """取出并清空已写入的数据"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _unique_name(name: str, used: set) -> str:
+    """生成不重复的名称，重名时追加序号"""
+    candidate = name
+    counter = 2
+    while candidate in used:
+        candidate = f"{name}_{counter}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+def _write_file(archive: zipfile.ZipFile, filename: str, commands: List[str]) -> Dict[str, Any]:
+    """写入一个配置文件，返回清单中的文件信息"""
+    content = '\n'.join(commands) + '\n'
+    archive.writestr(filename, content)
+    return {
+        'path': filename,
+        'lines': len(commands),
+        'sha256': hashlib.sha256(content.encode('utf-8')).hexdigest()
+    }
+
+def iter_device_archive(devices: Iterable[Dict[str, Any]],
+                        render_section: Callable[[str, str, Dict[str, Any]], Dict[str, Any]],
+                        merge_sections: bool = False) -> Iterator[bytes]:
+    """逐台设备渲染并输出zip数据块
+
+    每渲染完一个配置段就把对应的压缩数据交给调用方写出；
+    merge_sections 为True时，每台设备的全部配置段合并为一个文件（每个视图只进入一次），渲染完该设备后写出。
+    zip末尾附带 manifest.json，记录每个文件的来源、行数、哈希和失败原因。
+    """
+    buffer = _ChunkBuffer()
+    manifest_devices: List[Dict[str, Any]] = []
+    used_dirs = set()
+
+    archive = zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED)
+    for device in devices:
+        device_dir = _unique_name(sanitize_filename(device['name']), used_dirs)
+        used_files = set()
+        device_entry = {
+            'name': device['name'],
+            'vendor': device['vendor'],
+            'directory': device_dir,
+            'files': [],
+            'errors': []
+        }
+
+        merged: List[List[str]] = []
+        merged_types: List[str] = []
+        for section in device['sections']:
+            config_type = section['config_type']
+            try:
+                result = render_section(device['vendor'], config_type, section['parameters'])
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+
+            if result.get('success') and merge_sections:
+                merged.append(result['commands'])
+                merged_types.append(config_type)
+            elif result.get('success'):
+                filename = f"{device_dir}/{_unique_name(sanitize_filename(config_type), used_files)}.txt"
+                device_entry['files'].append({'config_type': config_type,
+                                              **_write_file(archive, filename, result['commands'])})
+            else:
+                device_entry['errors'].append({
+                    'config_type': config_type,
+                    'error': result.get('error', ''),
+                    'details': result.get('details', [])
+                })
+
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+
+        if merged:
+            from app.section_merge import merge_sections as merge
+            device_entry['files'].append({
+                'config_type': 'merged',
+                'config_types': merged_types,
+                **_write_file(archive, f"{device_dir}/merged.txt", merge(device['vendor'], merged))
+            })
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+
+        manifest_devices.append(device_entry)
+
+    manifest = {
+        'generated_at': format_timestamp(),
+        'device_count': len(manifest_devices),
+        'file_count': sum(len(entry['files']) for entry in manifest_devices),
+        'error_count': sum(len(entry['errors']) for entry in manifest_devices),
+        'devices': manifest_devices
+    }
+    archive.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+    archive.close()
+    yield buffer.drain()
@@ -0,0 +1,171 @@
+"""
+静态资源处理模块
+构建时为静态文件生成带内容指纹的副本及gzip/brotli预压缩版本，
+运行时通过清单解析资源URL，并缓存渲染好的页面
+"""
+
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+from flask import current_app, url_for
+
+from app.metrics import CACHE_LOOKUPS
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只生成gzip版本
+    brotli = None
+
+# 构建产物所在的子目录（位于static目录下）
+DIST_DIRNAME = 'dist'
+MANIFEST_FILENAME = 'manifest.json'
+
+# 需要预压缩的文本类资源
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.html', '.json', '.txt', '.map'}
+
+# 指纹文件内容永不变化，可以长期缓存
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+def _fingerprint(data: bytes) -> str:
+    """计算文件内容指纹"""
+    return hashlib.sha256(data).hexdigest()[:10]
+
+def _fingerprinted_name(relpath: str, digest: str) -> str:
+    """在文件名与扩展名之间插入指纹，如 js/main.js -> js/main.1a2b3c4d5e.js"""
+    base, ext = os.path.splitext(relpath)
+    return f"{base}.{digest}{ext}"
+
+def compress_variants(data: bytes) -> Dict[str, bytes]:
+    """生成预压缩版本，返回 {编码: 压缩后内容}"""
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return variants
+
+def build_assets(static_folder: str) -> Dict[str, str]:
+    """构建静态资源：生成指纹文件、预压缩文件和清单，返回清单内容"""
+    dist_folder = os.path.join(static_folder, DIST_DIRNAME)
+    if os.path.isdir(dist_folder):
+        shutil.rmtree(dist_folder)
+    os.makedirs(dist_folder)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        # 跳过构建产物目录本身
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_folder]
+        for filename in sorted(files):
+            source_path = os.path.join(root, filename)
+            relpath = os.path.relpath(source_path, static_folder).replace(os.sep, '/')
+            with open(source_path, 'rb') as f:
+                data = f.read()
+
+            target_relpath = _fingerprinted_name(relpath, _fingerprint(data))
+            target_path = os.path.join(dist_folder, target_relpath)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with open(target_path, 'wb') as f:
+                f.write(data)
+
+            if os.path.splitext(filename)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                for encoding, compressed in compress_variants(data).items():
+                    suffix = '.gz' if encoding == 'gzip' else '.br'
+                    with open(target_path + suffix, 'wb') as f:
+                        f.write(compressed)
+
+            manifest[relpath] = target_relpath
+
+    with open(os.path.join(dist_folder, MANIFEST_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    return manifest
+
+def load_manifest(static_folder: str) -> Dict[str, str]:
+    """加载资源清单，尚未构建时返回空清单"""
+    manifest_path = os.path.join(static_folder, DIST_DIRNAME, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"加载资源清单 {manifest_path} 失败: {e}")
+        return {}
+
+def asset_url(filename: str) -> str:
+    """获取静态资源URL，已构建时返回带指纹的地址"""
+    manifest = current_app.extensions.get('asset_manifest', {})
+    fingerprinted = manifest.get(filename)
+    if fingerprinted:
+        return url_for('main.asset_file', filename=fingerprinted)
+    return url_for('static', filename=filename)
+
+def select_variant(path: str, accept_encodings) -> Tuple[str, Optional[str]]:
+    """根据客户端支持的编码选择预压缩文件，返回 (文件路径, Content-Encoding)"""
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in accept_encodings and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+def init_assets(app):
+    """加载资源清单并注册模板函数和构建命令"""
+    manifest = load_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+    app.extensions['asset_version'] = _fingerprint(json.dumps(manifest, sort_keys=True).encode('utf-8'))
+    app.add_template_global(asset_url)
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """为静态资源生成指纹文件和gzip/brotli预压缩版本"""
+        manifest = build_assets(app.static_folder)
+        print(f"已构建 {len(manifest)} 个静态资源，brotli: {'已启用' if brotli else '未安装'}")
+
+class CachedPage:
+    """渲染完成的页面及其预压缩版本"""
+
+    def __init__(self, html: str):
+        self.body = html.encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:16]
+        self.variants = compress_variants(self.body)
+
+    def make_response(self, request):
+        """按客户端支持的编码返回页面，ETag未变化时返回304"""
+        encoding = None
+        for candidate in ('br', 'gzip'):
+            if candidate in self.variants and candidate in request.accept_encodings:
+                encoding = candidate
+                break
+
+        body = self.variants[encoding] if encoding else self.body
+        response = current_app.response_class(body, mimetype='text/html')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(f"{self.etag}-{encoding}" if encoding else self.etag)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+class PageCache:
+    """按模板版本缓存渲染好的页面，模板或资源变化后自动使用新版本"""
+
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        """获取缓存页面，不存在时调用 render() 渲染一次"""
+        page = self._pages.get(key)
+        if page is None:
+            with self._lock:
+                page = self._pages.get(key)
+                if page is None:
+                    CACHE_LOOKUPS.inc('index_page', 'miss')
+                    page = CachedPage(render())
+                    # 只保留当前版本，旧版本页面直接丢弃
+                    self._pages = {key: page}
+                    return page
+        CACHE_LOOKUPS.inc('index_page', 'hit')
+        return page
@@ -0,0 +1,337 @@
+"""
+离线批量生成模块
+不启动Web服务、不需要应用上下文，按设备清单多进程并行执行与线上相同的
+参数验证、智能输入处理和模板渲染，每台设备输出一个配置文件，并写出 manifest.json。
+供命令行工具（cli.py）在CI流水线中使用。
+
+增量生成：manifest.json 记录每台设备的输入哈希、各配置段处理后参数的哈希和所用命令模板的版本，
+以及模板到设备的反向索引。再次生成时：
+- 输入未变、所用模板未变的设备直接沿用上次的结果，不再分发给工作进程；
+- 模板变化时通过反向索引找出恰好受影响的设备；
+- 输入有变化的设备在工作进程中先计算处理后参数的哈希，与上次一致时同样跳过渲染；
+- 生成代码（参数处理、验证、模板引擎）变化或合并配置段的设置变化时全部重新生成。
+
+merge_sections 为True时，设备的多个配置段合并输出，每个视图只进入一次（见 app/section_merge.py）。
+"""
+
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.archive import _unique_name
+from app.utils import sanitize_filename, format_timestamp
+
+MANIFEST_NAME = 'manifest.json'
+
+# manifest.json 的格式版本，格式变化后旧清单不再用于增量判断
+MANIFEST_VERSION = 2
+
+# 每个任务包含的设备数，减少进程间通信次数
+DEFAULT_BATCH_SIZE = 64
+
+# 影响生成结果的代码文件，任一变化都需要全部重新生成
+ENGINE_SOURCES = ('routes.py', 'validators.py', 'template_engine.py', 'loop_stamping.py', 'section_merge.py',
+                  'command_tree.py', 'running_config.py', 'config_delta.py')
+
+# 设备状态
+DEVICE_GENERATED = 'generated'
+DEVICE_UNCHANGED = 'unchanged'
+
+# 工作进程内的渲染设置，由 _init_worker 初始化
+_worker_options: Dict[str, Any] = {}
+
+def _hash_json(payload: Any) -> str:
+    """规范化JSON（键排序）的哈希"""
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+def engine_version() -> str:
+    """生成代码的版本哈希"""
+    digest = hashlib.sha256()
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in ENGINE_SOURCES:
+        with open(os.path.join(app_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def template_key(vendor: str, config_type: str) -> str:
+    """反向索引中模板的键，如 huawei/stp_config"""
+    return f'{vendor}/{config_type}'
+
+def _init_worker(template_dir: Optional[str], supported_vendors: Optional[List[str]],
+                 section_timeout: Optional[float], merge_sections: bool = False):
+    """工作进程初始化：每个进程只加载并编译一次模板"""
+    _worker_options.update({
+        'template_dir': template_dir,
+        'supported_vendors': supported_vendors,
+        'section_timeout': section_timeout,
+        'merge_sections': merge_sections
+    })
+    _get_generator()
+
+def _get_generator():
+    from app.template_engine import get_shared_generator
+    return get_shared_generator(_worker_options.get('template_dir'), _worker_options.get('supported_vendors'))
+
+def render_device(device: Dict[str, Any]) -> Dict[str, Any]:
+    """渲染一台设备的全部配置段，返回 {'commands': [...], 'sections': [...], 'errors': [...]}"""
+    from app.deadline import deadline
+    from app.routes import run_generation
+
+    generator = _get_generator()
+    commands: List[str] = []
+    rendered: List[List[str]] = []
+    sections = []
+    errors = []
+    for section in device['sections']:
+        config_type = section['config_type']
+        try:
+            with deadline(_worker_options.get('section_timeout')):
+                result = run_generation(generator, device['vendor'], config_type, section['parameters'])
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+
+        if result.get('success'):
+            sections.append({
+                'config_type': config_type,
+                'lines': len(result['commands']),
+                'params_hash': _hash_json(result.get('parameters')),
+                'template_version': generator.get_command_version(device['vendor'], config_type)
+            })
+            rendered.append(result['commands'])
+        else:
+            errors.append({
+                'config_type': config_type,
+                'error': result.get('error', ''),
+                'details': result.get('details', [])
+            })
+
+    if _worker_options.get('merge_sections') and rendered:
+        from app.section_merge import merge_sections
+        commands = merge_sections(device['vendor'], rendered)
+    else:
+        for section_commands in rendered:
+            commands.extend(section_commands)
+    return {'commands': commands, 'sections': sections, 'errors': errors}
+
+def _section_fingerprints(device: Dict[str, Any]) -> Optional[List[List[Optional[str]]]]:
+    """只验证和处理参数、不渲染，得到各配置段的 [配置类型, 参数哈希, 模板版本]；任一段失败时返回None"""
+    from app.deadline import deadline
+    from app.routes import process_smart_inputs
+    from app.validators import validate_form_data
+
+    generator = _get_generator()
+    fingerprints = []
+    for section in device['sections']:
+        config_type = section['config_type']
+        try:
+            with deadline(_worker_options.get('section_timeout')):
+                is_valid, _ = validate_form_data(config_type, section['parameters'], device['vendor'])
+                if not is_valid:
+                    return None
+                processed = process_smart_inputs(config_type, device['vendor'], section['parameters'])
+        except Exception:
+            return None
+        fingerprints.append([config_type, _hash_json(processed),
+                             generator.get_command_version(device['vendor'], config_type)])
+    return fingerprints
+
+def _reusable(previous: Optional[Dict[str, Any]], path: str) -> bool:
+    """上次的结果是否可以沿用（全部配置段成功且输出文件仍在）"""
+    return (previous is not None and not previous.get('errors') and 'sha256' in previous
+            and os.path.isfile(path))
+
+def _render_batch(batch: List[Tuple[int, Tuple[Dict[str, Any], str, str, Optional[Dict[str, Any]]]]]
+                  ) -> List[Tuple[int, Dict[str, Any]]]:
+    """渲染一批设备并写出配置文件，只把 (清单顺序, 清单条目) 返回给主进程
+
+    附带上次清单条目的设备先比较处理后参数的哈希，与上次一致时沿用上次的结果。
+    """
+    entries = []
+    for order, (device, path, input_hash, previous) in batch:
+        if _reusable(previous, path):
+            previous_fingerprints = [[section['config_type'], section.get('params_hash'),
+                                      section.get('template_version')] for section in previous['sections']]
+            if _section_fingerprints(device) == previous_fingerprints:
+                entries.append((order, dict(previous, name=device['name'], input_hash=input_hash,
+                                            status=DEVICE_UNCHANGED)))
+                continue
+
+        rendered = render_device(device)
+        entry = {
+            'name': device['name'],
+            'vendor': device['vendor'],
+            'path': os.path.basename(path),
+            'input_hash': input_hash,
+            'status': DEVICE_GENERATED,
+            'sections': rendered['sections'],
+            'errors': rendered['errors']
+        }
+        if rendered['commands']:
+            content = '\n'.join(rendered['commands']) + '\n'
+            data = content.encode('utf-8')
+            with open(path, 'wb') as f:
+                f.write(data)
+            entry.update({
+                'lines': len(rendered['commands']),
+                'sha256': hashlib.sha256(data).hexdigest()
+            })
+        elif os.path.exists(path):
+            # 全部配置段失败，删除上次的输出，避免留下过期的配置
+            os.remove(path)
+        entries.append((order, entry))
+    return entries
+
+def load_manifest(output_dir: str) -> Optional[Dict[str, Any]]:
+    """读取输出目录中上次的清单，不存在、格式版本不同或已损坏时返回None"""
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('manifest_version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def build_template_index(entries: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """模板 -> 使用该模板的设备输出文件名（反向索引）"""
+    index: Dict[str, List[str]] = {}
+    for entry in entries:
+        for config_type in sorted({section['config_type'] for section in entry['sections']}):
+            index.setdefault(template_key(entry['vendor'], config_type), []).append(entry['path'])
+    return dict(sorted(index.items()))
+
+def affected_outputs(previous: Dict[str, Any],
+                     template_versions: Dict[str, Optional[str]]) -> Tuple[Set[str], List[str]]:
+    """通过反向索引找出模板变化后受影响的设备，返回 (输出文件名集合, 变化的模板)"""
+    old_versions = previous.get('template_versions', {})
+    index = previous.get('template_index', {})
+    changed = sorted(key for key in set(old_versions) | set(index)
+                     if old_versions.get(key) != template_versions.get(key))
+    outputs: Set[str] = set()
+    for key in changed:
+        outputs.update(index.get(key, []))
+    return outputs, changed
+
+def _iter_batches(devices: Iterable[Dict[str, Any]], output_dir: str, batch_size: int,
+                  previous_entries: Dict[str, Dict[str, Any]], affected: Optional[Set[str]],
+                  skipped: List[Tuple[int, Dict[str, Any]]]) -> Iterator[List]:
+    """按清单顺序在主进程中分配并去重输出文件名，再按批次切分（各进程并行写入不会冲突）
+
+    affected 不为None时，输入哈希未变且不受模板变化影响的设备直接沿用上次的条目（放入 skipped），不进入批次；
+    为None时（非增量或需要全部重新生成）不把上次的条目交给工作进程。
+    """
+    used = set()
+    batch = []
+    for order, device in enumerate(devices):
+        filename = _unique_name(sanitize_filename(device['name']), used) + '.txt'
+        path = os.path.join(output_dir, filename)
+        input_hash = _hash_json([device['vendor'], device['sections']])
+        previous = previous_entries.get(filename) if affected is not None else None
+
+        if (affected is not None and filename not in affected and _reusable(previous, path)
+                and previous.get('input_hash') == input_hash):
+            skipped.append((order, dict(previous, status=DEVICE_UNCHANGED)))
+            continue
+
+        batch.append((order, (device, path, input_hash, previous)))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_batch_results(pool: ProcessPoolExecutor, func: Callable[[Any], Any], batches: Iterable[Any],
+                       max_pending: int) -> Iterator[Any]:
+    """按批次提交任务并按完成顺序产出结果，在途批次数有上限（批次来自流式读取时内存占用与总数无关）"""
+    pending = set()
+    for batch in batches:
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(pool.submit(func, batch))
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+def generate_inventory(devices: Iterable[Dict[str, Any]], output_dir: str, jobs: Optional[int] = None,
+                       template_dir: Optional[str] = None, supported_vendors: Optional[List[str]] = None,
+                       section_timeout: Optional[float] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                       incremental: bool = False, merge_sections: bool = False,
+                       progress=None) -> Dict[str, Any]:
+    """多进程批量生成，返回写入 manifest.json 的清单
+
+    设备按批次提交，同时在途的批次数有上限，清单按流式读取时内存占用与设备总数无关。
+    incremental 为True时按上次的清单跳过未变化的设备（见模块说明），并删除已不在清单中的设备的输出。
+    progress(已处理设备数) 在每批完成时调用。
+    """
+    from app.template_engine import ConfigGenerator
+
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = jobs or os.cpu_count() or 1
+
+    # 主进程只读取命令模板的版本，不参与渲染
+    engine = ConfigGenerator(template_dir, supported_vendors).template_engine
+    template_versions = {template_key(vendor, config_type): version
+                         for (vendor, config_type), version in engine.command_versions.items()}
+    current_engine = engine_version()
+
+    previous = load_manifest(output_dir) if incremental else None
+    previous_entries: Dict[str, Dict[str, Any]] = {}
+    affected: Optional[Set[str]] = None
+    changed_templates: List[str] = []
+    if previous is not None:
+        previous_entries = {entry['path']: entry for entry in previous.get('devices', []) if entry.get('path')}
+        if (previous.get('engine_version') == current_engine
+                and bool(previous.get('merge_sections')) == merge_sections):
+            affected, changed_templates = affected_outputs(previous, template_versions)
+
+    results: List[Tuple[int, Dict[str, Any]]] = []
+    skipped: List[Tuple[int, Dict[str, Any]]] = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(template_dir, supported_vendors, section_timeout, merge_sections)) as pool:
+        batches = _iter_batches(devices, output_dir, batch_size, previous_entries, affected, skipped)
+        for batch_results in iter_batch_results(pool, _render_batch, batches, jobs * 2):
+            results.extend(batch_results)
+            if progress is not None:
+                progress(len(results) + len(skipped))
+
+    entries = [entry for _, entry in sorted(results + skipped, key=lambda item: item[0])]
+
+    # 已不在清单中的设备，删除其输出
+    removed = []
+    if previous is not None:
+        current_paths = {entry['path'] for entry in entries}
+        for path in previous_entries:
+            if path not in current_paths:
+                try:
+                    os.remove(os.path.join(output_dir, path))
+                except OSError:
+                    pass
+                removed.append(path)
+
+    used_templates = {template_key(entry['vendor'], section['config_type'])
+                      for entry in entries for section in entry['sections']}
+    manifest = {
+        'manifest_version': MANIFEST_VERSION,
+        'generated_at': format_timestamp(),
+        'engine_version': current_engine,
+        'merge_sections': merge_sections,
+        'device_count': len(entries),
+        'file_count': sum(1 for entry in entries if 'sha256' in entry),
+        'error_count': sum(len(entry['errors']) for entry in entries),
+        'generated_count': sum(1 for entry in entries if entry['status'] == DEVICE_GENERATED),
+        'unchanged_count': sum(1 for entry in entries if entry['status'] == DEVICE_UNCHANGED),
+        'removed': sorted(removed),
+        'changed_templates': changed_templates,
+        'template_versions': {key: template_versions.get(key) for key in sorted(used_templates)},
+        'template_index': build_template_index(entries),
+        'devices': entries
+    }
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
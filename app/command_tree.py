@@ -0,0 +1,306 @@
+"""
+命令树模块
+把配置命令组织为层级结构：每个节点是一条命令，子节点是进入该命令视图后执行的命令。
+
+- 节点使用 __slots__，命令文本和键经 sys.intern 驻留，大量重复的命令（如 undo shutdown）只保存一份；
+- 每个节点按键索引子节点，查找视图和合并重复视图都是O(1)；
+- 同一视图下键相同的命令合并为一个节点，保持首次出现的顺序。
+"""
+
+import re
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Tuple
+
+# 构建模式：keyword 按进入/退出视图的命令划分层级（生成的配置、未缩进的配置），
+# indent 按行首缩进划分层级（设备导出的运行配置）
+MODE_KEYWORD = 'keyword'
+MODE_INDENT = 'indent'
+BUILD_MODES = (MODE_KEYWORD, MODE_INDENT)
+
+def command_key(text: str) -> str:
+    """命令的索引键：合并多余空白；接口名忽略大小写和类型与编号间的空格（Vlanif 100 与 Vlanif100 视为同一接口）"""
+    parts = text.split()
+    if len(parts) >= 2 and parts[0] == 'interface':
+        return sys.intern('interface ' + ''.join(parts[1:]).lower())
+    return sys.intern(' '.join(parts))
+
+class CommandNode:
+    """命令树节点，根节点的命令文本为空"""
+
+    __slots__ = ('text', 'key', 'children', '_index')
+
+    def __init__(self, text: str = '', key: Optional[str] = None):
+        self.text = sys.intern(text)
+        self.key = command_key(text) if key is None else key
+        self.children: List['CommandNode'] = []
+        # 子节点索引在添加第一个子节点时创建，叶子节点不占用字典
+        self._index: Optional[Dict[str, 'CommandNode']] = None
+
+    def add(self, text: str, key: Optional[str] = None) -> 'CommandNode':
+        """添加子命令并返回其节点；键相同的子命令已存在时返回已有节点（视图合并、重复命令去重）"""
+        if key is None:
+            key = command_key(text)
+        index = self._index
+        if index is None:
+            index = self._index = {}
+        node = index.get(key)
+        if node is None:
+            node = CommandNode(text, key)
+            index[key] = node
+            self.children.append(node)
+        return node
+
+    def append(self, text: str, key: Optional[str] = None) -> 'CommandNode':
+        """总是追加新的子节点（保留重复进入的视图和命令的原始顺序），索引指向第一次出现的节点"""
+        if key is None:
+            key = command_key(text)
+        node = CommandNode(text, key)
+        if self._index is None:
+            self._index = {}
+        self._index.setdefault(key, node)
+        self.children.append(node)
+        return node
+
+    def get(self, key: str) -> Optional['CommandNode']:
+        """按键查找子节点"""
+        return self._index.get(key) if self._index else None
+
+    def find(self, text: str) -> Optional['CommandNode']:
+        """按命令文本查找子节点"""
+        return self.get(command_key(text))
+
+    def merge(self, other: 'CommandNode') -> 'CommandNode':
+        """把另一棵树的子节点并入本节点（同键视图递归合并）"""
+        for child in other.children:
+            node = self.add(child.text, child.key)
+            if child.children:
+                node.merge(child)
+        return self
+
+    @property
+    def is_block(self) -> bool:
+        return bool(self.children)
+
+    def __iter__(self) -> Iterator['CommandNode']:
+        return iter(self.children)
+
+    def __len__(self) -> int:
+        return len(self.children)
+
+    def __contains__(self, key: str) -> bool:
+        return bool(self._index) and key in self._index
+
+    def __repr__(self) -> str:
+        return f'CommandNode({self.text!r}, children={len(self.children)})'
+
+    def walk(self) -> Iterator[Tuple[int, 'CommandNode']]:
+        """深度优先遍历所有子孙节点，返回 (深度, 节点)，根的子节点深度为0"""
+        stack = [(0, iter(self.children))]
+        while stack:
+            depth, children = stack[-1]
+            node = next(children, None)
+            if node is None:
+                stack.pop()
+                continue
+            yield depth, node
+            if node.children:
+                stack.append((depth + 1, iter(node.children)))
+
+    def count(self) -> int:
+        """子孙节点总数"""
+        return sum(1 for _ in self.walk())
+
+    def to_lines(self, indent: str = ' ', exit_command: Optional[str] = None,
+                 opens_context: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """输出为命令行，子命令按层级缩进；指定 exit_command 时在每个视图末尾追加退出命令
+
+        opens_context 判断第一层的命令是否进入视图，进入视图但没有子命令时（如只创建VLAN）同样需要退出。
+        """
+        lines = []
+
+        def emit(node: 'CommandNode', depth: int):
+            for child in node.children:
+                lines.append(indent * depth + child.text)
+                if child.children:
+                    emit(child, depth + 1)
+                elif depth > 0 or opens_context is None or not opens_context(child.text):
+                    continue
+                if exit_command:
+                    lines.append(indent * (depth + 1) + exit_command)
+
+        emit(self, 0)
+        return lines
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为 {'command': 命令, 'children': [...]}，叶子节点不含 children"""
+        data: Dict[str, Any] = {'command': self.text}
+        if self.children:
+            data['children'] = [child.to_dict() for child in self.children]
+        return data
+
+class Dialect:
+    """厂商配置方言：描述如何划分命令所在的视图"""
+
+    def __init__(self, name: str, separators: Iterable[str], exit_commands: Iterable[str],
+                 root_commands: Iterable[str], ignored_commands: Iterable[str], block_openers: Iterable[str],
+                 nested_openers: Optional[Dict[str, Iterable[str]]] = None, comment_prefixes: Tuple[str, ...] = ('#',),
+                 banners: bool = False):
+        self.name = name
+        # 单独一行的分隔符（华为/H3C 的 #，思科/锐捷的 !）
+        self.separators = frozenset(separators)
+        # 退出当前视图的命令
+        self.exit_commands = frozenset(exit_commands)
+        # 直接回到系统视图的命令
+        self.root_commands = frozenset(root_commands)
+        # 不属于配置内容的命令（进入系统视图、保存配置等）
+        self.ignored_commands = frozenset(ignored_commands)
+        # 注释前缀，生成的配置用 # 开头的行作说明
+        self.comment_prefixes = comment_prefixes
+        # 在系统视图下进入新视图的命令
+        self.block_openers: Pattern = re.compile('|'.join(f'(?:{pattern})' for pattern in block_openers))
+        # 在某个视图（按其首个单词）内进入子视图的命令，如 ospf 视图下的 area
+        self.nested_openers: Dict[str, Pattern] = {
+            word: re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+            for word, patterns in (nested_openers or {}).items()
+        }
+        # 是否处理 banner motd ^C ... ^C 这类跨行文本
+        self.banners = banners
+
+    def opens_context(self, text: str) -> bool:
+        """系统视图下的命令是否进入新视图"""
+        return self.block_openers.match(text) is not None
+
+    def nested_pattern(self, node: CommandNode) -> Optional[Pattern]:
+        """视图节点下可进入子视图的命令"""
+        return self.nested_openers.get(node.key.split(' ', 1)[0]) if self.nested_openers else None
+
+_BANNER = re.compile(r'^banner\s+\S+\s+(\^C|\S)')
+
+class TreeBuilder:
+    """逐行构建命令树，内存占用只与树本身有关，与输入的读取方式无关
+
+    merge 为True时同一视图下键相同的命令合并为一个节点；为False时按原始顺序保留每一次出现。
+    keep_ignored 为True时进入系统视图、保存配置等命令作为系统视图下的叶子节点保留（默认丢弃）。
+    """
+
+    def __init__(self, dialect: Dialect, mode: str = MODE_KEYWORD, root: Optional[CommandNode] = None,
+                 merge: bool = True, keep_ignored: bool = False):
+        if mode not in BUILD_MODES:
+            raise ValueError(f"不支持的构建模式: {mode}")
+        self.dialect = dialect
+        self.mode = mode
+        self.root = root if root is not None else CommandNode()
+        self._add = CommandNode.add if merge else CommandNode.append
+        self.keep_ignored = keep_ignored
+        # keyword 模式：当前所在的视图链；indent 模式：(缩进, 节点) 链
+        self._stack: List[Any] = [self.root] if mode == MODE_KEYWORD else [(-1, self.root)]
+        self._banner: Optional[List[str]] = None
+        self._banner_delimiter = ''
+        self._banner_parent: Optional[CommandNode] = None
+        self.line_count = 0
+        # keyword 模式下在系统视图遇到的退出命令数：不为0说明有视图命令未被识别（方言缺少该视图的开始命令）
+        self.stray_exits = 0
+
+    def feed(self, line: str):
+        """处理一行配置"""
+        self.line_count += 1
+        if self._banner is not None:
+            self._feed_banner(line)
+            return
+
+        text = line.strip()
+        if not text:
+            return
+        dialect = self.dialect
+        if text in dialect.separators:
+            if self.mode == MODE_KEYWORD:
+                del self._stack[1:]
+            return
+        if text.startswith(dialect.comment_prefixes):
+            return
+        if text in dialect.root_commands:
+            del self._stack[1:]
+            return
+        if text in dialect.exit_commands:
+            if self.mode == MODE_KEYWORD:
+                if len(self._stack) > 1:
+                    self._stack.pop()
+                else:
+                    self.stray_exits += 1
+            return
+        if text in dialect.ignored_commands:
+            if self.keep_ignored:
+                del self._stack[1:]
+                self._add(self.root, text)
+            return
+
+        if self.mode == MODE_KEYWORD:
+            self._feed_keyword(text)
+        else:
+            self._feed_indent(line, text)
+
+    def _feed_keyword(self, text: str):
+        stack = self._stack
+        dialect = self.dialect
+        if dialect.block_openers.match(text):
+            # 系统视图下的视图命令，在其他视图中出现时隐式退回系统视图
+            del stack[1:]
+            stack.append(self._add(self.root, text))
+            return
+        if len(stack) > 1:
+            pattern = dialect.nested_pattern(stack[1])
+            if pattern is not None and pattern.match(text):
+                del stack[2:]
+                stack.append(self._add(stack[1], text))
+                return
+        node = self._add(stack[-1], text)
+        if dialect.banners and self._start_banner(text, stack[-1], node):
+            return
+
+    def _feed_indent(self, line: str, text: str):
+        stack = self._stack
+        depth = len(line) - len(line.lstrip(' \t'))
+        while stack[-1][0] >= depth:
+            stack.pop()
+        parent = stack[-1][1]
+        node = self._add(parent, text)
+        if self.dialect.banners and self._start_banner(text, parent, node):
+            return
+        stack.append((depth, node))
+
+    def _start_banner(self, text: str, parent: CommandNode, node: CommandNode) -> bool:
+        """banner 命令：文本在结束定界符之前都属于该命令"""
+        match = _BANNER.match(text) if text.startswith('banner') else None
+        if not match:
+            return False
+        delimiter = match.group(1)
+        if text.count(delimiter, match.start(1)) >= 2:
+            return False
+        # 先移除只含首行的节点，收齐全文后再以完整文本加入
+        parent.children.remove(node)
+        if parent._index.get(node.key) is node:
+            del parent._index[node.key]
+        self._banner = [text]
+        self._banner_delimiter = delimiter
+        self._banner_parent = parent
+        return True
+
+    def _feed_banner(self, line: str):
+        self._banner.append(line.rstrip('\r\n'))
+        if self._banner_delimiter in line:
+            self._add(self._banner_parent, '\n'.join(self._banner))
+            self._banner = None
+            self._banner_parent = None
+
+    def feed_lines(self, lines: Iterable[str]) -> CommandNode:
+        for line in lines:
+            self.feed(line)
+        return self.close()
+
+    def close(self) -> CommandNode:
+        """结束输入，返回根节点（未结束的 banner 按已读到的文本保存）"""
+        if self._banner is not None:
+            self._add(self._banner_parent, '\n'.join(self._banner))
+            self._banner = None
+            self._banner_parent = None
+        return self.root
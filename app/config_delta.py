@@ -0,0 +1,149 @@
+"""
+配置增量模块
+比较生成的配置与设备运行配置（均解析为命令树），只输出需要下发的命令：
+运行配置中缺少的命令，以及需要取消的命令（华为/H3C 用 undo，思科/锐捷用 no），按视图分组。
+
+- 生成的配置按关键字划分视图（与模板输出的进入/退出结构一致），运行配置按文件内容自动判断；
+- 比较时按生成配置的命令逐条查找运行配置的子节点索引，耗时与生成配置的规模成正比，与运行配置的大小无关；
+- 默认只补齐缺少的命令；replace 模式下，生成配置涉及的视图内多出的命令也会取消（系统视图下的命令不受影响）。
+  取消按运行配置中的顺序倒序进行，单值命令（见 SINGLE_VALUE_COMMANDS）的取消形式不带参数。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.command_tree import MODE_KEYWORD, CommandNode
+from app.running_config import get_dialect, parse_file, parse_lines
+
+# 各厂商的取消前缀、进入配置模式、退出视图、返回用户视图的命令
+VENDOR_SYNTAX = {
+    'huawei': ('undo', 'system-view', 'quit', 'return'),
+    'h3c': ('undo', 'system-view', 'quit', 'return'),
+    'cisco': ('no', 'configure terminal', 'exit', 'end'),
+    'ruijie': ('no', 'configure terminal', 'exit', 'end'),
+}
+
+# 单值命令：取消时只写命令本身、不带参数（如 undo port link-type），带参数的取消形式设备不接受或含义不同
+SINGLE_VALUE_COMMANDS = {
+    'undo': ('port link-type', 'port default vlan', 'description', 'stp edged-port', 'stp root-protection',
+             'stp loop-protection', 'shutdown'),
+    'no': ('switchport mode', 'switchport access vlan', 'switchport trunk native vlan', 'description',
+           'spanning-tree portfast', 'spanning-tree guard', 'shutdown'),
+}
+
+def _syntax(vendor: str) -> Tuple[str, str, str, str]:
+    get_dialect(vendor)
+    return VENDOR_SYNTAX[vendor]
+
+def _positive(text: str, negation: str) -> Optional[str]:
+    """取消命令对应的原命令，不是取消命令时返回None"""
+    if text.startswith(negation + ' '):
+        return text[len(negation) + 1:]
+    return None
+
+def _negate(text: str, negation: str) -> str:
+    """取消一条命令的写法：单值命令只取消命令本身，其他命令在原命令前加取消前缀"""
+    for command in SINGLE_VALUE_COMMANDS.get(negation, ()):
+        if text == command or text.startswith(command + ' '):
+            return f'{negation} {command}'
+    return f'{negation} {text}'
+
+def _diff_command(command: CommandNode, running: Optional[CommandNode], out: CommandNode,
+                  negation: str) -> Tuple[int, int]:
+    """比较一条不含子命令的命令，需要执行时写入 out，返回 (新增数, 取消数)"""
+    if running is not None and command.key in running:
+        return 0, 0
+    positive = _positive(command.text, negation)
+    if positive is None:
+        out.add(command.text, command.key)
+        return 1, 0
+    # 运行配置中不显示缺省（已取消）的命令，只有原命令存在时才需要取消
+    if running is None or running.find(positive) is None:
+        return 0, 0
+    out.add(command.text, command.key)
+    return 0, 1
+
+def _diff_block(desired: CommandNode, running: Optional[CommandNode], out: CommandNode,
+                negation: str, replace: bool) -> Tuple[int, int]:
+    """比较一个视图的子命令，把需要执行的命令写入 out，返回 (新增数, 取消数)"""
+    added = removed = 0
+
+    # 先取消多余的命令，避免与随后新增的命令冲突（如改变端口类型前先取消缺省VLAN）；
+    # 按配置顺序倒序取消，后配置的命令往往依赖先配置的命令（如 port trunk allow-pass 依赖 port link-type trunk）
+    if replace and running is not None:
+        for current in reversed(running.children):
+            if current.key in desired or _positive(current.text, negation) is not None:
+                continue
+            negated = _negate(current.text, negation)
+            if desired.find(negated) is not None or desired.find(f'{negation} {current.text}') is not None:
+                # 生成配置中显式取消了该命令，按取消命令处理
+                continue
+            out.add(negated)
+            removed += 1
+
+    for child in desired.children:
+        if not child.children:
+            counts = _diff_command(child, running, out, negation)
+        else:
+            counts = _diff_context(child, running, out, negation, replace)
+        added += counts[0]
+        removed += counts[1]
+    return added, removed
+
+def _diff_context(context: CommandNode, running: Optional[CommandNode], out: CommandNode,
+                  negation: str, replace: bool) -> Tuple[int, int]:
+    """比较一个视图，有变更时把视图及其中需要执行的命令写入 out"""
+    current = running.get(context.key) if running is not None else None
+    if current is None:
+        out.add(context.text, context.key).merge(context)
+        return context.count(), 0
+    block = CommandNode(context.text, context.key)
+    counts = _diff_block(context, current, block, negation, replace)
+    if block.children:
+        out.add(context.text, context.key).merge(block)
+    return counts
+
+def diff_trees(desired: CommandNode, running: CommandNode, vendor: str, replace: bool = False) -> Dict[str, Any]:
+    """比较两棵命令树，返回 {'tree': 增量命令树, 'sections': [...], 'added': n, 'removed': n}
+
+    sections 按生成配置中视图出现的顺序列出有变更的视图，系统视图下的命令归入 context 为空的一项。
+    系统视图本身不做 replace：生成的配置只是设备配置的一部分。
+    """
+    negation = _syntax(vendor)[0]
+    tree = CommandNode()
+    sections = []
+    global_added = global_removed = 0
+
+    for child in desired.children:
+        if not child.children:
+            added, removed = _diff_command(child, running, tree, negation)
+            global_added += added
+            global_removed += removed
+            continue
+        added, removed = _diff_context(child, running, tree, negation, replace)
+        if added or removed:
+            sections.append({'context': child.text, 'added': added, 'removed': removed})
+
+    if global_added or global_removed:
+        sections.insert(0, {'context': '', 'added': global_added, 'removed': global_removed})
+    return {
+        'tree': tree,
+        'sections': sections,
+        'added': sum(section['added'] for section in sections),
+        'removed': sum(section['removed'] for section in sections)
+    }
+
+def format_delta(tree: CommandNode, vendor: str) -> List[str]:
+    """把增量命令树整理为可直接下发的命令行（没有变更时返回空列表）"""
+    _, enter, leave_context, leave = _syntax(vendor)
+    if not tree.children:
+        return []
+    return [enter] + tree.to_lines(' ', leave_context, get_dialect(vendor).opens_context) + [leave]
+
+def compute_delta(generated: Iterable[str], running_path: str, vendor: str, replace: bool = False,
+                  running_mode: Optional[str] = None) -> Dict[str, Any]:
+    """比较生成的配置命令与运行配置文件，返回 diff_trees 的结果并附带 commands（待下发的命令行）"""
+    desired = parse_lines(generated, vendor, MODE_KEYWORD)
+    running = parse_file(running_path, vendor, running_mode)
+    delta = diff_trees(desired, running, vendor, replace)
+    delta['commands'] = format_delta(delta['tree'], vendor)
+    return delta
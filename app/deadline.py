@@ -0,0 +1,73 @@
+"""
+请求时间预算模块
+请求获准执行时设置截止时间，端口展开、参数验证、智能输入处理和模板渲染过程中主动检查，
+超时后抛出 DeadlineExceeded，立即结束本次生成并释放工作线程
+"""
+
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# 当前请求的截止时间（time.monotonic()），未设置时不限时
+_deadline: contextvars.ContextVar = contextvars.ContextVar('request_deadline', default=None)
+
+class DeadlineExceeded(Exception):
+    """超出请求时间预算"""
+
+    def __init__(self, stage: str = '', budget: float = None):
+        self.stage = stage
+        self.budget = budget
+        message = '配置生成超时'
+        if budget:
+            message += f'（超过 {budget:g} 秒）'
+        if stage:
+            message += f'，停止于: {stage}'
+        super().__init__(message)
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """在 with 块内设置时间预算；seconds 为空或不大于0时不限时，嵌套时取更早的截止时间"""
+    if not seconds or seconds <= 0:
+        yield
+        return
+
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None and current[0] < expires_at:
+        expires_at, seconds = current
+    token = _deadline.set((expires_at, seconds))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """剩余时间（秒），未设置预算时返回None"""
+    current = _deadline.get()
+    if current is None:
+        return None
+    return current[0] - time.monotonic()
+
+def require_remaining(stage: str = '') -> Optional[float]:
+    """剩余时间（秒，大于0），未设置预算时返回None；剩余时间不大于0时抛出 DeadlineExceeded，用于有超时的等待"""
+    current = _deadline.get()
+    if current is None:
+        return None
+    left = current[0] - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded(stage, current[1])
+    return left
+
+def check_deadline(stage: str = ''):
+    """检查是否超时，超时则抛出 DeadlineExceeded"""
+    current = _deadline.get()
+    if current is not None and time.monotonic() > current[0]:
+        raise DeadlineExceeded(stage, current[1])
+
+def checked_range(start: int, stop: int, every: int = 1024, stage: str = '范围展开') -> Iterator[int]:
+    """与 range(start, stop) 相同，每迭代 every 次检查一次是否超时，用于范围可能很大的展开循环"""
+    for i in range(start, stop):
+        if (i - start) % every == 0:
+            check_deadline(stage)
+        yield i
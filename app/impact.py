@@ -0,0 +1,224 @@
+"""
+模板变更影响分析模块
+合并模板改动前，用改动前、后两套模板分别渲染设备清单，找出输出会变化的设备并给出统一diff格式的差异。
+
+- 只有命令模板版本（commands 的哈希）变化的配置段才需要渲染，其余配置段输出必然相同，直接跳过；
+- 参数验证和智能输入处理只做一次，两套模板共用处理后的参数；
+- 同一工作进程内相同的 (厂商, 配置类型, 参数) 只渲染一次，清单中大量配置相同的设备复用结果；
+- 新旧输出先比较哈希，相同时不计算diff。
+"""
+
+import os
+import shutil
+import difflib
+import hashlib
+import tempfile
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.bulk import DEFAULT_BATCH_SIZE, iter_batch_results, template_key, _hash_json
+
+# 每个工作进程缓存的配置段分析结果数
+SECTION_CACHE_SIZE = 10000
+
+# 配置段状态
+SECTION_CHANGED = 'changed'
+SECTION_UNCHANGED = 'unchanged'
+
+# 工作进程内的新旧生成器和缓存，由 _init_worker 初始化
+_worker_state: Dict[str, Any] = {}
+
+def export_templates_at_ref(ref: str, template_dir: str) -> str:
+    """把git版本 ref 中的模板目录导出到临时目录，返回临时目录路径（调用方负责删除）"""
+    template_dir = os.path.abspath(template_dir)
+    try:
+        toplevel = subprocess.check_output(['git', 'rev-parse', '--show-toplevel'], cwd=template_dir,
+                                           stderr=subprocess.PIPE).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise ValueError(f"模板目录不在git仓库中: {template_dir}") from e
+    relative = os.path.relpath(template_dir, toplevel).replace(os.sep, '/')
+
+    try:
+        names = subprocess.check_output(['git', 'ls-tree', '--name-only', f'{ref}:{relative}'], cwd=toplevel,
+                                        stderr=subprocess.PIPE).decode('utf-8').split()
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"无法读取 {ref} 中的模板目录 {relative}: {e.stderr.decode('utf-8', 'replace').strip()}")
+
+    target = tempfile.mkdtemp(prefix='templates-')
+    for name in names:
+        if not name.endswith('.yaml'):
+            continue
+        content = subprocess.check_output(['git', 'show', f'{ref}:{relative}/{name}'], cwd=toplevel)
+        with open(os.path.join(target, name), 'wb') as f:
+            f.write(content)
+    return target
+
+def changed_templates(old_generator, new_generator) -> Set[Tuple[str, str]]:
+    """命令模板有变化（含新增、删除）的 (厂商, 配置类型)"""
+    old_versions = old_generator.template_engine.command_versions
+    new_versions = new_generator.template_engine.command_versions
+    return {key for key in set(old_versions) | set(new_versions) if old_versions.get(key) != new_versions.get(key)}
+
+def _init_worker(old_dir: str, new_dir: str, supported_vendors: Optional[List[str]],
+                 changed: Set[Tuple[str, str]], context_lines: int):
+    """工作进程初始化：加载新旧两套模板"""
+    from app.template_engine import ConfigGenerator
+    _worker_state.update({
+        'old': ConfigGenerator(old_dir, supported_vendors),
+        'new': ConfigGenerator(new_dir, supported_vendors),
+        'changed': changed,
+        'context_lines': context_lines,
+        'cache': OrderedDict()
+    })
+
+def _render(generator, vendor: str, config_type: str, processed: Dict[str, Any]) -> Tuple[List[str], Optional[str]]:
+    """渲染处理后的参数，返回 (命令行, 错误)"""
+    if config_type not in generator.template_engine.templates.get(vendor, {}):
+        return [], f'模板不存在: {template_key(vendor, config_type)}'
+    try:
+        result = generator.generate(vendor, config_type, dict(processed))
+    except Exception as e:
+        return [], str(e)
+    if not result.get('success'):
+        return [], result.get('error') or '生成失败'
+    return list(result['commands']), None
+
+def _digest(lines: List[str], error: Optional[str]) -> str:
+    data = ('\n'.join(lines) + '\n' if error is None else f'error:{error}').encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+def analyse_section(vendor: str, config_type: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """分析一个配置段在新旧模板下的输出差异（结果按参数缓存）"""
+    from app.routes import process_smart_inputs
+    from app.validators import validate_form_data
+
+    cache: OrderedDict = _worker_state['cache']
+    key = (vendor, config_type, _hash_json(parameters))
+    cached = cache.get(key)
+    if cached is not None:
+        cache.move_to_end(key)
+        return cached
+
+    try:
+        is_valid, errors = validate_form_data(config_type, parameters, vendor)
+        processed = process_smart_inputs(config_type, vendor, parameters) if is_valid else None
+    except Exception as e:
+        is_valid, errors, processed = False, [str(e)], None
+
+    if not is_valid:
+        # 参数处理与模板无关，新旧模板下同样失败
+        result = {'status': SECTION_UNCHANGED, 'error': '；'.join(errors)}
+    else:
+        old_lines, old_error = _render(_worker_state['old'], vendor, config_type, processed)
+        new_lines, new_error = _render(_worker_state['new'], vendor, config_type, processed)
+        old_sha, new_sha = _digest(old_lines, old_error), _digest(new_lines, new_error)
+        result = {'status': SECTION_UNCHANGED if old_sha == new_sha else SECTION_CHANGED,
+                  'old_sha256': old_sha, 'new_sha256': new_sha,
+                  'old_lines': len(old_lines), 'new_lines': len(new_lines)}
+        if old_error or new_error:
+            result.update({'old_error': old_error, 'new_error': new_error})
+        if result['status'] == SECTION_CHANGED:
+            result['diff'] = list(difflib.unified_diff(
+                old_lines, new_lines, fromfile='old', tofile='new', lineterm='',
+                n=_worker_state['context_lines']))
+
+    cache[key] = result
+    if len(cache) > SECTION_CACHE_SIZE:
+        cache.popitem(last=False)
+    return result
+
+def _analyse_batch(batch: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any]]]:
+    """分析一批设备，只返回有配置段使用了变化模板的设备"""
+    changed = _worker_state['changed']
+    entries = []
+    for order, device in batch:
+        sections = []
+        for section in device['sections']:
+            config_type = section['config_type']
+            if (device['vendor'], config_type) not in changed:
+                continue
+            result = analyse_section(device['vendor'], config_type, section['parameters'])
+            sections.append(dict(result, config_type=config_type))
+        if sections:
+            entries.append((order, {
+                'name': device['name'],
+                'vendor': device['vendor'],
+                'changed': any(section['status'] == SECTION_CHANGED for section in sections),
+                'sections': sections
+            }))
+    return entries
+
+def _iter_batches(devices: Iterable[Dict[str, Any]], batch_size: int, counter: List[int]):
+    batch = []
+    for order, device in enumerate(devices):
+        counter[0] += 1
+        batch.append((order, device))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def analyse_impact(devices: Iterable[Dict[str, Any]], old_dir: str, new_dir: str,
+                   supported_vendors: Optional[List[str]] = None, jobs: Optional[int] = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE, context_lines: int = 3) -> Dict[str, Any]:
+    """分析模板改动对设备清单的影响，返回报告"""
+    from app.template_engine import ConfigGenerator
+
+    jobs = jobs or os.cpu_count() or 1
+    changed = changed_templates(ConfigGenerator(old_dir, supported_vendors),
+                                ConfigGenerator(new_dir, supported_vendors))
+
+    counter = [0]
+    affected: List[Tuple[int, Dict[str, Any]]] = []
+    if changed:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(old_dir, new_dir, supported_vendors, changed, context_lines)) as pool:
+            for batch_results in iter_batch_results(pool, _analyse_batch, _iter_batches(devices, batch_size, counter),
+                                                    jobs * 2):
+                affected.extend(batch_results)
+    else:
+        # 没有模板变化，只统计设备数
+        for _ in devices:
+            counter[0] += 1
+
+    entries = [entry for _, entry in sorted(affected, key=lambda item: item[0])]
+    by_template: Dict[str, Dict[str, int]] = {}
+    for entry in entries:
+        for section in entry['sections']:
+            stats = by_template.setdefault(template_key(entry['vendor'], section['config_type']),
+                                           {'devices': 0, 'changed': 0})
+            stats['devices'] += 1
+            if section['status'] == SECTION_CHANGED:
+                stats['changed'] += 1
+
+    return {
+        'changed_templates': sorted(template_key(*key) for key in changed),
+        'device_count': counter[0],
+        'affected_count': len(entries),
+        'changed_count': sum(1 for entry in entries if entry['changed']),
+        'templates': dict(sorted(by_template.items())),
+        'devices': entries
+    }
+
+def format_diff(report: Dict[str, Any]) -> str:
+    """把报告中有变化的配置段整理为统一diff文本（每段以 设备/配置类型 为文件名）"""
+    lines = []
+    for entry in report['devices']:
+        for section in entry['sections']:
+            if section['status'] != SECTION_CHANGED:
+                continue
+            name = f"{entry['name']}/{section['config_type']}"
+            lines.append(f'--- a/{name}')
+            lines.append(f'+++ b/{name}')
+            # 跳过 difflib 生成的文件头，换成带设备名的文件头
+            lines.extend((section.get('diff') or [])[2:])
+            if section.get('old_error') or section.get('new_error'):
+                lines.append(f"# 改动前: {section.get('old_error') or '生成成功'}；改动后: {section.get('new_error') or '生成成功'}")
+    return '\n'.join(lines) + ('\n' if lines else '')
+
+def cleanup_exported(path: str):
+    """删除 export_templates_at_ref 导出的临时目录"""
+    shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,147 @@
+"""
+生成流程埋点模块
+按阶段（parse、validate、smart_input、render、serialise）记录耗时到指标注册表，
+同时汇总到当前请求的 Server-Timing 响应头
+"""
+
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from flask import g
+
+from app.memory_tracking import track_stage
+from app.metrics import (registry, STAGE_DURATION, GENERATE_REQUESTS, GENERATE_ERRORS,
+                         GENERATE_DURATION, OUTPUT_LINES)
+
+# 不在模板中的厂商/配置类型统一记为 other，避免任意输入产生无限多的标签组合
+OTHER_LABEL = 'other'
+
+def label_values(vendor: str, config_type: str) -> Tuple[str, str]:
+    """获取指标标签 (vendor, config_type)"""
+    from app.template_engine import get_shared_generator
+    templates = get_shared_generator().template_engine.templates
+    if vendor not in templates:
+        return OTHER_LABEL, OTHER_LABEL
+    if config_type not in templates[vendor]:
+        return vendor, OTHER_LABEL
+    return vendor, config_type
+
+# 当前请求各阶段的耗时 [(阶段, 秒)]，不在请求中（如后台任务）时为None
+_request_timings: contextvars.ContextVar = contextvars.ContextVar('request_timings', default=None)
+
+def record_stage(name: str, seconds: float, labels: Tuple[str, str]):
+    """记录一个阶段的耗时"""
+    STAGE_DURATION.observe(seconds, name, *labels)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+def timed(name: str):
+    """函数装饰器：把函数耗时计入当前请求的 Server-Timing（不计入指标），不在请求中时没有额外开销"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _request_timings.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.append((name, time.perf_counter() - started))
+        return wrapper
+    return decorator
+
+def format_server_timing(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """格式化 Server-Timing 响应头，同名阶段合并（desc 中注明次数），单位毫秒"""
+    merged: Dict[str, List[float]] = {}
+    for name, seconds in timings:
+        entry = merged.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    parts = []
+    for name, (seconds, count) in merged.items():
+        part = f'{name};dur={seconds * 1000:.3f}'
+        if count > 1:
+            part += f';desc="x{count}"'
+        parts.append(part)
+    if total is not None:
+        parts.append(f'total;dur={total * 1000:.3f}')
+    return ', '.join(parts)
+
+@contextmanager
+def stage(name: str, labels: Tuple[str, str]):
+    """统计 with 块的耗时并记为指定阶段（开启内存跟踪时同时记录该阶段的内存分配）"""
+    with track_stage(name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            record_stage(name, time.perf_counter() - started, labels)
+
+def record_request(labels: Tuple[str, str]):
+    """记录一次生成请求"""
+    GENERATE_REQUESTS.inc(*labels)
+
+def record_error(labels: Tuple[str, str], reason: str):
+    """记录一次生成失败（reason: validation、render、deadline、admission）"""
+    GENERATE_ERRORS.inc(*labels, reason)
+
+def record_result(labels: Tuple[str, str], seconds: float, lines: int):
+    """记录一次成功生成的总耗时和输出行数"""
+    GENERATE_DURATION.observe(seconds, *labels)
+    OUTPUT_LINES.observe(lines, *labels)
+
+def _collect_runtime_stats():
+    """导出请求合并、准入控制和结构化日志的已有统计"""
+    from flask import current_app
+    from app.template_engine import get_shared_generator
+    from app.structured_log import get_logger
+
+    coalescing = get_shared_generator().get_coalescing_stats()
+    yield ('switchcfg_coalesced_executions_total', 'counter', '合并后实际执行的渲染次数', {}, coalescing['executions'])
+    yield ('switchcfg_coalesced_shared_total', 'counter', '共享其他请求渲染结果的次数（节省的渲染次数）', {}, coalescing['shared'])
+    yield ('switchcfg_coalesced_retries_total', 'counter', '先行请求失败后重新执行的次数', {}, coalescing['retries'])
+
+    admission = current_app.extensions.get('admission')
+    if admission is not None:
+        stats = admission.stats()
+        yield ('switchcfg_admission_admitted_total', 'counter', '进入高开销队列并获准执行的请求数', {}, stats['admitted'])
+        yield ('switchcfg_admission_rejected_total', 'counter', '高开销队列拒绝的请求数', {}, stats['rejected'])
+        yield ('switchcfg_admission_waiting', 'gauge', '正在高开销队列中等待的请求数', {}, stats['waiting'])
+
+    log_stats = get_logger().stats()
+    yield ('switchcfg_log_records_written_total', 'counter', '已写入的结构化日志条数', {}, log_stats['written'])
+    yield ('switchcfg_log_records_dropped_total', 'counter', '队列已满丢弃的日志条数', {}, log_stats['dropped'])
+    yield ('switchcfg_log_error_records_dropped_total', 'counter', '错误队列已满丢弃的错误日志条数', {},
+           log_stats['dropped_errors'])
+    yield ('switchcfg_log_records_sampled_out_total', 'counter', '采样跳过的成功日志条数', {}, log_stats['sampled_out'])
+
+registry.register_collector(_collect_runtime_stats)
+
+def init_instrumentation(app):
+    """注册请求钩子：收集各阶段耗时并输出 Server-Timing 响应头"""
+    if not app.config.get('SERVER_TIMING_ENABLED', True):
+        return
+
+    @app.before_request
+    def start_request_timings():
+        _request_timings.set([])
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def add_server_timing(response):
+        timings = _request_timings.get()
+        if timings:
+            total = time.perf_counter() - g.get('_request_started', time.perf_counter())
+            response.headers['Server-Timing'] = format_server_timing(timings, total)
+        return response
+
+    @app.teardown_request
+    def clear_request_timings(exc):
+        # 线程会被后续请求复用，结束时清除
+        _request_timings.set(None)
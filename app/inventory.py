@@ -0,0 +1,150 @@
+"""
+设备清单模块
+将批量请求或清单文件（CSV、YAML、JSON Lines）中的设备描述整理为统一结构：
+{'name': 设备名, 'vendor': 厂商, 'sections': [{'config_type': 配置类型, 'parameters': {...}}]}
+"""
+
+import os
+import csv
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+import yaml
+
+def normalize_device(entry: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """整理单台设备的描述
+
+    支持两种写法：
+    - 多个配置段：{"name": "sw1", "vendor": "huawei", "sections": [{"config_type": ..., "parameters": {...}}]}
+    - 单个配置段：{"name": "sw1", "vendor": "huawei", "config_type": ..., "parameters": {...}}
+    """
+    if not isinstance(entry, dict):
+        raise ValueError(f"第{index + 1}台设备格式错误，应为对象")
+
+    name = str(entry.get('name') or entry.get('device') or f'device_{index + 1}')
+    vendor = entry.get('vendor')
+    if not vendor:
+        raise ValueError(f"设备 {name} 缺少厂商(vendor)")
+
+    raw_sections = entry.get('sections')
+    if raw_sections is None:
+        raw_sections = [{'config_type': entry.get('config_type'), 'parameters': entry.get('parameters', {})}]
+    if not isinstance(raw_sections, list) or not raw_sections:
+        raise ValueError(f"设备 {name} 的配置段(sections)应为非空列表")
+
+    sections = []
+    for section in raw_sections:
+        if not isinstance(section, dict) or not section.get('config_type'):
+            raise ValueError(f"设备 {name} 存在缺少配置类型(config_type)的配置段")
+        parameters = section.get('parameters') or {}
+        if not isinstance(parameters, dict):
+            raise ValueError(f"设备 {name} 的 {section['config_type']} 参数应为对象")
+        sections.append({'config_type': section['config_type'], 'parameters': parameters})
+
+    return {'name': name, 'vendor': vendor, 'sections': sections}
+
+def normalize_devices(entries: Any) -> List[Dict[str, Any]]:
+    """整理设备列表"""
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("设备列表(devices)不能为空")
+    return [normalize_device(entry, index) for index, entry in enumerate(entries)]
+
+# 支持的清单文件格式
+INVENTORY_FORMATS = ('csv', 'yaml', 'jsonl', 'json')
+
+_EXTENSION_FORMATS = {
+    '.csv': 'csv',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.json': 'json'
+}
+
+# CSV中不作为配置参数的列
+CSV_RESERVED_COLUMNS = ('name', 'device', 'vendor', 'config_type', 'parameters')
+
+def detect_format(path: str) -> str:
+    """按扩展名判断清单文件格式"""
+    fmt = _EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"无法识别清单文件格式: {path}，支持 {', '.join(INVENTORY_FORMATS)}")
+    return fmt
+
+def _csv_value(value: str) -> Any:
+    """CSV单元格取值：true/false 转为布尔值，其余保持字符串"""
+    value = value.strip()
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    return value
+
+def _iter_csv_entries(f) -> Iterator[Dict[str, Any]]:
+    """CSV清单：每行一个配置段，除保留列外的非空列作为参数（也可在 parameters 列中写JSON对象）；
+    相邻且设备名、厂商相同的行合并为同一台设备的多个配置段"""
+    current = None
+    for line_no, row in enumerate(csv.DictReader(f), 2):
+        name = (row.get('name') or row.get('device') or '').strip()
+        vendor = (row.get('vendor') or '').strip()
+        parameters = {}
+        if (row.get('parameters') or '').strip():
+            try:
+                parameters = json.loads(row['parameters'])
+            except ValueError as e:
+                raise ValueError(f"第{line_no}行 parameters 列不是合法的JSON: {e}")
+        for column, value in row.items():
+            if column and column not in CSV_RESERVED_COLUMNS and value is not None and value.strip():
+                parameters[column] = _csv_value(value)
+        section = {'config_type': (row.get('config_type') or '').strip(), 'parameters': parameters}
+
+        if current is not None and name and current['name'] == name and current['vendor'] == vendor:
+            current['sections'].append(section)
+            continue
+        if current is not None:
+            yield current
+        current = {'name': name, 'vendor': vendor, 'sections': [section]}
+    if current is not None:
+        yield current
+
+def _iter_yaml_entries(f) -> Iterator[Dict[str, Any]]:
+    """YAML清单：设备列表，或 {devices: [...]}"""
+    data = yaml.safe_load(f)
+    if isinstance(data, dict):
+        data = data.get('devices')
+    if not isinstance(data, list):
+        raise ValueError("YAML清单应为设备列表或包含 devices 列表")
+    yield from data
+
+def _iter_jsonl_entries(f) -> Iterator[Dict[str, Any]]:
+    """JSON Lines清单：每行一台设备，忽略空行"""
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"第{line_no}行不是合法的JSON: {e}")
+
+def _iter_json_entries(f) -> Iterator[Dict[str, Any]]:
+    """JSON清单：格式同 /api/archive 的请求体，设备列表或 {devices: [...]}"""
+    data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('devices')
+    if not isinstance(data, list):
+        raise ValueError("JSON清单应为设备列表或包含 devices 列表")
+    yield from data
+
+_READERS = {
+    'csv': _iter_csv_entries,
+    'yaml': _iter_yaml_entries,
+    'jsonl': _iter_jsonl_entries,
+    'json': _iter_json_entries
+}
+
+def iter_inventory(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """逐台读取清单文件中的设备（CSV和JSON Lines按行流式读取，适合数万台设备的清单）"""
+    fmt = fmt or detect_format(path)
+    if fmt not in _READERS:
+        raise ValueError(f"不支持的清单文件格式: {fmt}")
+    with open(path, 'r', encoding='utf-8-sig', newline='' if fmt == 'csv' else None) as f:
+        for index, entry in enumerate(_READERS[fmt](f)):
+            yield normalize_device(entry, index)
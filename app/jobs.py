@@ -0,0 +1,413 @@
+"""
+异步任务模块
+大批量设备的配置生成以任务形式提交到本地SQLite队列，由后台线程池逐台渲染，
+进度、部分结果和错误可随时查询，任务在进程重启后从未完成的设备继续
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from flask import current_app
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    device TEXT NOT NULL,
+    vendor TEXT NOT NULL,
+    sections TEXT NOT NULL,
+    status TEXT NOT NULL,
+    lease_until REAL,
+    result TEXT,
+    finished_seq INTEGER,
+    finished_at REAL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (status, lease_until);
+CREATE INDEX IF NOT EXISTS idx_job_items_finished ON job_items (job_id, finished_seq);
+CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs (expires_at);
+"""
+
+# 任务状态
+JOB_RUNNING = 'running'
+JOB_FINISHED = 'finished'
+
+# 设备状态
+ITEM_PENDING = 'pending'
+ITEM_RUNNING = 'running'
+ITEM_DONE = 'done'
+ITEM_FAILED = 'failed'
+
+class JobManager:
+    """基于SQLite的任务队列和后台渲染线程池"""
+
+    def __init__(self, db_path: str, render_section: Callable[[str, str, Dict[str, Any]], Dict[str, Any]],
+                 save_output: Callable[[str, str, List[str]], Optional[str]],
+                 workers: int = 2, lease_seconds: int = 30, ttl_seconds: int = 86400,
+                 cleanup_interval: int = 300, poll_interval: float = 0.5, max_poll_interval: float = 5.0):
+        self.db_path = db_path
+        self.render_section = render_section
+        self.save_output = save_output
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.ttl_seconds = ttl_seconds
+        self.cleanup_interval = cleanup_interval
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._last_cleanup = 0.0
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库连接（每次操作独立连接，事务由调用方显式控制）"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(_SCHEMA)
+                    self._schema_ready = True
+        return conn
+
+    # ---- 后台线程 ----
+
+    def ensure_started(self):
+        """启动当前进程的后台线程（幂等；fork出的新进程会重新启动自己的线程）"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'job-worker-{index}', daemon=True)
+                thread.start()
+
+    def _worker_loop(self):
+        """循环领取待处理设备并渲染
+
+        连续空闲时轮询间隔从 poll_interval 起逐次加倍，最长 max_poll_interval；
+        提交新任务会立即唤醒等待中的线程，间隔只影响发现过期租约的延迟。
+        """
+        idle_wait = self.poll_interval
+        while True:
+            try:
+                self._maybe_cleanup()
+                item = self._claim_item()
+                if item is None:
+                    if self._wakeup.wait(idle_wait):
+                        idle_wait = self.poll_interval
+                    else:
+                        idle_wait = min(idle_wait * 2, self.max_poll_interval)
+                    self._wakeup.clear()
+                    continue
+                idle_wait = self.poll_interval
+                self._process_item(item)
+            except Exception as e:
+                print(f"任务处理线程异常: {e}")
+                time.sleep(self.poll_interval)
+
+    def _claim_item(self) -> Optional[sqlite3.Row]:
+        """领取一台待处理的设备；租约过期的设备（如进程重启前未完成）会被重新领取
+
+        先用普通读取确认有可领取的设备，只在有设备时才开启写事务，
+        空闲轮询不与任务提交和租约续期争用写锁。
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            claimable = conn.execute(
+                "SELECT 1 FROM job_items WHERE status = ? OR (status = ? AND lease_until < ?) LIMIT 1",
+                (ITEM_PENDING, ITEM_RUNNING, now)
+            ).fetchone()
+            if claimable is None:
+                return None
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                "SELECT job_id, seq, device, vendor, sections FROM job_items "
+                "WHERE status = ? OR (status = ? AND lease_until < ?) "
+                "ORDER BY rowid LIMIT 1",
+                (ITEM_PENDING, ITEM_RUNNING, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE job_items SET status = ?, lease_until = ? WHERE job_id = ? AND seq = ?",
+                    (ITEM_RUNNING, now + self.lease_seconds, row['job_id'], row['seq'])
+                )
+            conn.execute('COMMIT')
+            return row
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _process_item(self, item: sqlite3.Row):
+        """渲染一台设备的全部配置段，结果保存到结果存储后记录完成"""
+        files = []
+        errors = []
+        for index, section in enumerate(json.loads(item['sections'])):
+            # 每个配置段开始前续租，多段设备的总耗时超过租约时间也不会被其他线程重复领取
+            if index:
+                self._renew_lease(item['job_id'], item['seq'])
+            config_type = section['config_type']
+            try:
+                result = self.render_section(item['vendor'], config_type, section['parameters'])
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+
+            if result.get('success'):
+                files.append({
+                    'config_type': config_type,
+                    'result_id': self.save_output(item['vendor'], config_type, result['commands']),
+                    'lines': len(result['commands'])
+                })
+            else:
+                errors.append({
+                    'config_type': config_type,
+                    'error': result.get('error', ''),
+                    'details': result.get('details', [])
+                })
+
+        self._finish_item(item['job_id'], item['seq'], ITEM_FAILED if errors else ITEM_DONE,
+                          {'files': files, 'errors': errors})
+
+    def _renew_lease(self, job_id: str, seq: int):
+        """延长设备的租约（心跳）"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE job_items SET lease_until = ? WHERE job_id = ? AND seq = ? AND status = ?",
+                (time.time() + self.lease_seconds, job_id, seq, ITEM_RUNNING)
+            )
+        finally:
+            conn.close()
+
+    def _finish_item(self, job_id: str, seq: int, status: str, result: Dict[str, Any]):
+        """记录设备完成并更新任务进度"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            current = conn.execute("SELECT status FROM job_items WHERE job_id = ? AND seq = ?",
+                                   (job_id, seq)).fetchone()
+            # 任务已过期删除，或已被其他进程完成
+            if current is None or current['status'] in (ITEM_DONE, ITEM_FAILED):
+                conn.execute('COMMIT')
+                return
+
+            finished_seq = conn.execute(
+                "SELECT COALESCE(MAX(finished_seq), 0) + 1 FROM job_items WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, finished_seq = ?, finished_at = ?, lease_until = NULL "
+                "WHERE job_id = ? AND seq = ?",
+                (status, json.dumps(result, ensure_ascii=False), finished_seq, now, job_id, seq)
+            )
+            counter = 'failed' if status == ITEM_FAILED else 'completed'
+            conn.execute(f"UPDATE jobs SET {counter} = {counter} + 1, updated_at = ? WHERE id = ?", (now, job_id))
+            conn.execute(
+                "UPDATE jobs SET status = ?, expires_at = ? WHERE id = ? AND completed + failed >= total",
+                (JOB_FINISHED, now + self.ttl_seconds, job_id)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _maybe_cleanup(self):
+        """定期删除过期的任务记录"""
+        now = time.time()
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+        self.purge_expired(now)
+
+    def purge_expired(self, now: float = None) -> int:
+        """删除过期任务及其设备记录，返回删除的任务数（过期时间在任务结束时设置，进行中的任务不会被删除）"""
+        now = now or time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            expired = [row['id'] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status = ? AND expires_at < ?", (JOB_FINISHED, now))]
+            conn.executemany("DELETE FROM job_items WHERE job_id = ?", [(job_id,) for job_id in expired])
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in expired])
+            conn.execute('COMMIT')
+            return len(expired)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    # ---- 提交与查询 ----
+
+    def submit(self, devices: List[Dict[str, Any]]) -> str:
+        """提交任务，返回任务ID"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                "INSERT INTO jobs (id, status, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, JOB_RUNNING, len(devices), now, now)
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, seq, device, vendor, sections, status) VALUES (?, ?, ?, ?, ?, ?)",
+                [(job_id, seq, device['name'], device['vendor'],
+                  json.dumps(device['sections'], ensure_ascii=False), ITEM_PENDING)
+                 for seq, device in enumerate(devices)]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        self.ensure_started()
+        self._wakeup.set()
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务进度（任务结束前 expires_at 为None）"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            running = conn.execute(
+                "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status = ?", (job_id, ITEM_RUNNING)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+        done = row['completed'] + row['failed']
+        return {
+            'job_id': row['id'],
+            'status': row['status'],
+            'total': row['total'],
+            'completed': row['completed'],
+            'failed': row['failed'],
+            'running': running,
+            'pending': row['total'] - done - running,
+            'progress': round(done * 100.0 / row['total'], 1) if row['total'] else 100.0,
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'expires_at': row['expires_at']
+        }
+
+    def get_results(self, job_id: str, after: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """按完成顺序获取已完成设备的结果（after 为上次取到的完成序号）"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT seq, device, vendor, status, result, finished_seq, finished_at FROM job_items "
+                "WHERE job_id = ? AND finished_seq > ? ORDER BY finished_seq LIMIT ?",
+                (job_id, after, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return [{
+            'seq': row['finished_seq'],
+            'index': row['seq'],
+            'device': row['device'],
+            'vendor': row['vendor'],
+            'status': row['status'],
+            'finished_at': row['finished_at'],
+            **json.loads(row['result'])
+        } for row in rows]
+
+    def iter_events(self, job_id: str, after: int = 0, heartbeat: float = 15.0) -> Iterator[str]:
+        """以Server-Sent Events格式推送每台设备的完成事件，任务结束后发送done事件"""
+        last_sent = time.time()
+        while True:
+            results = self.get_results(job_id, after)
+            for result in results:
+                after = result['seq']
+                yield f"id: {after}\nevent: device\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+                last_sent = time.time()
+
+            if len(results) == 100:
+                continue
+
+            job = self.get_job(job_id)
+            if job is None:
+                yield "event: error\ndata: {\"error\": \"任务不存在或已过期\"}\n\n"
+                return
+            if job['status'] == JOB_FINISHED and not self.get_results(job_id, after, limit=1):
+                yield f"event: done\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+                return
+
+            if time.time() - last_sent >= heartbeat:
+                yield ": keep-alive\n\n"
+                last_sent = time.time()
+            time.sleep(self.poll_interval)
+
+def init_jobs(app):
+    """根据应用配置创建任务管理器（后台线程在首次使用时按进程启动）"""
+    from app.deadline import deadline
+    from app.routes import run_generation, save_result
+    from app.template_engine import get_shared_generator
+
+    template_dir = app.config.get('TEMPLATE_DIR')
+    supported_vendors = app.config.get('SUPPORTED_VENDORS')
+    section_deadline = app.config.get('REQUEST_DEADLINE_SECONDS')
+
+    def render_section(vendor, config_type, parameters):
+        generator = get_shared_generator(template_dir, supported_vendors)
+        with deadline(section_deadline):
+            return run_generation(generator, vendor, config_type, parameters)
+
+    def save_output(vendor, config_type, commands):
+        with app.app_context():
+            return save_result(vendor, config_type, commands)
+
+    manager = JobManager(
+        app.config.get('JOB_DB_PATH'),
+        render_section=render_section,
+        save_output=save_output,
+        workers=app.config.get('JOB_WORKERS', 2),
+        lease_seconds=app.config.get('JOB_LEASE_SECONDS', 30),
+        ttl_seconds=app.config.get('JOB_TTL_SECONDS', 86400),
+        cleanup_interval=app.config.get('JOB_CLEANUP_INTERVAL', 300),
+        max_poll_interval=app.config.get('JOB_MAX_POLL_INTERVAL', 5.0)
+    )
+    app.extensions['job_manager'] = manager
+
+    # 每个进程收到第一个请求时启动后台线程，继续处理重启前未完成的任务
+    app.before_request(manager.ensure_started)
+
+def get_job_manager() -> JobManager:
+    """获取当前应用的任务管理器"""
+    return current_app.extensions['job_manager']
+
+def start_job_workers(app):
+    """立即启动任务线程（供预分叉服务器在worker启动后调用）"""
+    app.extensions['job_manager'].ensure_started()
@@ -0,0 +1,120 @@
+"""
+循环体套印模块
+端口类循环（如 {% for port in port_list %}）的循环体对每个端口渲染出相同的内容，只有端口名不同。
+编译模板时找出循环体只以 {{ 循环变量 }} 形式直接输出循环变量的循环，改写为：
+先用占位符代替循环变量把循环体渲染一次，按占位符切分后，对每个元素用 str.join 套印，
+输出与逐次渲染逐字节一致，1000个端口的开销接近字符串拼接本身。
+
+不满足条件的循环（使用 loop 变量、在条件或属性中使用循环变量、循环体内赋值、带 else/过滤条件等）保持原样。
+"""
+
+from typing import Iterable, List, Optional
+
+from jinja2 import Environment, nodes
+from jinja2.visitor import NodeTransformer
+
+# 循环变量的占位符，模板文本和参数中不会出现
+SENTINEL = '\x00stamp\x00'
+
+# 注册到 Environment.globals 的辅助函数名
+STAMP_FUNCTION = '_stamp_loop'
+CHECK_FUNCTION = '_stamp_check'
+
+# 循环体中出现时不能套印的语句：赋值、宏、过滤块、包含其他模板等会使循环体的输出依赖执行状态
+_UNSAFE_STATEMENTS = (
+    nodes.Assign, nodes.AssignBlock, nodes.FilterBlock, nodes.CallBlock, nodes.Macro, nodes.Include,
+    nodes.Import, nodes.FromImport, nodes.Extends, nodes.Block, nodes.With, nodes.ScopedEvalContextModifier,
+    nodes.ExprStmt, nodes.Continue, nodes.Break,
+)
+
+def stamp_loop(items: Iterable, body: str) -> str:
+    """按占位符切分一次渲染的循环体，为每个元素套印（与 Jinja 输出变量一样使用 str 转换）"""
+    parts = body.split(SENTINEL)
+    return ''.join([value.join(parts) for value in map(str, items)])
+
+def stamp_check(items: Iterable) -> str:
+    """序列为空（或为假值）时不渲染循环体，但仍按原循环的方式取迭代器，不可迭代时抛出相同的异常"""
+    for _ in items:
+        break
+    return ''
+
+def install(env: Environment):
+    """注册套印所需的辅助函数"""
+    env.globals[STAMP_FUNCTION] = stamp_loop
+    env.globals[CHECK_FUNCTION] = stamp_check
+
+def _stampable(loop: nodes.For) -> bool:
+    """循环是否可以套印"""
+    if (not isinstance(loop.target, nodes.Name) or not isinstance(loop.iter, nodes.Name)
+            or loop.else_ or loop.test is not None or loop.recursive):
+        return False
+    name = loop.target.name
+    body = nodes.Template(loop.body)
+    if any(True for _ in body.find_all(_UNSAFE_STATEMENTS)):
+        return False
+
+    # 循环变量只能作为输出语句的直接成员出现，loop 变量不能使用
+    direct = 0
+    for output in body.find_all(nodes.Output):
+        direct += sum(1 for child in output.nodes if isinstance(child, nodes.Name) and child.name == name)
+    used = 0
+    for reference in body.find_all(nodes.Name):
+        if reference.name == 'loop' or (reference.name == name and reference.ctx != 'load'):
+            return False
+        if reference.name == name:
+            used += 1
+    return used == direct
+
+class _ReplaceTarget(NodeTransformer):
+    """把循环变量的输出替换为占位符常量"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def visit_Name(self, node: nodes.Name):
+        if node.name == self.name:
+            return nodes.Const(SENTINEL, lineno=node.lineno)
+        return node
+
+def _rewrite(loop: nodes.For, index: int) -> nodes.Node:
+    """{% for x in items %}body{% endfor %} 改写为：
+
+    {% if items %}{% set 临时变量 %}body(x→占位符){% endset %}{{ _stamp_loop(items, 临时变量) }}
+    {% else %}{{ _stamp_check(items) }}{% endif %}
+    """
+    lineno = loop.lineno
+    body = [_ReplaceTarget(loop.target.name).visit(node) for node in loop.body]
+    capture = f'_stamp_body_{index}'
+    items = loop.iter.name
+    stamped = [
+        nodes.AssignBlock(nodes.Name(capture, 'store', lineno=lineno), None, body, lineno=lineno),
+        nodes.Output([nodes.Call(nodes.Name(STAMP_FUNCTION, 'load', lineno=lineno),
+                                 [nodes.Name(items, 'load', lineno=lineno), nodes.Name(capture, 'load', lineno=lineno)],
+                                 [], None, None, lineno=lineno)], lineno=lineno)
+    ]
+    empty = [nodes.Output([nodes.Call(nodes.Name(CHECK_FUNCTION, 'load', lineno=lineno),
+                                      [nodes.Name(items, 'load', lineno=lineno)], [], None, None, lineno=lineno)],
+                          lineno=lineno)]
+    return nodes.If(nodes.Name(items, 'load', lineno=lineno), stamped, [], empty, lineno=lineno)
+
+def _rewrite_body(body: List[nodes.Node], counter: List[int]) -> int:
+    """自上而下改写语句列表中可套印的循环（已改写的循环不再深入），返回改写的数量"""
+    rewritten = 0
+    for position, node in enumerate(body):
+        if isinstance(node, nodes.For) and _stampable(node):
+            body[position] = _rewrite(node, counter[0])
+            counter[0] += 1
+            rewritten += 1
+            continue
+        for field in ('body', 'else_', 'elif_'):
+            children = getattr(node, field, None)
+            if isinstance(children, list):
+                rewritten += _rewrite_body(children, counter)
+    return rewritten
+
+def compile_stamped(env: Environment, source: str) -> Optional[object]:
+    """编译模板并改写可套印的循环；没有可套印的循环时返回None（由调用方按普通方式编译）"""
+    ast = env.parse(source)
+    if not _rewrite_body(ast.body, [0]):
+        return None
+    return env.template_class.from_code(env, env.compile(ast), env.make_globals(None), None)
@@ -0,0 +1,179 @@
+"""
+内存分配跟踪模块（调试用）
+开启后基于tracemalloc，在生成流程每个阶段前后各取一次快照，
+记录每个请求各阶段新增内存最多的代码位置和内存峰值，用于评估worker的内存上限。
+
+tracemalloc 统计的是整个进程的分配，同一时间只跟踪一个请求（其他请求照常处理、不跟踪），
+并发请求较多时结果会混入其他请求的分配，建议在单线程或低流量环境下使用。
+"""
+
+import time
+import uuid
+import threading
+import tracemalloc
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, g, request
+
+# 跟踪的视图
+TRACKED_ENDPOINTS = {'main.generate_config', 'main.api_generate_config'}
+
+# 当前请求的跟踪报告，未跟踪时为None
+_active_report: contextvars.ContextVar = contextvars.ContextVar('memory_report', default=None)
+
+# 同一时间只跟踪一个请求
+_tracking_lock = threading.Lock()
+
+def _snapshot() -> tracemalloc.Snapshot:
+    """获取快照（排除tracemalloc自身的分配）"""
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+
+def _reset_peak():
+    """重置峰值统计（Python 3.9+）"""
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+
+def _top_sites(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int) -> List[Dict[str, Any]]:
+    """两次快照之间新增内存最多的代码位置"""
+    sites = []
+    for stat in after.compare_to(before, 'lineno')[:limit]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        sites.append({
+            'site': f'{frame.filename}:{frame.lineno}',
+            'size_diff': stat.size_diff,
+            'count_diff': stat.count_diff,
+            'size': stat.size
+        })
+    return sites
+
+@contextmanager
+def track_stage(name: str):
+    """在当前请求被跟踪时，记录阶段前后的分配差异和阶段内的峰值"""
+    report = _active_report.get()
+    if report is None:
+        yield
+        return
+
+    before = _snapshot()
+    start_current, _ = tracemalloc.get_traced_memory()
+    _reset_peak()
+    try:
+        yield
+    finally:
+        end_current, peak = tracemalloc.get_traced_memory()
+        after = _snapshot()
+        report['stages'].append({
+            'stage': name,
+            'net_bytes': end_current - start_current,
+            'peak_bytes': max(peak - start_current, 0),
+            'top_sites': _top_sites(before, after, report['top_limit'])
+        })
+        report['peak_bytes'] = max(report['peak_bytes'], peak - report['baseline_bytes'])
+
+class MemoryReports:
+    """最近的跟踪报告（保存在进程内存中）"""
+
+    def __init__(self, max_kept: int = 50):
+        self._reports = deque(maxlen=max_kept)
+        self._lock = threading.Lock()
+
+    def add(self, report: Dict[str, Any]):
+        with self._lock:
+            self._reports.appendleft(report)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """报告摘要（最新的在前）"""
+        with self._lock:
+            reports = list(self._reports)
+        return [{
+            'id': report['id'],
+            'endpoint': report['endpoint'],
+            'vendor': report['vendor'],
+            'config_type': report['config_type'],
+            'created_at': report['created_at'],
+            'peak_bytes': report['peak_bytes'],
+            'net_bytes': report['net_bytes']
+        } for report in reports]
+
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for report in self._reports:
+                if report['id'] == report_id:
+                    return report
+        return None
+
+def init_memory_tracking(app):
+    """开启内存跟踪时启动tracemalloc并注册请求钩子"""
+    reports = MemoryReports(app.config.get('MEMORY_REPORTS_KEPT', 50))
+    app.extensions['memory_reports'] = reports
+    if not app.config.get('MEMORY_TRACKING_ENABLED'):
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(app.config.get('MEMORY_TRACKING_FRAMES', 1))
+
+    @app.before_request
+    def start_memory_tracking():
+        if request.endpoint not in TRACKED_ENDPOINTS:
+            return
+        # 先读取请求信息（请求体可能不是JSON对象），再占用跟踪锁
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            data = request.form
+        report = {
+            'id': uuid.uuid4().hex[:12],
+            'endpoint': request.endpoint,
+            'vendor': data.get('vendor'),
+            'config_type': data.get('config_type'),
+            'created_at': time.time(),
+            'top_limit': app.config.get('MEMORY_TRACKING_TOP', 10),
+            'baseline_bytes': 0,
+            'peak_bytes': 0,
+            'net_bytes': 0,
+            'stages': []
+        }
+        if not _tracking_lock.acquire(blocking=False):
+            return
+        try:
+            _reset_peak()
+            report['baseline_bytes'], _ = tracemalloc.get_traced_memory()
+            g._memory_report_token = _active_report.set(report)
+        except BaseException:
+            _tracking_lock.release()
+            raise
+
+    @app.after_request
+    def add_memory_report_header(response):
+        report = _active_report.get()
+        if report is not None:
+            response.headers['X-Memory-Report-Id'] = report['id']
+        return response
+
+    @app.teardown_request
+    def finish_memory_tracking(exc):
+        token = g.pop('_memory_report_token', None)
+        if token is None:
+            return
+        report = _active_report.get()
+        _active_report.reset(token)
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            report['net_bytes'] = current - report['baseline_bytes']
+            report['peak_bytes'] = max(report['peak_bytes'], peak - report['baseline_bytes'])
+            if exc is not None:
+                report['error'] = str(exc)
+            reports.add(report)
+        finally:
+            _tracking_lock.release()
+
+def get_memory_reports() -> MemoryReports:
+    """获取当前应用的内存跟踪报告"""
+    return current_app.extensions['memory_reports']
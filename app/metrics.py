@@ -0,0 +1,176 @@
+"""
+运行指标模块
+进程内的计数器和直方图注册表，按Prometheus文本格式输出（/metrics）。
+每次记录只做一次字典查找和加锁累加，可以在生产环境常开
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# 耗时直方图的默认分桶（秒）
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 输出行数直方图的分桶
+LINE_COUNT_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+def _escape(value: str) -> str:
+    """转义标签值"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    """格式化标签，如 {vendor="huawei",config_type="stp_config"}"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def _format_number(value: float) -> str:
+    """格式化数值（整数不带小数点）"""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+class Counter:
+    """单调递增计数器"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        """按标签值累加"""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        """读取当前值"""
+        return self._values.get(labelvalues, 0)
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}'
+                for labels, value in items]
+
+class Histogram:
+    """累积分桶直方图"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> [各分桶计数..., +Inf计数, 总和]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        """记录一个观测值"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            slots = self._values.get(labelvalues)
+            if slots is None:
+                slots = self._values[labelvalues] = [0] * (len(self.buckets) + 2)
+            slots[index] += 1
+            slots[-1] += value
+
+    def expose(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, list(slots)) for labels, slots in self._values.items())
+
+        lines = []
+        for labels, slots in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, slots):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % _format_number(bound))
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            cumulative += slots[len(self.buckets)]
+            bucket_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_number(slots[-1])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """注册（或获取已注册的）计数器"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        """注册（或获取已注册的）直方图"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]):
+        """注册采集函数，输出时调用，返回 (名称, 类型, 说明, 标签, 值) 序列，用于导出其他模块已有的统计"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def expose(self) -> str:
+        """按Prometheus文本格式输出全部指标"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.expose())
+
+        described = set()
+        for collector in collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"采集指标失败: {e}")
+                continue
+            for name, type_name, documentation, labels, value in samples:
+                if name not in described:
+                    described.add(name)
+                    lines.append(f'# HELP {name} {documentation}')
+                    lines.append(f'# TYPE {name} {type_name}')
+                lines.append(f'{name}{_format_labels(list(labels), list(labels.values()))} {_format_number(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+# 进程内全局注册表
+registry = MetricsRegistry()
+
+GENERATE_REQUESTS = registry.counter(
+    'switchcfg_generate_requests_total', '配置生成请求数', ('vendor', 'config_type'))
+GENERATE_ERRORS = registry.counter(
+    'switchcfg_generate_errors_total', '配置生成失败数', ('vendor', 'config_type', 'reason'))
+GENERATE_DURATION = registry.histogram(
+    'switchcfg_generate_duration_seconds', '配置生成总耗时', ('vendor', 'config_type'))
+STAGE_DURATION = registry.histogram(
+    'switchcfg_stage_duration_seconds', '配置生成各阶段耗时', ('stage', 'vendor', 'config_type'))
+OUTPUT_LINES = registry.histogram(
+    'switchcfg_output_lines', '生成的配置行数', ('vendor', 'config_type'), buckets=LINE_COUNT_BUCKETS)
+CACHE_LOOKUPS = registry.counter(
+    'switchcfg_cache_lookups_total', '缓存查找次数', ('cache', 'result'))
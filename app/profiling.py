@@ -0,0 +1,131 @@
+"""
+请求采样分析模块
+按比例（或由管理员通过请求头 X-Profile: 1 指定）对生成请求启用cProfile，
+分析结果保存在本地目录，超过保留数量时删除最旧的文件
+"""
+
+import io
+import os
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import threading
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, g, request
+
+# 可以被采样分析的视图
+PROFILED_ENDPOINTS = {'main.generate_config', 'main.api_generate_config', 'main.download_archive'}
+
+PROFILE_SUFFIX = '.prof'
+
+class ProfileStore:
+    """分析结果文件存储"""
+
+    def __init__(self, directory: str, max_kept: int = 50):
+        self.directory = directory
+        self.max_kept = max_kept
+        self._lock = threading.Lock()
+
+    def save(self, profiler: cProfile.Profile, endpoint: str) -> str:
+        """保存分析结果，返回文件名"""
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint.split('.')[-1]}-{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, name))
+        self._prune()
+        return name
+
+    def _prune(self):
+        """删除超出保留数量的旧文件"""
+        with self._lock:
+            profiles = self.list()
+            for entry in profiles[self.max_kept:]:
+                try:
+                    os.remove(os.path.join(self.directory, entry['name']))
+                except OSError:
+                    pass
+
+    def list(self) -> List[Dict[str, Any]]:
+        """列出已保存的分析结果（最新的在前）"""
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(PROFILE_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append({'name': name, 'size': stat.st_size, 'created_at': stat.st_mtime})
+        entries.sort(key=lambda entry: entry['created_at'], reverse=True)
+        return entries
+
+    def path(self, name: str) -> Optional[str]:
+        """获取分析结果文件路径，文件名非法或不存在时返回None"""
+        if os.path.basename(name) != name or not name.endswith(PROFILE_SUFFIX):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def summary(self, name: str, limit: int = 50, sort: str = 'cumulative') -> Optional[str]:
+        """以文本形式输出分析结果中耗时最多的函数"""
+        path = self.path(name)
+        if path is None:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(path, stream=stream)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+def _should_profile(app) -> bool:
+    """判断当前请求是否需要分析"""
+    if request.endpoint not in PROFILED_ENDPOINTS:
+        return False
+    if request.headers.get('X-Profile') == '1':
+        from app.admin import is_admin_request
+        if is_admin_request():
+            return True
+    rate = app.config.get('PROFILE_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+def init_profiling(app):
+    """创建分析结果存储并注册请求钩子"""
+    store = ProfileStore(app.config.get('PROFILE_DIR'), app.config.get('PROFILE_MAX_KEPT', 50))
+    app.extensions['profile_store'] = store
+
+    @app.before_request
+    def start_profile():
+        if not _should_profile(app):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 其他线程正在分析（Python 3.12起同一时间只允许一个分析器）
+            return
+        g._profiler = profiler
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            try:
+                response.headers['X-Profile-Id'] = store.save(profiler, request.endpoint)
+            except Exception as e:
+                print(f"保存性能分析结果失败: {e}")
+        return response
+
+    @app.teardown_request
+    def stop_profile(exc):
+        # 请求异常结束时 after_request 不会执行，确保分析器被关闭
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+def get_profile_store() -> ProfileStore:
+    """获取当前应用的分析结果存储"""
+    return current_app.extensions['profile_store']
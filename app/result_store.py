@@ -0,0 +1,159 @@
+"""
+生成结果存储模块
+以厂商、配置类型和输出内容的哈希为ID，将每次成功生成的配置压缩后保存在本地SQLite中，
+下载时直接读取已保存的内容，不再重新渲染
+"""
+
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from flask import current_app
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    vendor TEXT,
+    config_type TEXT,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access);
+CREATE TABLE IF NOT EXISTS results_total (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO results_total (id, size) SELECT 0, COALESCE(SUM(size), 0) FROM results;
+CREATE TRIGGER IF NOT EXISTS results_total_insert AFTER INSERT ON results
+BEGIN
+    UPDATE results_total SET size = size + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS results_total_delete AFTER DELETE ON results
+BEGIN
+    UPDATE results_total SET size = size - OLD.size WHERE id = 0;
+END;
+"""
+
+def compute_result_id(content: bytes, vendor: str = None, config_type: str = None) -> str:
+    """计算结果ID（厂商、配置类型和内容的SHA-256），内容相同但类型不同的结果分别保存，下载时文件名正确"""
+    digest = hashlib.sha256()
+    digest.update(f'{vendor or ""}\0{config_type or ""}\0'.encode('utf-8'))
+    digest.update(content)
+    return digest.hexdigest()
+
+def is_valid_result_id(result_id: str) -> bool:
+    """检查结果ID格式"""
+    return len(result_id) == 64 and all(c in '0123456789abcdef' for c in result_id)
+
+class ResultStore:
+    """内容寻址的配置结果存储，总大小超过上限时按最近访问时间淘汰
+
+    总大小由触发器维护在 results_total 表中（多进程共享），保存时不需要扫描全表。
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = 64 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开数据库连接（每次操作独立连接，fork和多线程下都安全）"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                    conn.executescript(_SCHEMA)
+                    self._schema_ready = True
+        return conn
+
+    def put(self, content: str, vendor: str = None, config_type: str = None) -> str:
+        """保存生成结果，返回结果ID；同一厂商和配置类型的相同内容只保存一份"""
+        raw = content.encode('utf-8')
+        result_id = compute_result_id(raw, vendor, config_type)
+        data = zlib.compress(raw, 6)
+        now = time.time()
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO results (id, vendor, config_type, data, size, raw_size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (result_id, vendor, config_type, data, len(data), len(raw), now, now)
+                )
+                conn.execute("UPDATE results SET last_access = ? WHERE id = ?", (now, result_id))
+                self._evict(conn, keep_id=result_id)
+        finally:
+            conn.close()
+        return result_id
+
+    def get(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """读取生成结果，不存在时返回None"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT vendor, config_type, data, created_at FROM results WHERE id = ?",
+                (result_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            with conn:
+                conn.execute("UPDATE results SET last_access = ? WHERE id = ?", (time.time(), result_id))
+        finally:
+            conn.close()
+
+        vendor, config_type, data, created_at = row
+        return {
+            'id': result_id,
+            'vendor': vendor,
+            'config_type': config_type,
+            'content': zlib.decompress(data),
+            'created_at': created_at
+        }
+
+    def _evict(self, conn: sqlite3.Connection, keep_id: str = None):
+        """总大小超过上限时，从最久未访问的结果开始删除"""
+        total = conn.execute("SELECT size FROM results_total WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for result_id, size in conn.execute("SELECT id, size FROM results ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            if result_id == keep_id:
+                continue
+            evicted.append((result_id,))
+            total -= size
+        conn.executemany("DELETE FROM results WHERE id = ?", evicted)
+
+    def stats(self) -> Dict[str, int]:
+        """获取存储统计信息"""
+        conn = self._connect()
+        try:
+            count, size, raw_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM results"
+            ).fetchone()
+        finally:
+            conn.close()
+        return {'count': count, 'size': size, 'raw_size': raw_size, 'max_bytes': self.max_bytes}
+
+def init_result_store(app):
+    """根据应用配置创建结果存储"""
+    app.extensions['result_store'] = ResultStore(
+        app.config.get('RESULT_STORE_PATH'),
+        max_bytes=app.config.get('RESULT_STORE_MAX_BYTES', 64 * 1024 * 1024)
+    )
+
+def get_result_store() -> ResultStore:
+    """获取当前应用的结果存储"""
+    return current_app.extensions['result_store']
@@ -1,12 +1,28 @@
+import io
 import os
+import time
 import json
 import re
 import ipaddress
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app
+import mimetypes
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app, session, send_file, Response, stream_with_context
 from jinja2 import Template
+from app.assets import PageCache, IMMUTABLE_CACHE_CONTROL, DIST_DIRNAME, select_variant
+from app.utils import sanitize_filename, log_config_generation
+from app.deadline import DeadlineExceeded, check_deadline, checked_range, deadline
+from app.metrics import registry, CACHE_LOOKUPS
+from app.instrumentation import label_values, stage, timed, record_stage, record_request, record_error, record_result
+from app.admin import admin_required
 
 main = Blueprint('main', __name__)
 
+# /api/generate 支持的输出格式
+GENERATE_OUTPUTS = ('flat', 'tree', 'ndjson')
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# 主页面渲染结果缓存（按模板版本和资源版本区分）
+index_page_cache = PageCache()
+
 def load_template(vendor, config_type):
     """加载指定厂商和配置类型的模板"""
     template_path = os.path.join('templates', vendor, f'{config_type}.json')
@@ -21,6 +37,22 @@ def load_template(vendor, config_type):
         print(f"加载模板失败: {e}")
         return None
 
+# 端口范围格式（按顺序尝试）
+PORT_RANGE_PATTERNS = [
+    # 格式1: 简单数字范围 (如: GigabitEthernet0/0/1-4)
+    re.compile(r'^(.+?)(\d+)-(\d+)$'),
+
+    # 格式2: 复杂路径范围 (如: GigabitEthernet0/0/1-0/0/4)
+    re.compile(r'^(.+?)(\d+/\d+/\d+)-(\d+/\d+/\d+)$'),
+
+    # 格式3: 槽位范围 (如: GigabitEthernet0/1-0/4)
+    re.compile(r'^(.+?)(\d+/\d+)-(\d+/\d+)$'),
+
+    # 格式4: 华为简化格式 (如: 10GE1/0/1-4)
+    re.compile(r'^(.+?)(\d+/\d+/\d+)-(\d+)$')
+]
+
+@timed('expand_ports')
 def expand_ports(port_string):
     """
     增强版端口展开函数，支持复杂的不连续端口输入
@@ -42,6 +74,7 @@ def expand_ports(port_string):
     parts = [part.strip() for part in port_string.split(',') if part.strip()]
 
     for part in parts:
+        check_deadline('端口展开')
         expanded_part = _expand_single_port_part(part)
         ports.extend(expanded_part)
 
@@ -55,6 +88,67 @@ def expand_ports(port_string):
 
     return unique_ports
 
+def _span(start, end):
+    """range(start, end + 1) 的长度"""
+    return max(end - start + 1, 0)
+
+def count_ports(port_string):
+    """
+    统计端口字符串展开后的端口数，按与 expand_ports 相同的规则逐段计算而不生成端口列表，
+    用于在渲染前估算开销（不去重，结果不小于实际展开的端口数）
+    """
+    count = 0
+    if not port_string or not port_string.strip():
+        return count
+
+    for part in port_string.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' not in part:
+            count += 1
+            continue
+        for pattern in PORT_RANGE_PATTERNS:
+            match = pattern.match(part)
+            if match:
+                count += _count_port_range(PORT_RANGE_PATTERNS.index(pattern), *match.groups()[1:])
+                break
+        else:
+            count += 1
+    return count
+
+def _count_port_range(kind, start, end):
+    """按范围格式统计端口数（与各 _expand_*_range 函数的展开规则一致）"""
+    if kind == 0:
+        return abs(int(end) - int(start)) + 1
+    if kind == 3:
+        return _span(int(start.split('/')[2]), int(end))
+
+    start_parts = [int(x) for x in start.split('/')]
+    end_parts = [int(x) for x in end.split('/')]
+    if kind == 2:
+        (start_slot, start_port), (end_slot, end_port) = start_parts, end_parts
+        if start_slot > end_slot:
+            return 0
+        if start_slot == end_slot:
+            return _span(start_port, end_port)
+        return _span(start_port, 48) + _span(1, end_port) + 48 * (end_slot - start_slot - 1)
+
+    (start_slot, start_subslot, start_port), (end_slot, end_subslot, end_port) = start_parts, end_parts
+    if start_slot > end_slot:
+        return 0
+    if start_slot == end_slot:
+        if start_subslot > end_subslot:
+            return 0
+        if start_subslot == end_subslot:
+            return _span(start_port, end_port)
+        return _span(start_port, 48) + _span(1, end_port) + 48 * (end_subslot - start_subslot - 1)
+    # 起始槽位（子槽位到8为止）、结束槽位（从子槽位0开始）和中间槽位（9个子槽位）
+    count = (_span(start_port, 48) + 48 * (8 - start_subslot)) if start_subslot <= 8 else 0
+    if end_subslot >= 0:
+        count += 48 * end_subslot + _span(1, end_port)
+    return count + 48 * 9 * (end_slot - start_slot - 1)
+
 def _expand_single_port_part(part):
     """
     展开单个端口部分
@@ -83,31 +177,16 @@ def _expand_port_range(range_part):
     """
     ports = []
 
-    # 尝试匹配不同的范围格式
-    range_patterns = [
-        # 格式1: 简单数字范围 (如: GigabitEthernet0/0/1-4)
-        r'^(.+?)(\d+)-(\d+)$',
-
-        # 格式2: 复杂路径范围 (如: GigabitEthernet0/0/1-0/0/4)
-        r'^(.+?)(\d+/\d+/\d+)-(\d+/\d+/\d+)$',
-
-        # 格式3: 槽位范围 (如: GigabitEthernet0/1-0/4)
-        r'^(.+?)(\d+/\d+)-(\d+/\d+)$',
-
-        # 格式4: 华为简化格式 (如: 10GE1/0/1-4)
-        r'^(.+?)(\d+/\d+/\d+)-(\d+)$'
-    ]
-
-    for pattern in range_patterns:
-        match = re.match(pattern, range_part)
+    for pattern in PORT_RANGE_PATTERNS:
+        match = pattern.match(range_part)
         if match:
-            if pattern == range_patterns[0]:  # 简单数字范围
+            if pattern is PORT_RANGE_PATTERNS[0]:  # 简单数字范围
                 ports.extend(_expand_simple_number_range(match))
-            elif pattern == range_patterns[1]:  # 复杂路径范围
+            elif pattern is PORT_RANGE_PATTERNS[1]:  # 复杂路径范围
                 ports.extend(_expand_complex_path_range(match))
-            elif pattern == range_patterns[2]:  # 槽位范围
+            elif pattern is PORT_RANGE_PATTERNS[2]:  # 槽位范围
                 ports.extend(_expand_slot_range(match))
-            elif pattern == range_patterns[3]:  # 华为简化格式
+            elif pattern is PORT_RANGE_PATTERNS[3]:  # 华为简化格式
                 ports.extend(_expand_huawei_simplified_range(match))
             break
     else:
@@ -126,11 +205,11 @@ def _expand_simple_number_range(match):
         end_num = int(end)
 
         if start_num <= end_num:
-            for i in range(start_num, end_num + 1):
+            for i in checked_range(start_num, end_num + 1):
                 ports.append(f"{prefix}{i}")
         else:
             # 如果起始大于结束，交换顺序
-            for i in range(end_num, start_num + 1):
+            for i in checked_range(end_num, start_num + 1):
                 ports.append(f"{prefix}{i}")
     except ValueError:
         # 如果转换失败，返回原字符串
@@ -154,48 +233,48 @@ def _expand_complex_path_range(match):
             end_slot, end_subslot, end_port = end_parts
 
             # 生成范围内的所有端口
-            for slot in range(start_slot, end_slot + 1):
+            for slot in checked_range(start_slot, end_slot + 1):
                 if slot == start_slot and slot == end_slot:
                     # 同一槽位
-                    for subslot in range(start_subslot, end_subslot + 1):
+                    for subslot in checked_range(start_subslot, end_subslot + 1):
                         if subslot == start_subslot and subslot == end_subslot:
                             # 同一子槽位
-                            for port in range(start_port, end_port + 1):
+                            for port in checked_range(start_port, end_port + 1):
                                 ports.append(f"{prefix}{slot}/{subslot}/{port}")
                         elif subslot == start_subslot:
                             # 起始子槽位
-                            for port in range(start_port, 48 + 1):  # 假设最大48端口
+                            for port in checked_range(start_port, 48 + 1):  # 假设最大48端口
                                 ports.append(f"{prefix}{slot}/{subslot}/{port}")
                         elif subslot == end_subslot:
                             # 结束子槽位
-                            for port in range(1, end_port + 1):
+                            for port in checked_range(1, end_port + 1):
                                 ports.append(f"{prefix}{slot}/{subslot}/{port}")
                         else:
                             # 中间子槽位
-                            for port in range(1, 48 + 1):
+                            for port in checked_range(1, 48 + 1):
                                 ports.append(f"{prefix}{slot}/{subslot}/{port}")
                 elif slot == start_slot:
                     # 起始槽位
-                    for subslot in range(start_subslot, 8 + 1):  # 假设最大8子槽位
+                    for subslot in checked_range(start_subslot, 8 + 1):  # 假设最大8子槽位
                         if subslot == start_subslot:
-                            for port in range(start_port, 48 + 1):
+                            for port in checked_range(start_port, 48 + 1):
                                 ports.append(f"{prefix}{slot}/{subslot}/{port}")
                         else:
-                            for port in range(1, 48 + 1):
+                            for port in checked_range(1, 48 + 1):
                                 ports.append(f"{prefix}{slot}/{subslot}/{port}")
                 elif slot == end_slot:
                     # 结束槽位
-                    for subslot in range(0, end_subslot + 1):
+                    for subslot in checked_range(0, end_subslot + 1):
                         if subslot == end_subslot:
-                            for port in range(1, end_port + 1):
+                            for port in checked_range(1, end_port + 1):
                                 ports.append(f"{prefix}{slot}/{subslot}/{port}")
                         else:
-                            for port in range(1, 48 + 1):
+                            for port in checked_range(1, 48 + 1):
                                 ports.append(f"{prefix}{slot}/{subslot}/{port}")
                 else:
                     # 中间槽位
-                    for subslot in range(0, 8 + 1):
-                        for port in range(1, 48 + 1):
+                    for subslot in checked_range(0, 8 + 1):
+                        for port in checked_range(1, 48 + 1):
                             ports.append(f"{prefix}{slot}/{subslot}/{port}")
 
     except (ValueError, IndexError):
@@ -217,22 +296,22 @@ def _expand_slot_range(match):
             start_slot, start_port = start_parts
             end_slot, end_port = end_parts
 
-            for slot in range(start_slot, end_slot + 1):
+            for slot in checked_range(start_slot, end_slot + 1):
                 if slot == start_slot and slot == end_slot:
                     # 同一槽位
-                    for port in range(start_port, end_port + 1):
+                    for port in checked_range(start_port, end_port + 1):
                         ports.append(f"{prefix}{slot}/{port}")
                 elif slot == start_slot:
                     # 起始槽位
-                    for port in range(start_port, 48 + 1):
+                    for port in checked_range(start_port, 48 + 1):
                         ports.append(f"{prefix}{slot}/{port}")
                 elif slot == end_slot:
                     # 结束槽位
-                    for port in range(1, end_port + 1):
+                    for port in checked_range(1, end_port + 1):
                         ports.append(f"{prefix}{slot}/{port}")
                 else:
                     # 中间槽位
-                    for port in range(1, 48 + 1):
+                    for port in checked_range(1, 48 + 1):
                         ports.append(f"{prefix}{slot}/{port}")
 
     except (ValueError, IndexError):
@@ -254,7 +333,7 @@ def _expand_huawei_simplified_range(match):
             slot, subslot, start_port = start_parts
 
             # 从起始端口到结束端口
-            for port in range(start_port, end_number + 1):
+            for port in checked_range(start_port, end_number + 1):
                 ports.append(f"{prefix}{slot}/{subslot}/{port}")
 
     except (ValueError, IndexError):
@@ -345,10 +424,42 @@ def parse_ospf_areas(areas_string):
 @main.route('/')
 def index():
     """主页面"""
-    # 获取支持的厂商列表
     generator = get_config_generator()
+
+    # 有待显示的提示消息时页面内容不固定，直接渲染
+    if session.get('_flashes'):
+        return render_index(generator)
+
+    # 页面其余部分只取决于模板版本和静态资源版本，每个版本只渲染一次
+    cache_key = (generator.get_bootstrap_version(),
+                 current_app.extensions.get('asset_version'),
+                 request.script_root)
+    page = index_page_cache.get_or_render(cache_key, lambda: render_index(generator))
+    return page.make_response(request)
+
+def render_index(generator):
+    """渲染主页面"""
+    # 获取支持的厂商列表
     vendors = generator.get_supported_vendors()
-    return render_template('index.html', vendors=vendors)
+    return render_template('index.html', vendors=vendors,
+                           bootstrap_version=generator.get_bootstrap_version())
+
+@main.route('/assets/<path:filename>')
+def asset_file(filename):
+    """提供带指纹的静态资源，优先返回预压缩版本并允许长期缓存"""
+    dist_folder = os.path.join(current_app.static_folder, DIST_DIRNAME)
+    path = os.path.realpath(os.path.join(dist_folder, filename))
+    if not path.startswith(os.path.realpath(dist_folder) + os.sep) or not os.path.isfile(path):
+        return jsonify({'success': False, 'error': '资源不存在'}), 404
+
+    variant_path, encoding = select_variant(path, request.accept_encodings)
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    response = send_file(variant_path, mimetype=mimetype, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
 
 @main.route('/simplified')
 def simplified():
@@ -366,30 +477,13 @@ def get_config_types(vendor):
     """获取指定厂商支持的配置类型"""
     try:
         generator = get_config_generator()
-        config_types = generator.get_supported_config_types(vendor)
-
-        # 配置类型的中文名称映射
-        type_names = {
-            'vlan_complete_config': 'VLAN一体化配置',
-            'port_aggregation': '端口聚合',
-            'dhcp_service': 'DHCP服务',
-            'static_route': '静态路由',
-            'interface_ip': '接口IP配置',
-            'stp_config': 'STP配置',
-            'ospf_config': 'OSPF配置',
-            'vrrp_config': 'VRRP网关冗余配置'
-        }
-
-        result = []
-        for config_type in config_types:
-            result.append({
-                'value': config_type,
-                'name': type_names.get(config_type, config_type)
-            })
+        payload = generator.get_metadata_payload('config_types', vendor)
+        if payload is not None:
+            return metadata_response(*payload)
 
         return jsonify({
             'success': True,
-            'config_types': result
+            'config_types': []
         })
     except Exception as e:
         return jsonify({
@@ -402,30 +496,155 @@ def get_template_info(vendor, config_type):
     """获取模板参数信息"""
     try:
         generator = get_config_generator()
-        template_info = generator.get_template_info(vendor, config_type)
+        payload = generator.get_metadata_payload('template_info', vendor, config_type)
+        if payload is not None:
+            return metadata_response(*payload)
+
         return jsonify({
             'success': True,
-            'template_info': template_info
+            'template_info': {}
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
         })
+
+@main.route('/api/bootstrap')
+def get_bootstrap():
+    """一次性获取全部厂商、配置类型、参数定义和示例（预压缩，可长期缓存）"""
+    try:
+        generator = get_config_generator()
+        body, version = generator.get_metadata_payload('bootstrap')
+
+        # 带有当前版本号的URL内容不会再变化，可以长期缓存
+        max_age = None
+        if request.args.get('v') == version:
+            max_age = current_app.config.get('BOOTSTRAP_CACHE_MAX_AGE', 31536000)
+
+        return metadata_response(body, version, gzip_body=generator.get_bootstrap_gzip(), max_age=max_age)
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+@main.route('/api/stats')
+def get_stats():
+    """运行统计：请求合并、准入控制、结构化日志和结果存储"""
+    from app.admission import get_admission
+    from app.result_store import get_result_store
+
+    from app.structured_log import get_logger
+
+    stats = {
+        'coalescing': get_config_generator().get_coalescing_stats(),
+        'admission': get_admission().stats(),
+        'logging': get_logger().stats()
+    }
+    try:
+        stats['result_store'] = get_result_store().stats()
+    except Exception as e:
+        print(f"获取结果存储统计失败: {e}")
+
+    return jsonify({
+        'success': True,
+        'process_id': os.getpid(),
+        **stats
+    })
+
+@main.route('/metrics')
+def metrics():
+    """Prometheus格式的运行指标（每个worker进程独立统计）"""
+    return Response(registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@main.route('/admin/profiles')
+@admin_required
+def list_profiles():
+    """列出本地保存的请求性能分析结果"""
+    from app.profiling import get_profile_store
+    return jsonify({
+        'success': True,
+        'profiles': get_profile_store().list()
+    })
+
+@main.route('/admin/profiles/<name>')
+@admin_required
+def download_profile(name):
+    """下载性能分析结果（pstats格式），format=text 时返回耗时最多的函数列表"""
+    from app.profiling import get_profile_store
+    store = get_profile_store()
+    path = store.path(name)
+    if path is None:
+        return jsonify({
+            'success': False,
+            'error': '分析结果不存在'
+        }), 404
+
+    if request.args.get('format') == 'text':
+        limit = request.args.get('limit', 50, type=int)
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'calls'):
+            sort = 'cumulative'
+        return Response(store.summary(name, limit, sort), mimetype='text/plain')
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=name)
+
+@main.route('/admin/memory')
+@admin_required
+def list_memory_reports():
+    """列出最近的内存跟踪报告（需开启 MEMORY_TRACKING_ENABLED）"""
+    import tracemalloc
+    from app.memory_tracking import get_memory_reports
+    return jsonify({
+        'success': True,
+        'enabled': tracemalloc.is_tracing(),
+        'process_id': os.getpid(),
+        'reports': get_memory_reports().list()
+    })
+
+@main.route('/admin/memory/<report_id>')
+@admin_required
+def get_memory_report(report_id):
+    """查看内存跟踪报告：各阶段的净增内存、峰值和分配最多的代码位置"""
+    from app.memory_tracking import get_memory_reports
+    report = get_memory_reports().get(report_id)
+    if report is None:
+        return jsonify({
+            'success': False,
+            'error': '报告不存在'
+        }), 404
+    return jsonify({'success': True, 'report': report})
+
+def metadata_response(body, etag, gzip_body=None, max_age=None):
+    """返回预序列化的元数据，附带强ETag和缓存头，客户端缓存仍有效时返回304
+
+    提供 gzip_body 且客户端支持时直接返回预压缩内容，两种编码使用不同的ETag。
+    """
+    if gzip_body is not None and 'gzip' in request.accept_encodings:
+        response = current_app.response_class(gzip_body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        etag = f'{etag}-gzip'
+    else:
+        response = current_app.response_class(body, mimetype='application/json')
+    if gzip_body is not None:
+        response.vary.add('Accept-Encoding')
+
+    response.set_etag(etag)
+    response.cache_control.public = True
+    if max_age is None:
+        max_age = current_app.config.get('METADATA_CACHE_MAX_AGE', 0)
+    response.cache_control.max_age = max_age
+    response = response.make_conditional(request)
+    CACHE_LOOKUPS.inc('metadata_etag', 'hit' if response.status_code == 304 else 'miss')
+    return response
+
 def get_config_generator():
-    """获取配置生成器实例"""
-    global config_generator
-    if config_generator is None:
-        from app.template_engine import ConfigGenerator
-        config_generator = ConfigGenerator(
-            template_dir=current_app.config.get('TEMPLATE_DIR'),
-            supported_vendors=current_app.config.get('SUPPORTED_VENDORS')
-        )
-    return config_generator
-
-# 全局变量，延迟初始化
-config_generator = None
+    """获取配置生成器实例（create_app 时已预热，这里只做线程安全的取用）"""
+    from app.template_engine import get_shared_generator
+    return get_shared_generator(
+        template_dir=current_app.config.get('TEMPLATE_DIR'),
+        supported_vendors=current_app.config.get('SUPPORTED_VENDORS')
+    )
 
 def format_vlan_range(vlan_str):
     """格式化VLAN范围，如 10,20,30-50 -> 10 20 30 to 50"""
@@ -443,10 +662,11 @@ def parse_vlan_list(vlan_str):
     """解析VLAN列表为单个VLAN ID列表"""
     vlans = []
     for part in vlan_str.split(','):
+        check_deadline('VLAN解析')
         part = part.strip()
         if '-' in part:
             start, end = map(int, part.split('-'))
-            vlans.extend(range(start, end + 1))
+            vlans.extend(checked_range(start, end + 1))
         else:
             vlans.append(int(part))
     return vlans
@@ -463,6 +683,11 @@ def process_excluded_addresses(excluded_str):
             elif part:
                 excluded_cmds.append((part.strip(), None))
     return excluded_cmds
+
+def request_deadline():
+    """本次请求的时间预算（REQUEST_DEADLINE_SECONDS），在获准执行后开始计算，准入排队的等待时间不占用预算"""
+    return deadline(current_app.config.get('REQUEST_DEADLINE_SECONDS'))
+
 @main.route('/generate', methods=['POST'])
 def generate_config():
     """生成配置命令（增强版，支持智能输入处理）"""
@@ -475,43 +700,78 @@ def generate_config():
             flash('请选择厂商和配置类型', 'error')
             return redirect(url_for('main.index'))
 
-        # 构建参数字典，包含智能处理逻辑
-        form_data = {}
-        for key, value in request.form.items():
-            if key not in ['vendor', 'config_type'] and value.strip():
-                form_data[key] = value.strip()
-
-        # 智能处理不同配置类型的参数
-        processed_params = process_smart_inputs(config_type, vendor, form_data)
+        labels = label_values(vendor, config_type)
+        record_request(labels)
 
-        # 验证表单数据
-        from app.validators import validate_form_data
-        is_valid, errors = validate_form_data(config_type, processed_params, vendor)
-        if not is_valid:
-            for error in errors:
-                flash(error, 'error')
-            return redirect(url_for('main.index'))
-
-        # 生成配置
+        # 构建参数字典，包含智能处理逻辑
+        with stage('parse', labels):
+            form_data = {}
+            for key, value in request.form.items():
+                if key not in ['vendor', 'config_type'] and value.strip():
+                    form_data[key] = value.strip()
+
+        # 估算开销，高开销请求排队，队列已满时拒绝
+        from app.admission import estimate_cost, get_admission, AdmissionRejected
         generator = get_config_generator()
-        result = generator.generate(vendor, config_type, processed_params)
+        try:
+            ticket = get_admission().admit(estimate_cost(config_type, form_data))
+        except AdmissionRejected as e:
+            record_error(labels, 'admission')
+            flash(str(e), 'error')
+            return render_index(generator), 429, {'Retry-After': str(e.retry_after)}
+
+        started = time.perf_counter()
+        with ticket, request_deadline():
+            # 智能处理不同配置类型的参数
+            with stage('smart_input', labels):
+                processed_params = process_smart_inputs(config_type, vendor, form_data)
+
+            # 验证表单数据
+            from app.validators import validate_form_data
+            with stage('validate', labels):
+                is_valid, errors = validate_form_data(config_type, processed_params, vendor)
+            if not is_valid:
+                record_error(labels, 'validation')
+                log_config_generation(vendor, config_type, form_data, False, '参数验证失败', details=errors)
+                for error in errors:
+                    flash(error, 'error')
+                return redirect(url_for('main.index'))
+
+            # 生成配置
+            with stage('render', labels):
+                result = generator.generate(vendor, config_type, processed_params)
+
+        log_config_generation(vendor, config_type, form_data, result['success'], result.get('error'),
+                              lines=len(result['commands']),
+                              duration_ms=round((time.perf_counter() - started) * 1000, 2))
 
         if result['success']:
-            return render_template('result.html',
-                                 commands=result['commands'],
-                                 vendor=vendor,
-                                 config_type=config_type,
-                                 parameters=processed_params)
+            record_result(labels, time.perf_counter() - started, len(result['commands']))
+            with stage('serialise', labels):
+                return render_template('result.html',
+                                     commands=result['commands'],
+                                     vendor=vendor,
+                                     config_type=config_type,
+                                     parameters=processed_params,
+                                     result_id=save_result(vendor, config_type, result['commands']))
         else:
+            record_error(labels, 'render')
             flash(f'生成配置失败: {result["error"]}', 'error')
             return redirect(url_for('main.index'))
 
+    except DeadlineExceeded as e:
+        record_error(label_values(request.form.get('vendor'), request.form.get('config_type')), 'deadline')
+        log_config_generation(request.form.get('vendor'), request.form.get('config_type'), {}, False, str(e))
+        flash(f'{str(e)}，请缩小端口或VLAN范围后重试', 'error')
+        return render_index(get_config_generator()), 504
+
     except Exception as e:
         flash(f'系统错误: {str(e)}', 'error')
         return redirect(url_for('main.index'))
 
 def process_smart_inputs(config_type, vendor, form_data):
     """智能处理用户输入，支持范围展开、批量处理等"""
+    check_deadline('智能输入处理')
     processed = dict(form_data)
 
     # 处理接口配置 - 支持端口范围
@@ -712,9 +972,9 @@ def process_smart_inputs(config_type, vendor, form_data):
 
     # 处理STP配置
     elif config_type == 'stp_config':
-        # 处理全局使能（字符串转布尔值）
+        # 处理全局使能（表单提交的是字符串，API和设备清单中可能是布尔值）
         if 'global_enable' in form_data:
-            processed['global_enable'] = form_data['global_enable'].lower() == 'true'
+            processed['global_enable'] = str(form_data['global_enable']).lower() == 'true'
 
         # 处理根桥配置（新的单选框格式）
         if 'root_bridge_config' in form_data:
@@ -729,11 +989,11 @@ def process_smart_inputs(config_type, vendor, form_data):
                 processed['root_primary'] = False
                 processed['root_secondary'] = False
 
-        # 处理STP保护功能（字符串转布尔值）
+        # 处理STP保护功能（字符串或布尔值统一转为布尔值）
         stp_protection_params = ['edge_port', 'bpdu_protection', 'root_protection', 'loop_protection']
         for param in stp_protection_params:
             if param in form_data:
-                processed[param] = form_data[param].lower() == 'true'
+                processed[param] = str(form_data[param]).lower() == 'true'
 
         # 处理桥优先级（必须是4096的倍数）
         if 'bridge_priority' in form_data and form_data['bridge_priority']:
@@ -803,12 +1063,14 @@ def process_smart_inputs(config_type, vendor, form_data):
         if 'interface_auth_interface' in form_data:
             processed['interface_auth_list'] = expand_ports(form_data['interface_auth_interface'])
 
+    check_deadline('智能输入处理')
     return processed
 
 @main.route('/api/generate', methods=['POST'])
 def api_generate_config():
     """API接口：生成配置命令"""
     try:
+        parse_started = time.perf_counter()
         data = request.get_json()
 
         if not data:
@@ -820,6 +1082,8 @@ def api_generate_config():
         vendor = data.get('vendor')
         config_type = data.get('config_type')
         parameters = data.get('parameters', {})
+        # 输出格式：flat（命令列表）、tree（附带按视图嵌套的结构）、ndjson（逐个顶层视图流式输出）
+        output = data.get('output') or ('ndjson' if request.accept_mimetypes.best == NDJSON_MIMETYPE else 'flat')
 
         if not vendor or not config_type:
             return jsonify({
@@ -827,23 +1091,46 @@ def api_generate_config():
                 'error': '缺少必要参数：vendor 或 config_type'
             })
 
-        # 验证参数
-        from app.validators import validate_form_data
-        is_valid, errors = validate_form_data(config_type, parameters, vendor)
-        if not is_valid:
+        if output not in GENERATE_OUTPUTS:
             return jsonify({
                 'success': False,
-                'error': '参数验证失败',
-                'details': errors
+                'error': f"不支持的输出格式: {output}，可选 {', '.join(GENERATE_OUTPUTS)}"
             })
 
-        # 智能处理API参数
-        processed_params = process_smart_inputs(config_type, vendor, parameters)
+        labels = label_values(vendor, config_type)
+        record_stage('parse', time.perf_counter() - parse_started, labels)
 
-        # 生成配置
+        # 估算开销，高开销请求排队，队列已满时拒绝
+        from app.admission import estimate_cost, get_admission, AdmissionRejected
+        try:
+            ticket = get_admission().admit(estimate_cost(config_type, parameters))
+        except AdmissionRejected as e:
+            record_error(labels, 'admission')
+            return admission_rejected_response(e)
+
+        # 验证参数、智能处理并生成配置
         generator = get_config_generator()
-        result = generator.generate(vendor, config_type, processed_params)
-        return jsonify(result)
+        with ticket, request_deadline():
+            result = run_generation(generator, vendor, config_type, parameters, structured=output != 'flat')
+
+        # 保存结果，客户端可通过结果ID直接下载
+        if result['success']:
+            result_id = save_result(vendor, config_type, result['commands'])
+            if result_id:
+                result['result_id'] = result_id
+                result['download_url'] = url_for('main.download_result', result_id=result_id)
+
+        if output == 'ndjson':
+            return Response(stream_with_context(iter_ndjson_result(result)), mimetype=NDJSON_MIMETYPE)
+        with stage('serialise', labels):
+            return jsonify(result)
+
+    except DeadlineExceeded as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'stage': e.stage
+        }), 504
 
     except Exception as e:
         return jsonify({
@@ -851,6 +1138,249 @@ def api_generate_config():
             'error': str(e)
         })
 
+def iter_ndjson_result(result):
+    """把生成结果按行输出为NDJSON：先输出概要，再逐个输出顶层命令/视图，最后输出结束标记
+
+    下游工具可以边接收边处理各个视图，不必等整个响应解析完成。
+    """
+    def line(payload):
+        return json.dumps(payload, ensure_ascii=False) + '\n'
+
+    if not result.get('success'):
+        yield line({'type': 'error', **result})
+        return
+
+    summary = {key: value for key, value in result.items() if key not in ('commands', 'tree', 'parameters')}
+    yield line({'type': 'summary', **summary, 'lines': len(result['commands'])})
+    for index, node in enumerate(result['tree']):
+        yield line({'type': 'node', 'index': index, **node})
+    yield line({'type': 'end', 'nodes': len(result['tree'])})
+
+def admission_rejected_response(error):
+    """高开销请求被拒绝时返回429，并提示客户端重试时间"""
+    response = jsonify({
+        'success': False,
+        'error': str(error),
+        'retry_after': error.retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def run_generation(generator, vendor, config_type, parameters, structured=False):
+    """执行一次完整的生成流程：参数验证、智能输入处理和模板渲染
+
+    不依赖请求上下文，API、批量归档等场景共用；structured 为True时结果附带按视图嵌套的 tree。
+    """
+    from app.validators import validate_form_data
+    labels = label_values(vendor, config_type)
+    record_request(labels)
+    started = time.perf_counter()
+    try:
+        with stage('validate', labels):
+            is_valid, errors = validate_form_data(config_type, parameters, vendor)
+        if not is_valid:
+            record_error(labels, 'validation')
+            result = {
+                'success': False,
+                'error': '参数验证失败',
+                'details': errors
+            }
+        else:
+            # 智能处理API参数
+            with stage('smart_input', labels):
+                processed_params = process_smart_inputs(config_type, vendor, parameters)
+            with stage('render', labels):
+                result = (generator.generate(vendor, config_type, processed_params, structured=True)
+                          if structured else generator.generate(vendor, config_type, processed_params))
+            if result['success']:
+                record_result(labels, time.perf_counter() - started, len(result['commands']))
+            else:
+                record_error(labels, 'render')
+    except DeadlineExceeded as e:
+        record_error(labels, 'deadline')
+        log_config_generation(vendor, config_type, parameters, False, str(e),
+                              duration_ms=round((time.perf_counter() - started) * 1000, 2))
+        raise
+
+    log_config_generation(vendor, config_type, parameters, result['success'], result.get('error'),
+                          details=result.get('details'),
+                          lines=len(result.get('commands') or []),
+                          duration_ms=round((time.perf_counter() - started) * 1000, 2))
+    return result
+
+@main.route('/api/archive', methods=['POST'])
+def download_archive():
+    """批量生成多台设备的配置，以zip流式下载（每台设备每个配置类型一个文件，附清单）"""
+    from app.inventory import normalize_devices
+    from app.archive import iter_device_archive
+
+    data = request.get_json(silent=True) or {}
+    try:
+        devices = normalize_devices(data.get('devices'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    # 整个归档按全部配置段的总开销申请许可，流式输出结束后释放
+    from app.admission import estimate_cost, get_admission, AdmissionRejected
+    section_deadline = current_app.config.get('REQUEST_DEADLINE_SECONDS')
+    try:
+        with deadline(section_deadline):
+            cost = sum(estimate_cost(section['config_type'], section['parameters'])
+                       for device in devices for section in device['sections'])
+        ticket = get_admission().admit(cost)
+    except DeadlineExceeded as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'stage': e.stage
+        }), 504
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+
+    generator = get_config_generator()
+
+    # 流式归档的总时长与设备数量相关，时间预算按配置段分别计算
+    def render_section(vendor, config_type, parameters):
+        with deadline(section_deadline):
+            return run_generation(generator, vendor, config_type, parameters)
+
+    archive_name = sanitize_filename(str(data.get('name') or 'switch_configs'))
+    response = Response(
+        stream_with_context(iter_device_archive(devices, render_section, bool(data.get('merge_sections')))),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename={archive_name}.zip'
+        }
+    )
+    response.call_on_close(ticket.release)
+    return response
+
+@main.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """提交批量生成任务（设备列表格式同 /api/archive），立即返回任务ID"""
+    from app.inventory import normalize_devices
+    from app.jobs import get_job_manager
+
+    data = request.get_json(silent=True) or {}
+    try:
+        devices = normalize_devices(data.get('devices'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    job_id = get_job_manager().submit(devices)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'total': len(devices),
+        'status_url': url_for('main.get_job', job_id=job_id),
+        'results_url': url_for('main.get_job_results', job_id=job_id),
+        'events_url': url_for('main.job_events', job_id=job_id)
+    }), 202
+
+@main.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """查询任务进度"""
+    from app.jobs import get_job_manager
+
+    job = get_job_manager().get_job(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在或已过期'
+        }), 404
+    return jsonify({'success': True, **job})
+
+@main.route('/api/jobs/<job_id>/results')
+def get_job_results(job_id):
+    """按完成顺序获取任务中已完成设备的结果，after 为上次取到的最后序号"""
+    from app.jobs import get_job_manager
+
+    manager = get_job_manager()
+    job = manager.get_job(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在或已过期'
+        }), 404
+
+    after = request.args.get('after', 0, type=int)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    results = manager.get_results(job_id, after, limit)
+    for item in results:
+        for entry in item['files']:
+            if entry['result_id']:
+                entry['download_url'] = url_for('main.download_result', result_id=entry['result_id'])
+
+    return jsonify({
+        'success': True,
+        'job': job,
+        'results': results,
+        'next_after': results[-1]['seq'] if results else after
+    })
+
+@main.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """以Server-Sent Events推送任务中每台设备的完成情况（支持Last-Event-ID断点续传）"""
+    from app.jobs import get_job_manager
+
+    manager = get_job_manager()
+    if manager.get_job(job_id) is None:
+        return jsonify({
+            'success': False,
+            'error': '任务不存在或已过期'
+        }), 404
+
+    after = request.headers.get('Last-Event-ID', type=int) or request.args.get('after', 0, type=int)
+    return Response(
+        stream_with_context(manager.iter_events(job_id, after)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+def save_result(vendor, config_type, commands):
+    """保存生成结果，返回结果ID；存储失败不影响本次生成"""
+    try:
+        from app.result_store import get_result_store
+        return get_result_store().put('\n'.join(commands), vendor, config_type)
+    except Exception as e:
+        print(f"保存生成结果失败: {e}")
+        return None
+
+@main.route('/results/<result_id>')
+def download_result(result_id):
+    """按结果ID下载已生成的配置文件（支持Range和条件请求）"""
+    from app.result_store import get_result_store, is_valid_result_id
+
+    stored = get_result_store().get(result_id) if is_valid_result_id(result_id) else None
+    CACHE_LOOKUPS.inc('result_store', 'miss' if stored is None else 'hit')
+    if stored is None:
+        flash('配置结果不存在或已过期，请重新生成', 'error')
+        return redirect(url_for('main.index'))
+
+    # 内容由ID唯一确定，永不变化
+    response = send_file(
+        io.BytesIO(stored['content']),
+        mimetype='text/plain',
+        as_attachment=True,
+        download_name=f"{stored['vendor']}_{stored['config_type']}_config.txt",
+        conditional=True,
+        etag=result_id,
+        last_modified=stored['created_at'],
+        max_age=31536000
+    )
+    response.cache_control.immutable = True
+    return response
+
 @main.route('/download/<vendor>/<config_type>')
 def download_config(vendor, config_type):
     """下载配置文件"""
@@ -0,0 +1,136 @@
+"""
+运行配置解析模块
+按厂商方言把设备运行配置（display current-configuration / show running-config 的保存文件）
+或生成的配置命令解析为命令树（见 app/command_tree.py）。
+
+- 文件通过 mmap 逐行读取（无法映射的文件按块读取），不整体读入内存，解析耗时与行数成线性；
+- 思科、锐捷按缩进划分视图，华为、H3C 按 # 分隔和 quit 退出划分视图；
+- 未指定模式时根据文件开头的内容判断：出现顶格的退出命令（生成的配置）按关键字划分，否则有缩进时按缩进划分。
+"""
+
+import os
+import mmap
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional
+
+from app.command_tree import MODE_INDENT, MODE_KEYWORD, CommandNode, Dialect, TreeBuilder
+
+# 按块读取时每次读取的字节数
+CHUNK_SIZE = 1024 * 1024
+
+# 判断构建模式时最多查看的行数
+DETECT_LINES = 1000
+
+_HUAWEI_OPENERS = (
+    r'interface\s', r'vlan\s+\d+$', r'ospf(\s+\d+\b.*)?$', r'stp region-configuration$', r'ip pool\s',
+    r'bfd$', r'bfd\s+\S+\s+bind\s', r'bfd-template(\s|$)', r'nqa test-instance\s', r'aaa$', r'user-interface\s',
+    r'acl\s', r'bgp\s', r'isis(\s+\d+)?$', r'port-group\s', r'ip vpn-instance\s', r'route-policy\s',
+    r'traffic (classifier|behavior|policy)\s',
+)
+_H3C_OPENERS = _HUAWEI_OPENERS + (
+    r'dhcp server ip-pool\s', r'local-user\s', r'radius scheme\s', r'domain\s', r'line\s',
+)
+_HUAWEI_NESTED = {
+    'ospf': (r'area\s',),
+    'bgp': (r'(ipv4|ipv6|l2vpn)-family\b',),
+    'isis': (r'ipv6 enable\s',),
+    'aaa': (r'(authentication|authorization|accounting)-scheme\s', r'domain\s'),
+}
+
+_CISCO_OPENERS = (
+    r'interface\s', r'vlan\s+\d+$', r'router\s', r'spanning-tree mst configuration$', r'ip dhcp pool\s',
+    r'line\s', r'ip access-list\s', r'class-map\s', r'policy-map\s', r'route-map\s', r'key chain\s',
+    r'track\s+\d+', r'vrf definition\s', r'ip vrf\s', r'aaa group server\s',
+)
+_CISCO_NESTED = {
+    'router': (r'address-family\s',),
+    'policy-map': (r'class\s',),
+    'key': (r'key\s+\d+$',),
+    'vrf': (r'address-family\s',),
+}
+
+DIALECTS = {
+    'huawei': Dialect(
+        'huawei', separators=('#',), exit_commands=('quit',), root_commands=('return',),
+        ignored_commands=('system-view', 'save'), block_openers=_HUAWEI_OPENERS,
+        nested_openers=_HUAWEI_NESTED),
+    'h3c': Dialect(
+        'h3c', separators=('#',), exit_commands=('quit',), root_commands=('return',),
+        ignored_commands=('system-view', 'save', 'save force'), block_openers=_H3C_OPENERS,
+        nested_openers=_HUAWEI_NESTED),
+    'cisco': Dialect(
+        'cisco', separators=('!',), exit_commands=('exit', 'exit-address-family'), root_commands=('end',),
+        ignored_commands=('configure terminal', 'write', 'write memory', 'copy running-config startup-config'),
+        block_openers=_CISCO_OPENERS, nested_openers=_CISCO_NESTED, comment_prefixes=('!', '#'), banners=True),
+    'ruijie': Dialect(
+        'ruijie', separators=('!',), exit_commands=('exit', 'exit-address-family'), root_commands=('end',),
+        ignored_commands=('configure terminal', 'write', 'write memory'),
+        block_openers=_CISCO_OPENERS, nested_openers=_CISCO_NESTED, comment_prefixes=('!', '#'), banners=True),
+}
+
+def get_dialect(vendor: str) -> Dialect:
+    dialect = DIALECTS.get(vendor)
+    if dialect is None:
+        raise ValueError(f"不支持解析该厂商的配置: {vendor}")
+    return dialect
+
+def _decode(raw: bytes) -> str:
+    """设备导出的配置可能是GBK编码（中文描述），UTF-8解码失败时按GB18030解码"""
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('gb18030', 'replace')
+
+def iter_config_lines(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """逐行读取配置文件（去掉行尾换行符）"""
+    with open(path, 'rb', buffering=chunk_size) as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # 空文件或管道等无法映射的文件，按块读取
+            mapped = None
+
+        if mapped is not None:
+            with mapped:
+                readline = mapped.readline
+                while True:
+                    raw = readline()
+                    if not raw:
+                        break
+                    yield _decode(raw).rstrip('\r\n')
+            return
+
+        for raw in f:
+            yield _decode(raw).rstrip('\r\n')
+
+def detect_mode(lines: List[str], dialect: Dialect) -> str:
+    """根据开头的若干行判断构建模式
+
+    只有顶格的退出命令才说明是生成的配置（按关键字划分）；运行配置中缩进的退出命令
+    （如BGP的 exit-address-family）不作为依据。
+    """
+    indented = False
+    for line in lines:
+        text = line.strip()
+        if text in dialect.exit_commands and line[0] not in ' \t':
+            return MODE_KEYWORD
+        if text and line[0] in ' \t' and not text.startswith(dialect.comment_prefixes):
+            indented = True
+    return MODE_INDENT if indented else MODE_KEYWORD
+
+def parse_lines(lines: Iterable[str], vendor: str, mode: Optional[str] = None,
+                root: Optional[CommandNode] = None) -> CommandNode:
+    """把配置行解析为命令树；传入 root 时并入已有的树"""
+    dialect = get_dialect(vendor)
+    lines = iter(lines)
+    if mode is None:
+        head = list(islice(lines, DETECT_LINES))
+        mode = detect_mode(head, dialect)
+        lines = chain(head, lines)
+    return TreeBuilder(dialect, mode, root).feed_lines(lines)
+
+def parse_file(path: str, vendor: str, mode: Optional[str] = None) -> CommandNode:
+    """流式解析配置文件为命令树"""
+    if not os.path.exists(path):
+        raise ValueError(f"配置文件不存在: {path}")
+    return parse_lines(iter_config_lines(path), vendor, mode)
@@ -0,0 +1,61 @@
+"""
+配置段合并模块
+同一台设备的多个配置段（如 vlan_complete_config、stp_config、port_aggregation）会各自进入同一批接口。
+渲染完成后把全部配置段解析到同一棵命令树中：按视图键索引的子节点合并同一视图、去掉重复命令，
+每个视图只进入一次，合并耗时与命令总数成线性。
+
+输出顺序是确定的：命令和视图按首次出现的顺序输出（保持各配置段内的先后依赖），
+只有聚合接口提前到第一个接口视图的位置（成员端口加入前聚合接口需已存在）。
+
+合并后的输出不保留模板中的注释行；保存配置的命令（save / write memory）统一放在最后。
+同一视图后出现的命令会提前到该视图第一次出现的位置，依赖其后才创建的全局对象的命令（如VRRP联动BFD会话）
+需要设备允许先引用后创建。
+"""
+
+import re
+from typing import Iterable, List, Optional
+
+from app.command_tree import MODE_KEYWORD, CommandNode
+from app.config_delta import VENDOR_SYNTAX
+from app.running_config import get_dialect, parse_lines
+
+# 保存配置的命令，合并后只在末尾执行一次
+SAVE_COMMANDS = ('save', 'save force', 'write', 'write memory', 'copy running-config startup-config')
+
+# 聚合接口的视图键（command_key 已把接口名转为小写并去掉空格）
+_AGGREGATE_INTERFACE = re.compile(r'interface (eth-trunk|port-channel|bridge-aggregation|aggregateport|route-aggregation)')
+
+def _hoist_aggregates(root: CommandNode):
+    """把聚合接口移到第一个接口视图之前，其余命令和视图的相对顺序不变"""
+    children = root.children
+    first = next((i for i, node in enumerate(children) if node.key.startswith('interface ')), None)
+    if first is None:
+        return
+    aggregates = [node for node in children[first:] if _AGGREGATE_INTERFACE.match(node.key)]
+    if not aggregates:
+        return
+    others = [node for node in children[first:] if not _AGGREGATE_INTERFACE.match(node.key)]
+    children[first:] = aggregates + others
+
+def merge_sections(vendor: str, sections: Iterable[List[str]]) -> List[str]:
+    """合并同一设备多个配置段的命令，返回合并后的命令行"""
+    dialect = get_dialect(vendor)
+    _, enter, leave_context, leave = VENDOR_SYNTAX[vendor]
+
+    root = CommandNode()
+    save: Optional[str] = None
+    for commands in sections:
+        for line in commands:
+            text = line.strip()
+            if save is None and text in SAVE_COMMANDS:
+                save = text
+        # 每个配置段从系统视图开始解析，上一段未退出的视图不影响下一段
+        parse_lines(commands, vendor, MODE_KEYWORD, root)
+
+    if not root.children:
+        return [save] if save else []
+    _hoist_aggregates(root)
+    lines = [enter] + root.to_lines(' ', leave_context, dialect.opens_context) + [leave]
+    if save:
+        lines.append(save)
+    return lines
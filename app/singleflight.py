@@ -0,0 +1,78 @@
+"""
+请求合并模块
+相同参数的生成请求同时到达时只渲染一次，其余请求等待并共享结果；
+执行失败（异常）不会传递给等待者，等待者会重新执行，完成后立即移除记录，不缓存结果
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from app.deadline import require_remaining
+
+class _Call:
+    """一次进行中的执行"""
+
+    __slots__ = ('done', 'result', 'failed')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+class SingleFlight:
+    """按键合并并发执行（线程安全）"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+        self.retries = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """执行 fn()；同一键已有执行在进行时等待其结果
+
+        等待遵守当前请求的时间预算；先行者抛出异常时等待者自己重新执行。
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.executions += 1
+
+            if leader:
+                try:
+                    call.result = fn()
+                    return call.result
+                except BaseException:
+                    call.failed = True
+                    raise
+                finally:
+                    with self._lock:
+                        self._calls.pop(key, None)
+                    call.done.set()
+
+            # 每次等待前检查剩余预算，已用完时直接超时，不以0或负数超时反复等待
+            if not call.done.wait(require_remaining('等待相同请求')):
+                require_remaining('等待相同请求')
+                continue
+
+            with self._lock:
+                if call.failed:
+                    self.retries += 1
+                    continue
+                self.shared += 1
+            return call.result
+
+    def stats(self) -> Dict[str, int]:
+        """获取合并统计：实际执行次数、共享结果次数（节省的渲染次数）、失败后重试次数"""
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'shared': self.shared,
+                'retries': self.retries,
+                'in_flight': len(self._calls)
+            }
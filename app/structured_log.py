@@ -0,0 +1,242 @@
+"""
+结构化日志模块
+日志记录先放入内存队列（deque的append/popleft是原子操作，请求线程不加锁、不等待IO），
+由后台线程批量写入按大小和时间轮转的JSON Lines文件；
+成功的生成记录按比例采样，错误记录使用单独的队列（普通记录积压时不会挤掉错误记录），
+丢弃的条数计入统计，敏感字段脱敏，进程退出时写完队列中剩余的记录
+"""
+
+import os
+import re
+import glob
+import json
+import time
+import atexit
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# 需要脱敏的参数名（密码、密钥、团体字等）
+SENSITIVE_KEY_PATTERN = re.compile(r'(password|passwd|secret|token|community|cipher|(^|_)key$)', re.IGNORECASE)
+REDACTED = '***'
+
+def redact(value: Any) -> Any:
+    """递归脱敏：敏感参数的值替换为 ***"""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if isinstance(key, str) and SENSITIVE_KEY_PATTERN.search(key) and item not in (None, '')
+            else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+class StructuredLogger:
+    """异步缓冲的JSON Lines日志写入器（每个进程写自己的文件）"""
+
+    def __init__(self, directory: str, name: str = 'generation', max_bytes: int = 10 * 1024 * 1024,
+                 rotate_seconds: int = 86400, backup_count: int = 10, success_sample_rate: float = 1.0,
+                 flush_interval: float = 1.0, queue_size: int = 10000):
+        self.directory = directory
+        self.name = name
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.success_sample_rate = success_sample_rate
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+
+        self._queue = deque(maxlen=queue_size)
+        self._errors = deque(maxlen=queue_size)
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._file_opened_at = 0.0
+
+        self.written = 0
+        self.dropped = 0
+        self.dropped_errors = 0
+        self.sampled_out = 0
+
+    # ---- 写入端（请求线程） ----
+
+    def log(self, event: str, record: Dict[str, Any], error: bool = False, sample: bool = False):
+        """提交一条日志记录；sample=True 的成功记录按 success_sample_rate 采样，错误记录始终保留"""
+        if sample and not error and self.success_sample_rate < 1.0 and random.random() >= self.success_sample_rate:
+            self.sampled_out += 1
+            return
+
+        self._ensure_started()
+        queue = self._errors if error else self._queue
+        if len(queue) >= self.queue_size:
+            # 队列已满时丢弃同类中最旧的记录，不阻塞请求线程
+            self.dropped += 1
+            if error:
+                self.dropped_errors += 1
+        # 脱敏和序列化都放在写入线程中进行
+        queue.append((time.time(), event, 'error' if error else 'info', record))
+
+    def _ensure_started(self):
+        """启动当前进程的写入线程（fork出的新进程使用自己的队列和文件）"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # 父进程的队列和文件句柄不属于本进程
+                self._queue = deque(maxlen=self.queue_size)
+                self._errors = deque(maxlen=self.queue_size)
+                self._file = None
+            self._pid = os.getpid()
+            self._stopped = False
+            thread = threading.Thread(target=self._writer_loop, name='structured-log-writer', daemon=True)
+            thread.start()
+            atexit.register(self.close)
+
+    # ---- 后台写入 ----
+
+    def _writer_loop(self):
+        """定期把队列中的记录批量写入文件"""
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"写入结构化日志失败: {e}")
+
+    def flush(self):
+        """把队列中的记录按时间顺序写入文件"""
+        with self._write_lock:
+            if not self._queue and not self._errors:
+                return
+            records = self._drain(self._queue)
+            errors = self._drain(self._errors)
+            if errors:
+                records = sorted(records + errors, key=lambda item: item[0])
+            lines = [json.dumps({
+                'ts': datetime.fromtimestamp(timestamp).isoformat(timespec='milliseconds'),
+                'event': event,
+                'level': level,
+                'pid': self._pid,
+                **redact(record)
+            }, ensure_ascii=False, default=str) for timestamp, event, level, record in records]
+
+            stream = self._open()
+            stream.write('\n'.join(lines) + '\n')
+            stream.flush()
+            self.written += len(lines)
+
+            if stream.tell() >= self.max_bytes or time.time() - self._file_opened_at >= self.rotate_seconds:
+                self._rotate()
+
+    @staticmethod
+    def _drain(queue: deque) -> List[tuple]:
+        """取出队列中当前的全部记录（与请求线程的 append 并发安全）"""
+        items = []
+        while True:
+            try:
+                items.append(queue.popleft())
+            except IndexError:
+                return items
+
+    def _current_path(self) -> str:
+        return os.path.join(self.directory, f'{self.name}.{os.getpid()}.jsonl')
+
+    def _open(self):
+        """打开（必要时创建）当前进程的日志文件"""
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._current_path()
+            self._file = open(path, 'a', encoding='utf-8')
+            self._file_opened_at = time.time()
+        return self._file
+
+    def _rotate(self):
+        """轮转当前文件并删除超出保留数量的旧文件"""
+        self._file.close()
+        self._file = None
+        current = self._current_path()
+        # 文件名带微秒，同一秒内多次轮转也不会覆盖之前的文件
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        target = os.path.join(self.directory, f'{self.name}.{os.getpid()}.{stamp}.jsonl')
+        sequence = 0
+        while os.path.exists(target):
+            sequence += 1
+            target = os.path.join(self.directory, f'{self.name}.{os.getpid()}.{stamp}-{sequence}.jsonl')
+        os.replace(current, target)
+
+        rotated = sorted(glob.glob(os.path.join(self.directory, f'{self.name}.*.*.jsonl')), key=os.path.getmtime)
+        for path in rotated[:max(len(rotated) - self.backup_count, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        """停止写入线程并写完剩余记录（进程退出时自动调用）"""
+        if self._pid != os.getpid():
+            return
+        self._stopped = True
+        self._wakeup.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"写入结构化日志失败: {e}")
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict[str, int]:
+        """获取日志统计信息"""
+        return {
+            'queued': len(self._queue) + len(self._errors),
+            'written': self.written,
+            'dropped': self.dropped,
+            'dropped_errors': self.dropped_errors,
+            'sampled_out': self.sampled_out
+        }
+
+_logger: Optional[StructuredLogger] = None
+
+def configure_logging(app):
+    """根据应用配置创建结构化日志写入器"""
+    global _logger
+    _logger = StructuredLogger(
+        app.config.get('LOG_DIR'),
+        max_bytes=app.config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+        rotate_seconds=app.config.get('LOG_ROTATE_SECONDS', 86400),
+        backup_count=app.config.get('LOG_BACKUP_COUNT', 10),
+        success_sample_rate=app.config.get('LOG_SUCCESS_SAMPLE_RATE', 1.0),
+        flush_interval=app.config.get('LOG_FLUSH_INTERVAL', 1.0),
+        queue_size=app.config.get('LOG_QUEUE_SIZE', 10000)
+    )
+    app.extensions['structured_log'] = _logger
+
+def get_logger() -> StructuredLogger:
+    """获取结构化日志写入器，未经应用配置时使用 Config 中的默认设置"""
+    global _logger
+    if _logger is None:
+        from config import Config
+        _logger = StructuredLogger(
+            Config.LOG_DIR,
+            max_bytes=Config.LOG_MAX_BYTES,
+            rotate_seconds=Config.LOG_ROTATE_SECONDS,
+            backup_count=Config.LOG_BACKUP_COUNT,
+            success_sample_rate=Config.LOG_SUCCESS_SAMPLE_RATE,
+            flush_interval=Config.LOG_FLUSH_INTERVAL,
+            queue_size=Config.LOG_QUEUE_SIZE
+        )
+    return _logger
+
+def log_event(event: str, error: bool = False, sample: bool = False, **fields):
+    """记录一条结构化日志"""
+    get_logger().log(event, fields, error=error, sample=sample)
@@ -1,9 +1,18 @@
 import os
+import gc
+import gzip
+import json
 import yaml
+import hashlib
 import ipaddress
+import threading
 from jinja2 import Template, Environment
 from typing import Dict, List, Any, Optional
 from flask import current_app
+from app.deadline import DeadlineExceeded, check_deadline
+from app.singleflight import SingleFlight
+from app.structured_log import log_event
+from app.loop_stamping import compile_stamped, install as install_loop_stamping
 
 def cidr_to_netmask_filter(cidr_prefix):
     """将CIDR前缀长度转换为子网掩码"""
@@ -34,11 +43,48 @@ def netmask_from_cidr_filter(cidr_ip):
     except:
         return "255.255.255.0"
 
+# 配置类型的中文名称映射
+CONFIG_TYPE_NAMES = {
+    'vlan_complete_config': 'VLAN一体化配置',
+    'port_aggregation': '端口聚合',
+    'dhcp_service': 'DHCP服务',
+    'static_route': '静态路由',
+    'interface_ip': '接口IP配置',
+    'stp_config': 'STP配置',
+    'ospf_config': 'OSPF配置',
+    'vrrp_config': 'VRRP网关冗余配置'
+}
+
+def _content_hash(data: bytes) -> str:
+    """计算内容哈希，用作版本号和ETag"""
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def _render_with_deadline(template: Template, parameters: Dict[str, Any], every: int = 256) -> str:
+    """分块渲染模板（循环每输出一批内容检查一次时间预算），结果与 template.render() 相同"""
+    chunks = []
+    for index, chunk in enumerate(template.generate(**parameters)):
+        if index % every == 0:
+            check_deadline('模板渲染')
+        chunks.append(chunk)
+    return ''.join(chunks)
+
+def _dump_json_bytes(payload: Any) -> bytes:
+    """序列化为紧凑的UTF-8 JSON字节串"""
+    return json.dumps(payload, ensure_ascii=False, sort_keys=True,
+                      separators=(',', ':'), default=str).encode('utf-8')
+
 class TemplateEngine:
     """配置模板引擎"""
 
     def __init__(self, template_dir=None, supported_vendors=None):
         self.templates = {}
+        self.compiled_templates = {}
+        self.vendor_versions = {}
+        self.template_versions = {}
+        self.command_versions = {}
+        self.metadata_payloads = {}
+        self.bootstrap_version = ''
+        self.bootstrap_gzip = b''
         self.template_dir = template_dir
         self.supported_vendors = supported_vendors or ['huawei', 'h3c', 'cisco', 'ruijie']
 
@@ -47,6 +93,7 @@ class TemplateEngine:
         self.jinja_env.filters['cidr_to_netmask'] = cidr_to_netmask_filter
         self.jinja_env.filters['ip_from_cidr'] = ip_from_cidr_filter
         self.jinja_env.filters['netmask_from_cidr'] = netmask_from_cidr_filter
+        install_loop_stamping(self.jinja_env)
 
         self.load_templates()
 
@@ -61,15 +108,115 @@ class TemplateEngine:
             template_dir = self.template_dir or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config_templates')
             supported_vendors = self.supported_vendors
 
+        templates = {}
+        vendor_versions = {}
         for vendor in supported_vendors:
             template_file = os.path.join(template_dir, f'{vendor}.yaml')
             if os.path.exists(template_file):
                 try:
-                    with open(template_file, 'r', encoding='utf-8') as f:
-                        self.templates[vendor] = yaml.safe_load(f)
+                    with open(template_file, 'rb') as f:
+                        raw = f.read()
+                    templates[vendor] = yaml.safe_load(raw.decode('utf-8'))
+                    vendor_versions[vendor] = _content_hash(raw)
                 except Exception as e:
                     print(f"加载模板文件 {template_file} 失败: {e}")
-    
+
+        # 预编译所有命令模板，请求时只做渲染不再重复解析
+        # 命令模板的版本哈希只取决于 commands，修改描述、示例等不影响已生成的配置
+        compiled_templates = {}
+        command_versions = {}
+        for vendor, vendor_templates in templates.items():
+            for config_type, template_data in (vendor_templates or {}).items():
+                commands_template = template_data.get('commands', [])
+                compiled = self._compile_commands(commands_template)
+                if compiled is not None:
+                    compiled_templates[(vendor, config_type)] = compiled
+                command_versions[(vendor, config_type)] = _content_hash(_dump_json_bytes(commands_template))
+
+        template_versions, metadata_payloads = self._build_metadata(templates)
+        bootstrap_body, bootstrap_version = self._build_bootstrap(templates)
+        metadata_payloads[('bootstrap',)] = (bootstrap_body, bootstrap_version)
+        bootstrap_gzip = gzip.compress(bootstrap_body, compresslevel=9, mtime=0)
+
+        # 整体替换引用，并发读取的线程不会看到加载到一半的状态
+        self.templates = templates
+        self.compiled_templates = compiled_templates
+        self.command_versions = command_versions
+        self.vendor_versions = vendor_versions
+        self.template_versions = template_versions
+        self.metadata_payloads = metadata_payloads
+        self.bootstrap_version = bootstrap_version
+        self.bootstrap_gzip = bootstrap_gzip
+
+    def _build_metadata(self, templates):
+        """计算每个模板的版本哈希，并预先序列化元数据接口的响应体
+
+        返回 (template_versions, metadata_payloads)，后者的值为 (JSON字节串, ETag)。
+        """
+        template_versions = {}
+        metadata_payloads = {}
+        for vendor, vendor_templates in templates.items():
+            vendor_templates = vendor_templates or {}
+
+            config_types = [{'value': config_type, 'name': CONFIG_TYPE_NAMES.get(config_type, config_type)}
+                            for config_type in vendor_templates.keys()]
+            body = _dump_json_bytes({'success': True, 'config_types': config_types})
+            metadata_payloads[('config_types', vendor)] = (body, _content_hash(body))
+
+            for config_type, template_data in vendor_templates.items():
+                template_versions[(vendor, config_type)] = _content_hash(_dump_json_bytes(template_data))
+                body = _dump_json_bytes({'success': True,
+                                         'template_info': self._template_info_from_data(template_data)})
+                metadata_payloads[('template_info', vendor, config_type)] = (body, _content_hash(body))
+
+        return template_versions, metadata_payloads
+
+    def _build_bootstrap(self, templates):
+        """构建包含全部厂商、配置类型、参数定义和示例的启动文档
+
+        返回 (JSON字节串, 版本哈希)，版本哈希由文档内容计算，任一模板变化都会改变。
+        """
+        vendors = list(templates.keys())
+        config_types = {}
+        template_infos = {}
+        for vendor, vendor_templates in templates.items():
+            vendor_templates = vendor_templates or {}
+            config_types[vendor] = [{'value': config_type, 'name': CONFIG_TYPE_NAMES.get(config_type, config_type)}
+                                    for config_type in vendor_templates.keys()]
+            template_infos[vendor] = {config_type: self._template_info_from_data(template_data)
+                                      for config_type, template_data in vendor_templates.items()}
+
+        document = {
+            'success': True,
+            'vendors': vendors,
+            'config_types': config_types,
+            'templates': template_infos
+        }
+        version = _content_hash(_dump_json_bytes(document))
+        document['version'] = version
+        return _dump_json_bytes(document), version
+
+    def get_metadata_payload(self, *key):
+        """获取预序列化的元数据响应 (JSON字节串, ETag)，不存在时返回None"""
+        return self.metadata_payloads.get(key)
+
+    def _compile_commands(self, commands_template):
+        """编译命令模板，字符串格式返回单个模板，列表格式返回模板列表
+
+        端口类循环在编译时改写为渲染一次循环体后逐个端口套印（见 app/loop_stamping.py），输出不变。
+        """
+        try:
+            if isinstance(commands_template, str):
+                return self._compile_one(commands_template)
+            return [self._compile_one(cmd_template) for cmd_template in commands_template]
+        except Exception as e:
+            # 编译失败时留到渲染阶段再报告具体错误
+            print(f"预编译命令模板失败: {e}")
+            return None
+
+    def _compile_one(self, source: str) -> Template:
+        return compile_stamped(self.jinja_env, source) or self.jinja_env.from_string(source)
+
     def get_config_types(self, vendor: str) -> List[str]:
         """获取指定厂商支持的配置类型"""
         if vendor not in self.templates:
@@ -87,8 +234,9 @@ class TemplateEngine:
         
         return self.templates[vendor][config_type].get('parameters', {})
     
-    def generate_config(self, vendor: str, config_type: str, parameters: Dict[str, Any]) -> Optional[List[str]]:
-        """生成配置命令"""
+    def generate_config(self, vendor: str, config_type: str, parameters: Dict[str, Any],
+                        builder=None) -> Optional[List[str]]:
+        """生成配置命令；传入命令树构建器（app.command_tree.TreeBuilder）时，每产生一行命令即送入构建器"""
         if vendor not in self.templates:
             raise ValueError(f"不支持的厂商: {vendor}")
         
@@ -101,33 +249,45 @@ class TemplateEngine:
         if not commands_template:
             return []
         
-        # 使用Jinja2渲染命令模板
+        # 使用Jinja2渲染命令模板（优先使用加载时预编译的模板）
         rendered_commands = []
+        compiled = self.compiled_templates.get((vendor, config_type))
 
         # 处理新的多行字符串格式和旧的列表格式
         if isinstance(commands_template, str):
             # 新的多行字符串格式
             try:
-                template = self.jinja_env.from_string(commands_template)
-                rendered_cmd = template.render(**parameters)
+                template = compiled or self.jinja_env.from_string(commands_template)
+                rendered_cmd = _render_with_deadline(template, parameters)
                 if rendered_cmd.strip():
                     # 按行分割并清理空行，但保留缩进
                     lines = [line.rstrip() for line in rendered_cmd.split('\n') if line.strip()]
                     rendered_commands.extend(lines)
+                    if builder is not None:
+                        for line in lines:
+                            builder.feed(line)
+            except DeadlineExceeded:
+                raise
             except Exception as e:
-                print(f"渲染命令模板失败: {e}")
-                print(f"参数: {parameters}")
+                log_event('render_error', error=True, vendor=vendor, config_type=config_type,
+                          error_msg=str(e), parameters=parameters)
                 raise e  # 重新抛出异常以便调试
         else:
             # 旧的列表格式
-            for cmd_template in commands_template:
+            for index, cmd_template in enumerate(commands_template):
                 try:
-                    template = self.jinja_env.from_string(cmd_template)
+                    template = compiled[index] if compiled else self.jinja_env.from_string(cmd_template)
+                    check_deadline('模板渲染')
                     rendered_cmd = template.render(**parameters)
                     if rendered_cmd.strip():  # 忽略空命令
                         rendered_commands.append(rendered_cmd.strip())
+                        if builder is not None:
+                            builder.feed(rendered_cmd.strip())
+                except DeadlineExceeded:
+                    raise
                 except Exception as e:
-                    print(f"渲染命令模板失败: {e}")
+                    log_event('render_error', error=True, vendor=vendor, config_type=config_type,
+                              error_msg=str(e), command_index=index)
                     continue
 
         return rendered_commands
@@ -140,24 +300,77 @@ class TemplateEngine:
         if config_type not in self.templates[vendor]:
             return {}
         
-        template_data = self.templates[vendor][config_type]
+        return self._template_info_from_data(self.templates[vendor][config_type])
+
+    @staticmethod
+    def _template_info_from_data(template_data: Dict[str, Any]) -> Dict[str, Any]:
+        """从模板定义中提取前端需要的元数据"""
         return {
             'description': template_data.get('description', ''),
             'parameters': template_data.get('parameters', {}),
             'example': template_data.get('example', {})
         }
 
+def _copy_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    """复制 CommandNode.to_dict() 生成的嵌套结构"""
+    copied = dict(node)
+    if 'children' in copied:
+        copied['children'] = [_copy_node(child) for child in copied['children']]
+    return copied
+
 class ConfigGenerator:
     """配置生成器"""
 
     def __init__(self, template_dir=None, supported_vendors=None):
         self.template_engine = TemplateEngine(template_dir, supported_vendors)
-    
-    def generate(self, vendor: str, config_type: str, form_data: Dict[str, Any]) -> Dict[str, Any]:
+        # 合并同时到达的相同请求
+        self.flight = SingleFlight()
+
+    def generate(self, vendor: str, config_type: str, form_data: Dict[str, Any],
+                 structured: bool = False) -> Dict[str, Any]:
+        """生成配置命令（相同参数的并发请求只渲染一次）
+
+        structured 为True时结果中附带 tree：按视图嵌套的命令结构，在渲染过程中逐行构建。
+        """
+        key = self._request_key(vendor, config_type, form_data, structured)
+        if key is None:
+            return self._generate(vendor, config_type, form_data, structured)
+
+        # 合并的调用方共享同一份渲染结果，每个调用方拿到各自的副本（commands、tree 也复制，parameters 换回自己的参数），
+        # 调用方修改结果不会影响其他等待者
+        result = dict(self.flight.do(key, lambda: self._generate(vendor, config_type, form_data, structured)))
+        if 'commands' in result:
+            result['commands'] = list(result['commands'])
+        if 'tree' in result:
+            result['tree'] = [_copy_node(node) for node in result['tree']]
+        if 'parameters' in result:
+            result['parameters'] = form_data
+        return result
+
+    def _request_key(self, vendor: str, config_type: str, form_data: Dict[str, Any],
+                     structured: bool = False) -> Optional[str]:
+        """规范化请求作为合并键（参数按键排序；含模板版本，模板重新加载后不与旧请求合并）"""
+        try:
+            return json.dumps([vendor, config_type, self.template_engine.vendor_versions.get(vendor), form_data,
+                               structured],
+                              ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+        except (TypeError, ValueError):
+            return None
+
+    def _generate(self, vendor: str, config_type: str, form_data: Dict[str, Any],
+                  structured: bool = False) -> Dict[str, Any]:
         """生成配置命令"""
         try:
+            builder = None
+            if structured:
+                from app.command_tree import MODE_KEYWORD, TreeBuilder
+                from app.running_config import get_dialect
+                # 保留重复进入的视图和 system-view、save 等命令，除注释行和退出视图的命令（quit/exit/return/end，
+                # 由层级表示）外与命令列表一一对应
+                builder = TreeBuilder(get_dialect(vendor), MODE_KEYWORD, merge=False, keep_ignored=True)
+
             # 生成命令
-            commands = self.template_engine.generate_config(vendor, config_type, form_data)
+            commands = self.template_engine.generate_config(vendor, config_type, form_data, builder)
             
             if not commands:
                 return {
@@ -166,14 +379,20 @@ class ConfigGenerator:
                     'commands': []
                 }
             
-            return {
+            result = {
                 'success': True,
                 'commands': commands,
                 'vendor': vendor,
                 'config_type': config_type,
                 'parameters': form_data
             }
-            
+            if builder is not None:
+                result['tree'] = [node.to_dict() for node in builder.close().children]
+            return result
+
+        except DeadlineExceeded:
+            # 超时由调用方统一处理
+            raise
         except Exception as e:
             return {
                 'success': False,
@@ -181,6 +400,38 @@ class ConfigGenerator:
                 'commands': []
             }
     
+    def reload_templates(self):
+        """重新加载模板，版本哈希和预序列化的元数据随之更新"""
+        self.template_engine.load_templates()
+
+    def get_template_version(self, vendor: str, config_type: str) -> Optional[str]:
+        """获取指定模板的版本哈希"""
+        return self.template_engine.template_versions.get((vendor, config_type))
+
+    def get_command_version(self, vendor: str, config_type: str) -> Optional[str]:
+        """获取指定模板中命令部分的版本哈希（决定生成结果是否可能变化）"""
+        return self.template_engine.command_versions.get((vendor, config_type))
+
+    def get_vendor_version(self, vendor: str) -> Optional[str]:
+        """获取厂商模板文件的版本哈希"""
+        return self.template_engine.vendor_versions.get(vendor)
+
+    def get_metadata_payload(self, *key):
+        """获取预序列化的元数据响应 (JSON字节串, ETag)"""
+        return self.template_engine.get_metadata_payload(*key)
+
+    def get_bootstrap_version(self) -> str:
+        """获取启动文档的版本哈希"""
+        return self.template_engine.bootstrap_version
+
+    def get_bootstrap_gzip(self) -> bytes:
+        """获取预压缩（gzip）的启动文档"""
+        return self.template_engine.bootstrap_gzip
+
+    def get_coalescing_stats(self) -> Dict[str, int]:
+        """获取请求合并统计（shared 即节省的渲染次数）"""
+        return self.flight.stats()
+
     def get_supported_vendors(self) -> List[str]:
         """获取支持的厂商列表"""
         return list(self.template_engine.templates.keys())
@@ -196,3 +447,29 @@ class ConfigGenerator:
     def get_template_info(self, vendor: str, config_type: str) -> Dict[str, Any]:
         """获取模板详细信息"""
         return self.template_engine.get_template_info(vendor, config_type)
+
+# 进程内共享的配置生成器，由 create_app 预热，所有请求线程复用同一实例
+_shared_generator = None
+_shared_generator_lock = threading.Lock()
+
+def get_shared_generator(template_dir=None, supported_vendors=None) -> ConfigGenerator:
+    """获取共享的配置生成器（线程安全，整个进程只构建一次）"""
+    global _shared_generator
+    generator = _shared_generator
+    if generator is None:
+        with _shared_generator_lock:
+            # 双重检查，避免并发的首批请求各自构建一份并重复解析模板
+            if _shared_generator is None:
+                _shared_generator = ConfigGenerator(template_dir, supported_vendors)
+            generator = _shared_generator
+    return generator
+
+def freeze_shared_state():
+    """冻结当前已创建的长期对象，供预分叉（pre-fork）服务器在fork前调用
+
+    被冻结的对象不再被循环垃圾回收扫描，子进程不会因为GC写入对象头而
+    触发写时复制，模板数据所在的内存页可在多个worker之间保持共享。
+    """
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
@@ -288,20 +288,20 @@ def get_config_type_display_name(config_type: str) -> str:
     return config_names.get(config_type, config_type)
 
 def log_config_generation(vendor: str, config_type: str, parameters: Dict[str, Any], 
-                         success: bool, error_msg: str = None) -> None:
-    """记录配置生成日志"""
-    log_entry = {
-        'timestamp': format_timestamp(),
-        'vendor': vendor,
-        'config_type': config_type,
-        'parameters': parameters,
-        'success': success,
-        'error': error_msg
-    }
-    
-    # 这里可以实现实际的日志记录逻辑
-    # 例如写入文件、数据库或发送到日志服务
-    print(f"[CONFIG_LOG] {json.dumps(log_entry, ensure_ascii=False)}")
+                         success: bool, error_msg: str = None, **extra) -> None:
+    """记录配置生成日志（异步写入结构化日志文件，成功记录按比例采样，敏感参数脱敏）"""
+    from app.structured_log import log_event
+    log_event(
+        'config_generation',
+        error=not success,
+        sample=True,
+        vendor=vendor,
+        config_type=config_type,
+        parameters=parameters,
+        success=success,
+        error_msg=error_msg,
+        **extra
+    )
 
 def clean_command_output(commands: List[str]) -> List[str]:
     """清理命令输出，移除空行和多余空格"""
@@ -1,6 +1,7 @@
 import re
 import ipaddress
 from typing import Dict, List, Any, Tuple
+from app.deadline import check_deadline
 
 class ConfigValidator:
     """配置参数验证器"""
@@ -14,6 +15,7 @@ class ConfigValidator:
         # 支持批量格式
         try:
             for part in vlan_id.split(','):
+                check_deadline('参数验证')
                 part = part.strip()
                 if '-' in part:
                     # 处理范围
@@ -58,6 +60,7 @@ class ConfigValidator:
         parts = [part.strip() for part in interface.split(',')]
 
         for part in parts:
+            check_deadline('参数验证')
             if '-' in part:
                 # 首先检查是否是范围格式，如 GigabitEthernet0/0/1-4
                 match = re.match(r'^(.+?)(\d+)-(\d+)$', part)
@@ -214,6 +217,7 @@ class ConfigValidator:
 
 def validate_form_data(config_type: str, form_data: Dict[str, Any], vendor: str = None) -> Tuple[bool, List[str]]:
     """验证表单数据（支持智能输入格式）"""
+    check_deadline('参数验证')
     errors = []
 
     if config_type == 'vlan_management':
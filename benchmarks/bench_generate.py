@@ -0,0 +1,327 @@
+"""
+配置生成性能基准测试
+对 config_templates/ 中每个厂商 × 配置类型，分别以示例参数（small）、常规规模（typical）
+和极限规模（extreme，如4094个VLAN、约1000个端口、10000条路由）构造输入，
+直接调用 expand_ports、validate_form_data、process_smart_inputs 和 ConfigGenerator.generate
+分阶段计时，结果保存为JSON，并可与已保存的基线比较、标记性能回退。
+
+用法：
+    python benchmarks/bench_generate.py --output benchmarks/results.json
+    python benchmarks/bench_generate.py --sizes small,typical --vendors huawei
+    python benchmarks/bench_generate.py --compare benchmarks/baseline.json --threshold 0.2
+
+存在性能回退时退出码为1，可直接用于CI。
+"""
+
+import os
+import re
+import sys
+import copy
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.admission import PORT_FIELDS
+from app.routes import expand_ports, process_smart_inputs
+from app.template_engine import ConfigGenerator
+from app.validators import validate_form_data
+
+# 各规模下的输入数量，small 直接使用模板中的示例参数
+SIZES = {
+    'small': None,
+    'typical': {'vlans': 100, 'ports': 48, 'routes': 100, 'entries': 50, 'areas': 10, 'addresses': 20},
+    'extreme': {'vlans': 4094, 'ports': 1000, 'routes': 10000, 'entries': 1000, 'areas': 1000, 'addresses': 1000}
+}
+
+# 每块板卡的端口数，构造大端口范围时按板卡拆分
+PORTS_PER_SLOT = 48
+
+# 计时的阶段
+STAGES = ('expand_ports', 'validate', 'smart_input', 'generate')
+
+# 比较时忽略中位数低于该值（秒）的阶段，避免计时噪声被误判为回退
+NOISE_FLOOR = 0.0002
+
+def _port_range(example: str, count: int) -> str:
+    """按示例接口的命名格式构造约 count 个端口的范围，如 GigabitEthernet1/0/1-48,GigabitEthernet2/0/1-48"""
+    match = re.match(r'^([A-Za-z\- ]+)(\d+)((?:/\d+)*/)\d+', example.split(',')[0].strip())
+    if not match:
+        return example
+    name, _, path = match.groups()
+    parts = []
+    slot = 1
+    while count > 0:
+        ports = min(count, PORTS_PER_SLOT)
+        parts.append(f'{name}{slot}{path}1-{ports}')
+        count -= ports
+        slot += 1
+    return ','.join(parts)
+
+def _vlan_range(count: int) -> str:
+    """构造 count 个VLAN的范围（4094个时为 1-4094）"""
+    count = min(count, 4094)
+    start = 1 if count == 4094 else 2
+    return f'{start}-{start + count - 1}'
+
+def _address(index: int, base: int = 10) -> str:
+    """按序号构造不重复的IPv4地址前三段，如 10.0.1"""
+    return f'{base}.{index // 256 % 256}.{index % 256}'
+
+def _scale_vlan_complete_config(params: Dict[str, Any], size: Dict[str, int]):
+    params['vlan_id'] = _vlan_range(size['vlans'])
+
+def _scale_ospf_config(params: Dict[str, Any], size: Dict[str, int]):
+    dotted = '.' in params['areas'].split(':', 1)[0]
+    areas = []
+    for index in range(size['areas']):
+        area = f'0.0.{index // 256}.{index % 256}' if dotted else str(index)
+        areas.append(f'{area}:{_address(index)}.0/24')
+    params['areas'] = ','.join(areas)
+
+def _scale_dhcp_service(params: Dict[str, Any], size: Dict[str, int]):
+    params['excluded_addresses'] = ','.join(
+        f'{_address(index, 172)}.1' for index in range(size['addresses']))
+    params['relay_server_address'] = ','.join(
+        f'{_address(index, 10)}.2' for index in range(size['addresses']))
+
+def _scale_static_route(params: Dict[str, Any], size: Dict[str, int]):
+    template = params['route_entries'][0]
+    entries = []
+    for index in range(size['routes']):
+        entry = dict(template)
+        entry['destination'] = f'{_address(index)}.0'
+        entry['mask'] = '255.255.255.0'
+        entry['description'] = f'route-{index}'
+        entries.append(entry)
+    params['route_entries'] = entries
+
+def _scale_interface_ip(params: Dict[str, Any], size: Dict[str, int]):
+    template = params['interface_entries'][0]
+    entries = []
+    for index in range(size['entries']):
+        entry = dict(template)
+        entry['interface_number'] = str(index + 1)
+        entry['ip_address'] = f'{_address(index)}.1/24'
+        entry['description'] = f'interface-{index}'
+        entries.append(entry)
+    params['interface_entries'] = entries
+
+def _scale_stp_config(params: Dict[str, Any], size: Dict[str, int]):
+    params['instance_vlan_mapping'] = f"1:{_vlan_range(size['vlans'])}"
+
+# 各配置类型的参数放大方式（端口范围参数统一按 PORT_FIELDS 放大）
+SCALERS: Dict[str, Callable[[Dict[str, Any], Dict[str, int]], None]] = {
+    'vlan_complete_config': _scale_vlan_complete_config,
+    'ospf_config': _scale_ospf_config,
+    'dhcp_service': _scale_dhcp_service,
+    'static_route': _scale_static_route,
+    'interface_ip': _scale_interface_ip,
+    'stp_config': _scale_stp_config
+}
+
+# 只放大真正的接口范围参数（OSPF的接口参数是VLAN接口，不放大）
+SCALED_PORT_FIELDS = tuple(field for field in PORT_FIELDS
+                           if field not in ('interface_name', 'interface_auth_interface'))
+
+def build_parameters(config_type: str, example: Dict[str, Any], size_name: str) -> Optional[Dict[str, Any]]:
+    """按规模构造参数，该配置类型没有可放大的参数时返回None（只测 small）"""
+    params = copy.deepcopy(example)
+    if config_type == 'stp_config':
+        # 表单提交的STP开关是字符串，智能输入处理按字符串解析
+        params = {key: str(value).lower() if isinstance(value, bool) else value for key, value in params.items()}
+    elif config_type == 'dhcp_service':
+        # 示例中没有打开服务器和中继开关，不打开时只输出一行注释，地址池和中继循环都不会执行
+        params['enable_dhcp_server'] = True
+        params['enable_dhcp_relay'] = True
+        params.setdefault('relay_server_address', '10.0.0.2')
+        params.setdefault('relay_interface', params.get('vlanif') or 'Vlanif100')
+
+    size = SIZES[size_name]
+    if size is None:
+        return params
+
+    scaled = False
+    for field in SCALED_PORT_FIELDS:
+        if isinstance(params.get(field), str) and params[field]:
+            params[field] = _port_range(params[field], size['ports'])
+            scaled = True
+    scaler = SCALERS.get(config_type)
+    if scaler is not None:
+        scaler(params, size)
+        scaled = True
+    return params if scaled else None
+
+def measure(func: Callable[[], Any], min_time: float, min_runs: int, max_runs: int) -> Dict[str, Any]:
+    """重复调用直到累计耗时达到 min_time（至少 min_runs 次，至多 max_runs 次），返回耗时统计（秒）"""
+    samples = []
+    total = 0.0
+    while len(samples) < max_runs and (len(samples) < min_runs or total < min_time):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        samples.append(elapsed)
+        total += elapsed
+    samples.sort()
+    return {
+        'runs': len(samples),
+        'min': samples[0],
+        'median': statistics.median(samples),
+        'mean': statistics.mean(samples),
+        'p95': samples[min(int(len(samples) * 0.95), len(samples) - 1)],
+        'max': samples[-1]
+    }
+
+def run_case(generator: ConfigGenerator, vendor: str, config_type: str, params: Dict[str, Any],
+             min_time: float, min_runs: int, max_runs: int) -> Dict[str, Any]:
+    """对一组参数分阶段计时"""
+    port_values = [params[field] for field in PORT_FIELDS if isinstance(params.get(field), str) and params[field]]
+    processed = process_smart_inputs(config_type, vendor, params)
+    result = generator.generate(vendor, config_type, processed)
+    if not result['success']:
+        raise RuntimeError(result.get('error'))
+
+    def expand_all():
+        for value in port_values:
+            expand_ports(value)
+
+    def generate():
+        # 每次都传入新的参数对象，与线上请求一样走完整的合并键计算和渲染
+        generator.generate(vendor, config_type, dict(processed))
+
+    stages = {}
+    if port_values:
+        stages['expand_ports'] = measure(expand_all, min_time, min_runs, max_runs)
+    stages['validate'] = measure(lambda: validate_form_data(config_type, params, vendor), min_time, min_runs, max_runs)
+    stages['smart_input'] = measure(lambda: process_smart_inputs(config_type, vendor, params),
+                                    min_time, min_runs, max_runs)
+    stages['generate'] = measure(generate, min_time, min_runs, max_runs)
+    return {
+        'vendor': vendor,
+        'config_type': config_type,
+        'ports': sum(len(expand_ports(value)) for value in port_values),
+        'output_lines': len(result['commands']),
+        'stages': stages
+    }
+
+def _git_revision() -> Optional[str]:
+    """当前代码的git版本（不在git仓库中时返回None）"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(vendors: Optional[List[str]], config_types: Optional[List[str]], sizes: List[str],
+                   min_time: float, min_runs: int, max_runs: int) -> Dict[str, Any]:
+    """运行全部基准测试"""
+    generator = ConfigGenerator()
+    results = {}
+    for vendor in generator.get_supported_vendors():
+        if vendors and vendor not in vendors:
+            continue
+        for config_type in generator.get_supported_config_types(vendor):
+            if config_types and config_type not in config_types:
+                continue
+            example = generator.get_template_info(vendor, config_type).get('example') or {}
+            for size_name in sizes:
+                params = build_parameters(config_type, example, size_name)
+                if params is None:
+                    continue
+                key = f'{vendor}/{config_type}/{size_name}'
+                try:
+                    case = run_case(generator, vendor, config_type, params, min_time, min_runs, max_runs)
+                except Exception as e:
+                    print(f"基准测试 {key} 失败: {e}")
+                    results[key] = {'vendor': vendor, 'config_type': config_type, 'error': str(e)}
+                    continue
+                case['size'] = size_name
+                results[key] = case
+                timings = '  '.join(f"{name}={stats['median'] * 1000:.3f}ms"
+                                    for name, stats in case['stages'].items())
+                print(f"{key:<45} lines={case['output_lines']:<7} {timings}")
+
+    return {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'min_time': min_time,
+            'min_runs': min_runs
+        },
+        'results': results
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Tuple[str, str, float, float]]:
+    """与基线比较各阶段的中位数耗时，返回超过阈值的回退 [(用例, 阶段, 基线, 当前)]"""
+    regressions = []
+    for key, case in sorted(current['results'].items()):
+        base_case = baseline.get('results', {}).get(key)
+        if not base_case or 'stages' not in base_case or 'stages' not in case:
+            continue
+        for stage_name in STAGES:
+            base_stats = base_case['stages'].get(stage_name)
+            stats = case['stages'].get(stage_name)
+            if not base_stats or not stats:
+                continue
+            before, after = base_stats['median'], stats['median']
+            if max(before, after) < NOISE_FLOOR:
+                continue
+            if after > before * (1 + threshold):
+                regressions.append((key, stage_name, before, after))
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='配置生成性能基准测试')
+    parser.add_argument('--vendors', help='只测试指定厂商，逗号分隔')
+    parser.add_argument('--config-types', help='只测试指定配置类型，逗号分隔')
+    parser.add_argument('--sizes', default=','.join(SIZES), help='测试规模，逗号分隔（默认：%(default)s）')
+    parser.add_argument('--min-time', type=float, default=0.2, help='每个阶段的最少累计计时（秒）')
+    parser.add_argument('--min-runs', type=int, default=5, help='每个阶段的最少重复次数')
+    parser.add_argument('--max-runs', type=int, default=1000, help='每个阶段的最多重复次数')
+    parser.add_argument('--output', help='结果保存路径（JSON）')
+    parser.add_argument('--compare', help='与指定的基线结果（JSON）比较')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='中位数耗时超过基线的比例阈值，超过即视为回退（默认：%(default)s）')
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"未知的测试规模: {', '.join(unknown)}")
+
+    current = run_benchmarks(
+        args.vendors.split(',') if args.vendors else None,
+        args.config_types.split(',') if args.config_types else None,
+        sizes, args.min_time, args.min_runs, args.max_runs)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+
+    failed = [key for key, case in current['results'].items() if 'error' in case]
+    if failed:
+        print(f"{len(failed)} 个用例执行失败")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"发现 {len(regressions)} 处性能回退（阈值 {args.threshold:.0%}）:")
+            for key, stage_name, before, after in regressions:
+                print(f"  {key} {stage_name}: {before * 1000:.3f}ms -> {after * 1000:.3f}ms (+{after / before - 1:.0%})")
+            return 1
+        print('未发现性能回退')
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""
+HTTP压力测试
+通过 create_app 在本地启动应用（或指定 --url 压测已部署的服务），
+按场景文件中的权重混合请求各接口，统计每个接口的 p50/p95/p99 延迟、状态码分布和整体吞吐量。
+
+场景文件（YAML）固定了随机种子、并发数和请求数，同一场景每次生成的请求序列相同，
+可用于比较改动前后的结果，示例见 benchmarks/scenarios/mixed.yaml。
+
+用法：
+    python benchmarks/loadtest.py benchmarks/scenarios/mixed.yaml --output result.json
+    python benchmarks/loadtest.py benchmarks/scenarios/mixed.yaml --concurrency 16 --requests 5000
+    python benchmarks/loadtest.py benchmarks/scenarios/mixed.yaml --url http://127.0.0.1:5000
+"""
+
+import os
+import sys
+import math
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import http.client
+from urllib.parse import urlsplit
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# 统计的延迟分位数
+PERCENTILES = (50, 95, 99)
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法计算分位数（输入需已排序）"""
+    if not sorted_values:
+        return 0.0
+    index = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+def _weighted_choice(rng: random.Random, weights: Dict[str, float]) -> str:
+    """按权重抽取"""
+    names = list(weights)
+    return rng.choices(names, weights=[weights[name] for name in names])[0]
+
+class RequestPlan:
+    """按场景预先生成的请求序列（同一种子每次相同）"""
+
+    def __init__(self, scenario: Dict[str, Any], generator):
+        self.scenario = scenario
+        self.generator = generator
+        self.rng = random.Random(scenario.get('seed', 0))
+        # (厂商, 配置类型, 规模) -> 请求体，大规模参数构造较慢，只构造一次
+        self._bodies: Dict[Tuple[str, str, str], Optional[bytes]] = {}
+
+    def _pick_vendor(self, allowed) -> str:
+        vendors = self.generator.get_supported_vendors()
+        if allowed not in (None, 'all'):
+            vendors = [vendor for vendor in vendors if vendor in allowed]
+        return self.rng.choice(vendors)
+
+    def _pick_config_type(self, vendor: str, allowed) -> str:
+        config_types = self.generator.get_supported_config_types(vendor)
+        if allowed not in (None, 'all'):
+            config_types = [config_type for config_type in config_types if config_type in allowed]
+        return self.rng.choice(config_types)
+
+    def _generate_body(self, vendor: str, config_type: str, size: str) -> Optional[bytes]:
+        key = (vendor, config_type, size)
+        if key not in self._bodies:
+            from bench_generate import build_parameters
+            example = self.generator.get_template_info(vendor, config_type).get('example') or {}
+            parameters = build_parameters(config_type, example, size)
+            self._bodies[key] = None if parameters is None else json.dumps({
+                'vendor': vendor,
+                'config_type': config_type,
+                'parameters': parameters
+            }, ensure_ascii=False).encode('utf-8')
+        return self._bodies[key]
+
+    def _build_request(self, endpoint: Dict[str, Any]) -> Tuple[str, str, str, Optional[bytes]]:
+        """构造一个请求 (接口名, 方法, 路径, 请求体)"""
+        payload = endpoint.get('payload')
+        vendor = self._pick_vendor(payload.get('vendors') if payload else None)
+        config_type = self._pick_config_type(vendor, payload.get('config_types') if payload else None)
+        path = endpoint['path'].format(vendor=vendor, config_type=config_type)
+
+        body = None
+        if payload:
+            sizes = payload.get('sizes') or {'small': 1}
+            size = _weighted_choice(self.rng, sizes)
+            body = self._generate_body(vendor, config_type, size)
+            if body is None:
+                # 该配置类型没有可放大的参数，退回示例参数
+                body = self._generate_body(vendor, config_type, 'small')
+        elif 'json' in endpoint:
+            body = json.dumps(endpoint['json'], ensure_ascii=False).encode('utf-8')
+        return endpoint['name'], endpoint.get('method', 'GET').upper(), path, body
+
+    def build(self, count: int) -> List[Tuple[str, str, str, Optional[bytes]]]:
+        endpoints = self.scenario['endpoints']
+        weights = {endpoint['name']: endpoint.get('weight', 1) for endpoint in endpoints}
+        by_name = {endpoint['name']: endpoint for endpoint in endpoints}
+        return [self._build_request(by_name[_weighted_choice(self.rng, weights)]) for _ in range(count)]
+
+class LocalServer:
+    """在后台线程中运行 create_app 创建的应用"""
+
+    def __init__(self, overrides: Dict[str, Any]):
+        from werkzeug.serving import make_server, WSGIRequestHandler
+        from config import Config
+
+        # 配置项在创建应用时读取，需在 create_app 之前覆盖
+        for key, value in overrides.items():
+            setattr(Config, key, value)
+        from app import create_app
+        self.app = create_app()
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server('127.0.0.1', 0, self.app, threaded=True, request_handler=QuietHandler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, name='loadtest-server', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.thread.join()
+
+class LoadRunner:
+    """多线程客户端，每个线程复用一个长连接依次取出请求执行"""
+
+    def __init__(self, url: str, plan: List[Tuple[str, str, str, Optional[bytes]]], concurrency: int,
+                 warmup: int, duration: float, timeout: float = 60):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.plan = plan
+        self.concurrency = concurrency
+        self.warmup = warmup
+        self.duration = duration
+        self.timeout = timeout
+        self._next = 0
+        self._lock = threading.Lock()
+        # 接口名 -> [(延迟, 状态码)]，状态码0表示连接错误
+        self.samples: Dict[str, List[Tuple[float, int]]] = {}
+        self.started_at = None
+        self.finished_at = None
+
+    def _take(self) -> Optional[Tuple[int, Tuple[str, str, str, Optional[bytes]]]]:
+        with self._lock:
+            if self._next >= len(self.plan):
+                return None
+            if self.duration and self.started_at and time.perf_counter() - self.started_at > self.duration:
+                return None
+            index = self._next
+            self._next += 1
+            if index == self.warmup:
+                # 预热结束，开始计时
+                self.started_at = time.perf_counter()
+            return index, self.plan[index]
+
+    def _record(self, name: str, latency: float, status: int):
+        with self._lock:
+            self.samples.setdefault(name, []).append((latency, status))
+
+    def _worker(self):
+        connection = None
+        while True:
+            item = self._take()
+            if item is None:
+                break
+            index, (name, method, path, body) = item
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            started = time.perf_counter()
+            status = 0
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                connection.request(method, self.prefix + path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException) as e:
+                print(f"请求 {method} {path} 失败: {e}")
+                if connection is not None:
+                    connection.close()
+                connection = None
+            latency = time.perf_counter() - started
+            if index >= self.warmup:
+                self._record(name, latency, status)
+        if connection is not None:
+            connection.close()
+
+    def run(self):
+        if self.warmup >= len(self.plan):
+            self.started_at = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, name=f'loadtest-client-{i}')
+                   for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.finished_at = time.perf_counter()
+
+def summarize(samples: List[Tuple[float, int]], elapsed: float) -> Dict[str, Any]:
+    """汇总一组请求的延迟（毫秒）、状态码分布和吞吐量"""
+    latencies = sorted(latency for latency, _ in samples)
+    statuses: Dict[str, int] = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    summary = {
+        'requests': len(samples),
+        'throughput': len(samples) / elapsed if elapsed > 0 else 0.0,
+        'errors': sum(1 for _, status in samples if status == 0 or status >= 500),
+        'statuses': dict(sorted(statuses.items())),
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        'max_ms': latencies[-1] * 1000 if latencies else 0.0
+    }
+    for pct in PERCENTILES:
+        summary[f'p{pct}_ms'] = percentile(latencies, pct) * 1000
+    return summary
+
+def load_scenario(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        scenario = yaml.safe_load(f) or {}
+    if not scenario.get('endpoints'):
+        raise ValueError('场景文件中没有定义 endpoints')
+    for endpoint in scenario['endpoints']:
+        if 'name' not in endpoint or 'path' not in endpoint:
+            raise ValueError('每个接口都需要 name 和 path')
+    return scenario
+
+def print_report(report: Dict[str, Any]):
+    header = f"{'接口':<16}{'请求数':>8}{'吞吐(req/s)':>14}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'最大(ms)':>10}  状态码"
+    print(header)
+    rows = list(report['endpoints'].items()) + [('total', report['total'])]
+    for name, summary in rows:
+        statuses = ' '.join(f'{status}:{count}' for status, count in summary['statuses'].items())
+        print(f"{name:<16}{summary['requests']:>8}{summary['throughput']:>14.1f}{summary['p50_ms']:>10.2f}"
+              f"{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}{summary['max_ms']:>10.2f}  {statuses}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='HTTP压力测试')
+    parser.add_argument('scenario', help='场景文件（YAML）')
+    parser.add_argument('--url', help='压测已启动的服务（如 http://127.0.0.1:5000），不指定时在本地启动应用')
+    parser.add_argument('--concurrency', type=int, help='覆盖场景中的并发客户端数')
+    parser.add_argument('--requests', type=int, help='覆盖场景中的正式请求数')
+    parser.add_argument('--warmup', type=int, help='覆盖场景中的预热请求数')
+    parser.add_argument('--duration', type=float, help='覆盖场景中的最长运行时间（秒）')
+    parser.add_argument('--seed', type=int, help='覆盖场景中的随机种子')
+    parser.add_argument('--output', help='结果保存路径（JSON）')
+    args = parser.parse_args(argv)
+
+    scenario = load_scenario(args.scenario)
+    for key in ('concurrency', 'requests', 'warmup', 'duration', 'seed'):
+        if getattr(args, key) is not None:
+            scenario[key] = getattr(args, key)
+    concurrency = int(scenario.get('concurrency', 4))
+    warmup = int(scenario.get('warmup', 0))
+    requests = int(scenario.get('requests', 1000))
+    duration = float(scenario.get('duration') or 0)
+
+    # 本地启动时数据库、日志和分析结果写入临时目录，不影响 instance/
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    if not args.url:
+        for env, name in (('RESULT_STORE_PATH', 'results.db'), ('JOB_DB_PATH', 'jobs.db'),
+                          ('LOG_DIR', 'logs'), ('PROFILE_DIR', 'profiles')):
+            os.environ.setdefault(env, os.path.join(workdir, name))
+
+    from app.template_engine import ConfigGenerator
+    plan = RequestPlan(scenario, ConfigGenerator()).build(warmup + requests)
+
+    def run(url):
+        runner = LoadRunner(url, plan, concurrency, warmup, duration)
+        runner.run()
+        return runner
+
+    if args.url:
+        runner = run(args.url)
+    else:
+        with LocalServer(scenario.get('config') or {}) as server:
+            runner = run(server.url)
+
+    elapsed = runner.finished_at - runner.started_at
+    all_samples = [sample for samples in runner.samples.values() for sample in samples]
+    report = {
+        'scenario': scenario.get('name') or os.path.basename(args.scenario),
+        'seed': scenario.get('seed', 0),
+        'concurrency': concurrency,
+        'warmup': warmup,
+        'elapsed_seconds': elapsed,
+        'endpoints': {name: summarize(samples, elapsed) for name, samples in sorted(runner.samples.items())},
+        'total': summarize(all_samples, elapsed)
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+
+    return 1 if report['total']['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+交换机配置命令生成平台
+命令行入口：不启动Web服务，直接按设备清单批量生成配置
+
+用法：
+    python cli.py generate inventory.csv --output out/
+    python cli.py generate inventory.jsonl --output out/ --jobs 8 --section-timeout 10
+    python cli.py generate inventory.csv --output out/ --incremental
+    python cli.py impact inventory.csv --old-ref HEAD --diff-output impact.diff
+    python cli.py delta out/sw1.cfg running/sw1.cfg --vendor huawei --output sw1.delta
+
+清单格式（按扩展名识别，或用 --format 指定）：
+    CSV         每行一个配置段：name,vendor,config_type,<参数列>...（也可用 parameters 列写JSON对象），
+                相邻的同名设备行合并为多个配置段
+    YAML/JSON   设备列表（或 {devices: [...]}），格式同 /api/archive 的请求体
+    JSON Lines  每行一台设备
+"""
+
+import sys
+import time
+import argparse
+
+from config import Config
+
+def cmd_generate(args) -> int:
+    """按清单批量生成，每台设备一个配置文件"""
+    from app.bulk import generate_inventory
+    from app.inventory import iter_inventory
+
+    started = time.perf_counter()
+
+    def progress(completed):
+        if not args.quiet:
+            print(f"\r已完成 {completed} 台设备", end='', file=sys.stderr, flush=True)
+
+    try:
+        manifest = generate_inventory(
+            iter_inventory(args.inventory, args.format),
+            args.output,
+            jobs=args.jobs,
+            template_dir=args.template_dir or Config.TEMPLATE_DIR,
+            supported_vendors=Config.SUPPORTED_VENDORS,
+            section_timeout=args.section_timeout,
+            batch_size=args.batch_size,
+            incremental=args.incremental,
+            merge_sections=args.merge_sections,
+            progress=progress
+        )
+    except (OSError, ValueError) as e:
+        print(f"批量生成失败: {e}", file=sys.stderr)
+        return 2
+
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"共 {manifest['device_count']} 台设备，生成 {manifest['file_count']} 个文件，"
+          f"{manifest['error_count']} 个配置段失败，耗时 {time.perf_counter() - started:.1f}s，输出目录: {args.output}")
+    if args.incremental:
+        print(f"增量生成：重新生成 {manifest['generated_count']} 台，沿用 {manifest['unchanged_count']} 台，"
+              f"删除 {len(manifest['removed'])} 个已移除设备的输出")
+        if manifest['changed_templates']:
+            print(f"变化的模板: {', '.join(manifest['changed_templates'])}")
+    for entry in manifest['devices']:
+        for error in entry['errors']:
+            details = '；'.join(error.get('details') or [])
+            print(f"  {entry['name']} {error['config_type']}: {error['error']}" + (f"（{details}）" if details else ''))
+    return 1 if manifest['error_count'] else 0
+
+def cmd_impact(args) -> int:
+    """分析模板改动对设备清单输出的影响"""
+    import json
+    from app.impact import analyse_impact, export_templates_at_ref, cleanup_exported, format_diff
+    from app.inventory import iter_inventory
+
+    new_dir = args.template_dir or Config.TEMPLATE_DIR
+    started = time.perf_counter()
+    exported = None
+    try:
+        if args.old_ref:
+            exported = old_dir = export_templates_at_ref(args.old_ref, Config.TEMPLATE_DIR)
+        else:
+            old_dir = args.old_templates
+        report = analyse_impact(
+            iter_inventory(args.inventory, args.format),
+            old_dir,
+            new_dir,
+            supported_vendors=Config.SUPPORTED_VENDORS,
+            jobs=args.jobs,
+            batch_size=args.batch_size,
+            context_lines=args.context
+        )
+    except (OSError, ValueError) as e:
+        print(f"影响分析失败: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if exported:
+            cleanup_exported(exported)
+
+    diff = format_diff(report)
+    if args.diff_output:
+        with open(args.diff_output, 'w', encoding='utf-8') as f:
+            f.write(diff)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if not report['changed_templates']:
+        print(f"命令模板没有变化，{report['device_count']} 台设备的输出均不受影响")
+        return 0
+
+    print(f"变化的模板: {', '.join(report['changed_templates'])}")
+    print(f"共 {report['device_count']} 台设备，{report['affected_count']} 台使用了变化的模板，"
+          f"{report['changed_count']} 台输出有变化，耗时 {time.perf_counter() - started:.1f}s")
+    for key, stats in report['templates'].items():
+        print(f"  {key}: {stats['changed']}/{stats['devices']} 台输出有变化")
+    for entry in report['devices']:
+        if entry['changed']:
+            changed = ', '.join(section['config_type'] for section in entry['sections'] if section['status'] == 'changed')
+            print(f"  [变化] {entry['name']} ({entry['vendor']}): {changed}")
+    if args.show_diff and diff:
+        print(diff, end='')
+    return 1 if args.fail_on_change and report['changed_count'] else 0
+
+def cmd_delta(args) -> int:
+    """比较生成的配置与设备运行配置，输出需要下发的增量命令"""
+    import json
+    from app.config_delta import compute_delta
+    from app.running_config import iter_config_lines
+
+    started = time.perf_counter()
+    try:
+        delta = compute_delta(iter_config_lines(args.generated), args.running, args.vendor,
+                              replace=args.replace, running_mode=args.running_mode)
+    except (OSError, ValueError) as e:
+        print(f"增量比较失败: {e}", file=sys.stderr)
+        return 2
+
+    text = '\n'.join(delta['commands']) + ('\n' if delta['commands'] else '')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text, end='')
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({key: delta[key] for key in ('added', 'removed', 'sections')}, f, ensure_ascii=False, indent=2)
+
+    print(f"{len(delta['sections'])} 个视图需要变更，新增 {delta['added']} 条、取消 {delta['removed']} 条命令，"
+          f"耗时 {(time.perf_counter() - started) * 1000:.1f}ms", file=sys.stderr)
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='交换机配置命令生成（命令行）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help='按设备清单批量生成配置')
+    generate.add_argument('inventory', help='设备清单文件（CSV、YAML、JSON 或 JSON Lines）')
+    generate.add_argument('--output', '-o', required=True, help='输出目录')
+    generate.add_argument('--format', choices=('csv', 'yaml', 'jsonl', 'json'), help='清单格式（默认按扩展名识别）')
+    generate.add_argument('--jobs', '-j', type=int, help='并行进程数（默认：CPU核数）')
+    generate.add_argument('--template-dir', help='模板目录（默认使用 config_templates/）')
+    generate.add_argument('--section-timeout', type=float, help='每个配置段的时间预算（秒），默认不限时')
+    generate.add_argument('--batch-size', type=int, default=64, help='每个进程任务包含的设备数（默认：%(default)s）')
+    generate.add_argument('--incremental', action='store_true',
+                          help='按输出目录中上次的 manifest.json 只重新生成输入或所用模板有变化的设备')
+    generate.add_argument('--merge-sections', action='store_true',
+                          help='合并同一设备的多个配置段，每个接口等视图只进入一次')
+    generate.add_argument('--quiet', '-q', action='store_true', help='不输出进度')
+    generate.set_defaults(handler=cmd_generate)
+
+    impact = subparsers.add_parser('impact', help='分析模板改动对设备清单输出的影响')
+    impact.add_argument('inventory', help='设备清单文件（CSV、YAML、JSON 或 JSON Lines）')
+    old = impact.add_mutually_exclusive_group(required=True)
+    old.add_argument('--old-ref', help='改动前的git版本（如 HEAD、origin/main），从中读取模板目录')
+    old.add_argument('--old-templates', help='改动前的模板目录')
+    impact.add_argument('--template-dir', help='改动后的模板目录（默认使用 config_templates/）')
+    impact.add_argument('--format', choices=('csv', 'yaml', 'jsonl', 'json'), help='清单格式（默认按扩展名识别）')
+    impact.add_argument('--jobs', '-j', type=int, help='并行进程数（默认：CPU核数）')
+    impact.add_argument('--batch-size', type=int, default=64, help='每个进程任务包含的设备数（默认：%(default)s）')
+    impact.add_argument('--context', type=int, default=3, help='diff上下文行数（默认：%(default)s）')
+    impact.add_argument('--diff-output', help='把全部差异写入文件（统一diff格式）')
+    impact.add_argument('--report', help='把分析报告写入文件（JSON）')
+    impact.add_argument('--show-diff', action='store_true', help='在终端输出差异')
+    impact.add_argument('--fail-on-change', action='store_true', help='存在输出变化的设备时退出码为1')
+    impact.set_defaults(handler=cmd_impact)
+
+    delta = subparsers.add_parser('delta', help='比较生成的配置与设备运行配置，输出增量命令')
+    delta.add_argument('generated', help='生成的配置文件（generate 的输出）')
+    delta.add_argument('running', help='保存的设备运行配置文件')
+    delta.add_argument('--vendor', required=True, choices=Config.SUPPORTED_VENDORS, help='设备厂商')
+    delta.add_argument('--replace', action='store_true', help='取消生成配置涉及的视图中多出的命令')
+    delta.add_argument('--running-mode', choices=('indent', 'keyword'),
+                       help='运行配置的视图划分方式（默认按文件内容判断）')
+    delta.add_argument('--output', '-o', help='把增量命令写入文件（默认输出到终端）')
+    delta.add_argument('--report', help='把各视图的变更统计写入文件（JSON）')
+    delta.set_defaults(handler=cmd_delta)
+
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,20 @@ class Config:
     # 模板文件路径
     TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config_templates')
     
+    # 生成结果存储（SQLite文件）及其容量上限（压缩后字节数），超出后淘汰最久未访问的结果
+    RESULT_STORE_PATH = os.environ.get('RESULT_STORE_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'results.db')
+    RESULT_STORE_MAX_BYTES = 64 * 1024 * 1024
+
+    # 异步任务队列（SQLite文件）、每个进程的渲染线程数、设备租约时间（秒，每个配置段开始前续租，
+    # 超时未续租的设备会被重新领取，应大于单个配置段的时间预算 REQUEST_DEADLINE_SECONDS）、
+    # 任务结束后记录的保留时间（秒）、过期清理间隔（秒）和空闲时的最长轮询间隔（秒，提交任务会立即唤醒渲染线程）
+    JOB_DB_PATH = os.environ.get('JOB_DB_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'jobs.db')
+    JOB_WORKERS = 2
+    JOB_LEASE_SECONDS = 30
+    JOB_TTL_SECONDS = 24 * 3600
+    JOB_CLEANUP_INTERVAL = 300
+    JOB_MAX_POLL_INTERVAL = 5
+
     # 支持的厂商列表
     SUPPORTED_VENDORS = ['huawei', 'h3c', 'ruijie', 'cisco']
     
@@ -20,5 +34,60 @@ class Config:
         'interface_ip'
     ]
     
+    # 结构化日志：每个进程写入 LOG_DIR 下自己的JSON Lines文件，超过 LOG_MAX_BYTES 或 LOG_ROTATE_SECONDS 秒后轮转，
+    # 保留最近 LOG_BACKUP_COUNT 个轮转文件；成功的生成记录按 LOG_SUCCESS_SAMPLE_RATE 采样，失败记录全部保留
+    LOG_DIR = os.environ.get('LOG_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'logs')
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_ROTATE_SECONDS = 24 * 3600
+    LOG_BACKUP_COUNT = 10
+    LOG_SUCCESS_SAMPLE_RATE = 0.1
+    LOG_FLUSH_INTERVAL = 1.0
+    LOG_QUEUE_SIZE = 10000
+
+    # 在响应头 Server-Timing 中返回本次请求各阶段（端口展开、验证、智能处理、渲染等）的耗时
+    SERVER_TIMING_ENABLED = True
+
+    # 采样性能分析：按 PROFILE_SAMPLE_RATE 的比例对生成请求启用cProfile（0表示只在管理员请求头 X-Profile: 1 时分析），
+    # 结果保存在 PROFILE_DIR，最多保留 PROFILE_MAX_KEPT 个
+    PROFILE_SAMPLE_RATE = 0
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'profiles')
+    PROFILE_MAX_KEPT = 50
+
+    # 内存跟踪（调试用，有明显开销）：基于tracemalloc记录生成请求各阶段的内存分配和峰值，
+    # 报告通过 /admin/memory 查看，每个进程保留最近 MEMORY_REPORTS_KEPT 份
+    MEMORY_TRACKING_ENABLED = os.environ.get('MEMORY_TRACKING_ENABLED') == '1'
+    MEMORY_TRACKING_FRAMES = 1
+    MEMORY_TRACKING_TOP = 10
+    MEMORY_REPORTS_KEPT = 50
+
+    # 管理接口（/admin/...）令牌，通过请求头 X-Admin-Token 提供；未设置时管理接口默认拒绝访问，
+    # ADMIN_ALLOW_LOCAL=1 时允许本机回环地址（127.0.0.1/::1）无令牌访问（与调试模式无关）
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    ADMIN_ALLOW_LOCAL = os.environ.get('ADMIN_ALLOW_LOCAL') == '1'
+
+    # 单次生成的时间预算（秒），从获准执行时开始计算（不含准入排队的等待时间），超时后立即停止端口展开、
+    # 验证和渲染并返回超时错误；批量归档和异步任务按配置段分别计算。设为0表示不限时
+    REQUEST_DEADLINE_SECONDS = 10
+
+    # 每个进程处理请求的线程数（gunicorn.conf.py 的 threads 读取此项）
+    SERVER_THREADS = 4
+
+    # 准入控制：估算开销（展开后的端口数、VLAN数等）达到阈值的请求视为高开销请求，
+    # 每个进程最多同时处理 ADMISSION_MAX_CONCURRENT 个，最多排队 ADMISSION_MAX_QUEUE 个，
+    # 排队已满或等待超过 ADMISSION_QUEUE_TIMEOUT 秒时返回429，并提示 ADMISSION_RETRY_AFTER 秒后重试。
+    # 排队的请求占用处理线程，执行和排队的高开销请求合计必须少于 SERVER_THREADS，至少留一个线程给普通请求；
+    # ADMISSION_MAX_QUEUE 为None时取 SERVER_THREADS - ADMISSION_MAX_CONCURRENT - 1，超出时启动报错
+    ADMISSION_COST_THRESHOLD = 500
+    ADMISSION_MAX_CONCURRENT = 1
+    ADMISSION_MAX_QUEUE = None
+    ADMISSION_QUEUE_TIMEOUT = 10
+    ADMISSION_RETRY_AFTER = 5
+
+    # 元数据接口（配置类型/模板信息）的浏览器缓存时间（秒），过期后通过ETag重新验证
+    METADATA_CACHE_MAX_AGE = 60
+
+    # 带版本号的启动文档（/api/bootstrap?v=<版本>）缓存时间（秒）
+    BOOTSTRAP_CACHE_MAX_AGE = 31536000
+
     # 调试模式
     DEBUG = True
@@ -0,0 +1,23 @@
+# gunicorn.conf.py
+# 生产环境Gunicorn配置，启动方式：gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+
+from config import Config
+
+bind = "127.0.0.1:8000"
+workers = multiprocessing.cpu_count() * 2 + 1
+worker_class = "gthread"
+threads = Config.SERVER_THREADS
+timeout = 30
+keepalive = 2
+max_requests = 1000
+max_requests_jitter = 100
+
+# 在主进程中导入 wsgi:app，模板只加载一次，fork后由各worker共享
+preload_app = True
+
+
+def post_fork(server, worker):
+    """worker启动后立即启动任务线程，继续处理重启前未完成的任务"""
+    from app.jobs import start_job_workers
+    start_job_workers(worker.app.wsgi())
@@ -6,6 +6,10 @@
 let currentVendor = '';
 let currentConfigType = '';
 
+// 启动文档（全部厂商/配置类型/参数定义）在浏览器中的缓存键
+const BOOTSTRAP_STORAGE_KEY = 'switchConfigBootstrap';
+let bootstrapPromise = null;
+
 // DOM加载完成后执行
 document.addEventListener('DOMContentLoaded', function() {
     initializeApp();
@@ -158,31 +162,98 @@ function handleFormReset() {
 }
 
 /**
- * 获取配置类型
+ * 获取页面中声明的启动文档版本号
  */
-async function fetchConfigTypes(vendor) {
-    const response = await fetch(`/api/config_types/${vendor}`);
+function getBootstrapVersion() {
+    const meta = document.querySelector('meta[name="bootstrap-version"]');
+    return meta ? meta.content : '';
+}
+
+/**
+ * 从本地存储读取与当前版本一致的启动文档
+ */
+function readCachedBootstrap(version) {
+    if (!version) {
+        return null;
+    }
+    try {
+        const raw = localStorage.getItem(BOOTSTRAP_STORAGE_KEY);
+        if (raw) {
+            const data = JSON.parse(raw);
+            if (data && data.version === version) {
+                return data;
+            }
+        }
+    } catch (error) {
+        console.warn('读取本地元数据缓存失败:', error);
+    }
+    return null;
+}
+
+/**
+ * 将启动文档写入本地存储
+ */
+function writeCachedBootstrap(data) {
+    try {
+        localStorage.setItem(BOOTSTRAP_STORAGE_KEY, JSON.stringify(data));
+    } catch (error) {
+        console.warn('写入本地元数据缓存失败:', error);
+    }
+}
+
+/**
+ * 加载启动文档：版本未变时直接使用本地缓存，否则请求一次 /api/bootstrap
+ */
+function loadBootstrap() {
+    if (!bootstrapPromise) {
+        bootstrapPromise = fetchBootstrap().catch(error => {
+            bootstrapPromise = null;
+            throw error;
+        });
+    }
+    return bootstrapPromise;
+}
+
+async function fetchBootstrap() {
+    const version = getBootstrapVersion();
+    const cached = readCachedBootstrap(version);
+    if (cached) {
+        return cached;
+    }
+
+    const url = version ? `/api/bootstrap?v=${encodeURIComponent(version)}` : '/api/bootstrap';
+    const response = await fetch(url);
     const data = await response.json();
-    
+
     if (!data.success) {
-        throw new Error(data.error || '获取配置类型失败');
+        throw new Error(data.error || '获取元数据失败');
     }
-    
-    return data.config_types;
+
+    writeCachedBootstrap(data);
+    return data;
+}
+
+/**
+ * 获取配置类型
+ */
+async function fetchConfigTypes(vendor) {
+    const data = await loadBootstrap();
+    return data.config_types[vendor] || [];
 }
 
 /**
  * 获取模板信息
  */
 async function fetchTemplateInfo(vendor, configType) {
-    const response = await fetch(`/api/template_info/${vendor}/${configType}`);
-    const data = await response.json();
-    
-    if (!data.success) {
-        throw new Error(data.error || '获取模板信息失败');
+    const data = await loadBootstrap();
+    const vendorTemplates = data.templates[vendor] || {};
+    const templateInfo = vendorTemplates[configType];
+
+    if (!templateInfo) {
+        throw new Error('获取模板信息失败');
     }
-    
-    return data.template_info;
+
+    return templateInfo;
 }
 
 /**
@@ -0,0 +1,96 @@
+"""
+准入队列检查
+gthread worker 中排队的高开销请求会阻塞处理线程。本工具按 config.py 的 SERVER_THREADS 建立同样大小的线程池，
+先用高开销请求占满执行槽位和等待队列（再多的高开销请求应立即被拒绝），然后确认普通请求仍能在空闲线程中得到处理。
+
+用法：
+    python tools/admission_check.py
+    python tools/admission_check.py --threads 8 --max-concurrent 2
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from config import Config
+from app.admission import AdmissionController, AdmissionRejected, queue_limit
+
+EXPENSIVE = 1000
+CHEAP = 1
+
+def check(threads: int, max_concurrent: int, max_queue: int, wait: float = 2.0) -> List[str]:
+    """模拟 threads 个处理线程，返回发现的问题（为空表示通过）"""
+    controller = AdmissionController(cost_threshold=EXPENSIVE, max_concurrent=max_concurrent,
+                                     max_queue=max_queue, queue_timeout=wait * 5)
+    finish = threading.Event()
+    problems = []
+
+    def request(cost: int) -> str:
+        try:
+            ticket = controller.admit(cost)
+        except AdmissionRejected:
+            return 'rejected'
+        with ticket:
+            if cost >= EXPENSIVE:
+                finish.wait()
+        return 'served'
+
+    pool = ThreadPoolExecutor(max_workers=threads)
+    try:
+        # 占满执行槽位和等待队列
+        busy = [pool.submit(request, EXPENSIVE) for _ in range(max_concurrent + max_queue)]
+        deadline = time.monotonic() + wait
+        while controller.stats()['waiting'] < max_queue and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if controller.stats()['waiting'] < max_queue:
+            problems.append(f"等待队列没有占满: {controller.stats()}")
+
+        extra = pool.submit(request, EXPENSIVE)
+        cheap = pool.submit(request, CHEAP)
+        started = time.monotonic()
+        try:
+            outcome = extra.result(timeout=wait)
+            if outcome != 'rejected':
+                problems.append(f'队列已满时高开销请求没有被拒绝: {outcome}')
+            cheap.result(timeout=wait)
+        except Exception:
+            problems.append(f'队列已满时请求 {wait} 秒内没有得到处理（高开销请求占满了 {threads} 个处理线程）')
+        else:
+            print(f'队列已满时普通请求在 {(time.monotonic() - started) * 1000:.1f}ms 内完成')
+    finally:
+        finish.set()
+        pool.shutdown(wait=True)
+    if not problems and not all(future.result() == 'served' for future in busy):
+        problems.append('排队的高开销请求没有全部完成')
+    return problems
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='准入队列检查')
+    parser.add_argument('--threads', type=int, default=Config.SERVER_THREADS, help='每个进程的处理线程数')
+    parser.add_argument('--max-concurrent', type=int, default=Config.ADMISSION_MAX_CONCURRENT,
+                        help='高开销请求的最大并发数')
+    parser.add_argument('--max-queue', type=int, default=Config.ADMISSION_MAX_QUEUE,
+                        help='高开销请求的最大排队数（默认按线程数计算）')
+    args = parser.parse_args(argv)
+
+    max_queue = args.max_queue
+    if max_queue is None:
+        max_queue = queue_limit(args.threads, args.max_concurrent)
+    print(f'线程数 {args.threads}，高开销请求并发 {args.max_concurrent}，排队 {max_queue}')
+    problems = check(args.threads, args.max_concurrent, max_queue)
+    for problem in problems:
+        print(f'[失败] {problem}')
+    if problems:
+        return 1
+    print('[通过] 高开销请求占满队列时普通请求仍能得到处理')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
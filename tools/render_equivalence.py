@@ -0,0 +1,253 @@
+"""
+渲染等价性检查
+优化模板引擎、端口展开或VLAN格式化时，生成的命令必须与优化前逐行一致。
+
+record 用当前代码为每个厂商 × 配置类型生成金标准语料（tools/golden/<厂商>/<配置类型>.json），
+用例包括模板的 example、逐个翻转开关参数、逐个切换选项参数、常规规模的放大输入，
+以及按固定种子随机组合的输入；check 用候选引擎重新生成并与语料逐行比较，
+多进程并行执行，每个不一致的用例报告第一处差异。
+
+用法：
+    python tools/render_equivalence.py record
+    python tools/render_equivalence.py check
+    python tools/render_equivalence.py check --engine mypkg.engine:FastGenerator --jobs 8
+
+修改模板或有意改变输出后，需要重新 record 并在提交中说明输出变化。
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+from typing import Any, Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, 'benchmarks'))
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+
+DEFAULT_ENGINE = 'app.template_engine:ConfigGenerator'
+
+# 每个模板按固定种子生成的随机组合用例数
+RANDOM_CASES = 5
+
+# 切换选项时一并补充的参数（示例中没有、但切换后的分支需要）
+OPTION_FILLERS = {
+    'allowed_vlans': '10,20,30-40'
+}
+
+def _stringify_switches(config_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """STP的开关参数在表单中以字符串提交，智能输入处理按字符串解析"""
+    if config_type != 'stp_config':
+        return params
+    return {key: str(value).lower() if isinstance(value, bool) else value for key, value in params.items()}
+
+def _switch_values(config_type: str, value: bool):
+    return str(value).lower() if config_type == 'stp_config' else value
+
+def build_cases(generator, vendor: str, config_type: str) -> List[Dict[str, Any]]:
+    """为一个模板构造用例 [{name, parameters}]"""
+    from bench_generate import build_parameters
+
+    example = generator.get_template_info(vendor, config_type).get('example') or {}
+    definitions = generator.get_template_parameters(vendor, config_type) or {}
+    base = _stringify_switches(config_type, dict(example))
+    cases = [{'name': 'example', 'parameters': base}]
+
+    # 逐个翻转开关参数
+    switches = []
+    for key, definition in definitions.items():
+        if definition.get('type') != 'boolean':
+            continue
+        current = example.get(key, definition.get('default', False))
+        if not isinstance(current, bool):
+            continue
+        switches.append(key)
+        params = dict(base)
+        params[key] = _switch_values(config_type, not current)
+        cases.append({'name': f'flip:{key}', 'parameters': params})
+
+    # 逐个切换选项参数
+    options = {key: definition['options'] for key, definition in definitions.items() if definition.get('options')}
+    for key, values in options.items():
+        for value in values:
+            if value == example.get(key):
+                continue
+            params = dict(base)
+            params[key] = value
+            for filler, filler_value in OPTION_FILLERS.items():
+                if filler in definitions and filler not in params:
+                    params[filler] = filler_value
+            cases.append({'name': f'option:{key}={value}', 'parameters': params})
+
+    # 常规规模的放大输入（端口范围、VLAN列表、路由条目等）
+    scaled = build_parameters(config_type, example, 'typical')
+    if scaled is not None:
+        cases.append({'name': 'size:typical', 'parameters': scaled})
+
+    # 固定种子的随机组合（字符串种子在不同进程和版本间保持一致）
+    rng = random.Random(f'{vendor}/{config_type}')
+    for index in range(RANDOM_CASES):
+        params = dict(scaled if scaled is not None and rng.random() < 0.3 else base)
+        for key in switches:
+            if rng.random() < 0.5:
+                params[key] = _switch_values(config_type, rng.random() < 0.5)
+        for key, values in options.items():
+            if rng.random() < 0.5:
+                params[key] = rng.choice(values)
+                for filler, filler_value in OPTION_FILLERS.items():
+                    if filler in definitions and filler not in params:
+                        params[filler] = filler_value
+        cases.append({'name': f'random:{index}', 'parameters': params})
+
+    return cases
+
+# 工作进程内的生成器，由 _init_worker 创建
+_generator = None
+
+def load_engine(spec: str, template_dir: Optional[str] = None):
+    """按 模块:属性 加载候选引擎并创建实例，需提供与 ConfigGenerator 相同的 generate 接口"""
+    module_name, _, attr = spec.partition(':')
+    factory = getattr(import_module(module_name), attr or 'ConfigGenerator')
+    return factory(template_dir) if template_dir else factory()
+
+def _init_worker(spec: str, template_dir: Optional[str]):
+    global _generator
+    _generator = load_engine(spec, template_dir)
+
+def render_case(generator, vendor: str, config_type: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """按线上流程（智能输入处理 + 生成）渲染一个用例，返回 {commands} 或 {error}"""
+    from app.routes import process_smart_inputs
+
+    try:
+        processed = process_smart_inputs(config_type, vendor, dict(parameters))
+        result = generator.generate(vendor, config_type, processed)
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}'}
+    if not result.get('success'):
+        return {'error': result.get('error') or ''}
+    return {'commands': list(result['commands'])}
+
+def _render_cases(task: Tuple[str, str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    vendor, config_type, cases = task
+    return [render_case(_generator, vendor, config_type, case['parameters']) for case in cases]
+
+def first_divergence(expected: Dict[str, Any], actual: Dict[str, Any]) -> Optional[str]:
+    """返回第一处差异的说明，一致时返回None"""
+    if 'error' in expected or 'error' in actual:
+        if expected.get('error') == actual.get('error') and 'commands' not in actual:
+            return None
+        return f"期望: {expected.get('error', '生成成功')}\n    实际: {actual.get('error', '生成成功')}"
+
+    expected_lines, actual_lines = expected['commands'], actual['commands']
+    for line_no, (want, got) in enumerate(zip(expected_lines, actual_lines), 1):
+        if want != got:
+            return f'第{line_no}行不一致\n    期望: {want!r}\n    实际: {got!r}'
+    if len(expected_lines) != len(actual_lines):
+        line_no = min(len(expected_lines), len(actual_lines)) + 1
+        want = expected_lines[line_no - 1] if len(expected_lines) >= line_no else '<结束>'
+        got = actual_lines[line_no - 1] if len(actual_lines) >= line_no else '<结束>'
+        return (f'行数不一致（期望{len(expected_lines)}行，实际{len(actual_lines)}行），第{line_no}行起不同\n'
+                f'    期望: {want!r}\n    实际: {got!r}')
+    return None
+
+def golden_path(golden_dir: str, vendor: str, config_type: str) -> str:
+    return os.path.join(golden_dir, vendor, f'{config_type}.json')
+
+def _select(generator, vendors: Optional[List[str]], config_types: Optional[List[str]]) -> List[Tuple[str, str]]:
+    selected = []
+    for vendor in generator.get_supported_vendors():
+        if vendors and vendor not in vendors:
+            continue
+        for config_type in generator.get_supported_config_types(vendor):
+            if config_types and config_type not in config_types:
+                continue
+            selected.append((vendor, config_type))
+    return selected
+
+def _run_parallel(tasks: List[Tuple[str, str, List[Dict[str, Any]]]], engine: str,
+                  template_dir: Optional[str], jobs: Optional[int]) -> List[List[Dict[str, Any]]]:
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(engine, template_dir)) as pool:
+        return list(pool.map(_render_cases, tasks))
+
+def record(args) -> int:
+    """用当前引擎生成金标准语料"""
+    from app.template_engine import ConfigGenerator
+
+    generator = ConfigGenerator(args.template_dir) if args.template_dir else ConfigGenerator()
+    selected = _select(generator, args.vendors, args.config_types)
+    tasks = [(vendor, config_type, build_cases(generator, vendor, config_type)) for vendor, config_type in selected]
+    outputs = _run_parallel(tasks, args.engine, args.template_dir, args.jobs)
+
+    total = 0
+    for (vendor, config_type, cases), results in zip(tasks, outputs):
+        path = golden_path(args.golden, vendor, config_type)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'vendor': vendor,
+                'config_type': config_type,
+                'cases': [dict(case, **result) for case, result in zip(cases, results)]
+            }, f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write('\n')
+        total += len(cases)
+    print(f"已生成 {len(tasks)} 个模板共 {total} 个用例的金标准语料: {args.golden}")
+    return 0
+
+def check(args) -> int:
+    """用候选引擎重新生成并与金标准语料比较"""
+    tasks = []
+    goldens = []
+    for vendor in sorted(os.listdir(args.golden)) if os.path.isdir(args.golden) else []:
+        if args.vendors and vendor not in args.vendors:
+            continue
+        vendor_dir = os.path.join(args.golden, vendor)
+        for name in sorted(os.listdir(vendor_dir)):
+            config_type = name[:-len('.json')]
+            if not name.endswith('.json') or (args.config_types and config_type not in args.config_types):
+                continue
+            with open(os.path.join(vendor_dir, name), 'r', encoding='utf-8') as f:
+                golden = json.load(f)
+            tasks.append((vendor, config_type, golden['cases']))
+            goldens.append(golden)
+
+    if not tasks:
+        print(f"没有找到金标准语料，请先运行 record: {args.golden}")
+        return 2
+
+    outputs = _run_parallel(tasks, args.engine, args.template_dir, args.jobs)
+
+    total = diverged = 0
+    for (vendor, config_type, cases), results in zip(tasks, outputs):
+        for case, actual in zip(cases, results):
+            total += 1
+            message = first_divergence(case, actual)
+            if message is not None:
+                diverged += 1
+                print(f"[不一致] {vendor}/{config_type}#{case['name']}: {message}")
+
+    if diverged:
+        print(f"{total} 个用例中有 {diverged} 个输出不一致")
+        return 1
+    print(f"{total} 个用例输出全部一致")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='渲染等价性检查')
+    parser.add_argument('command', choices=('record', 'check'), help='record：生成金标准语料；check：与语料比较')
+    parser.add_argument('--engine', default=DEFAULT_ENGINE, help='候选引擎，格式 模块:类（默认：%(default)s）')
+    parser.add_argument('--template-dir', help='模板目录（默认使用 config_templates/）')
+    parser.add_argument('--golden', default=GOLDEN_DIR, help='金标准语料目录（默认：tools/golden）')
+    parser.add_argument('--vendors', type=lambda value: value.split(','), help='只处理指定厂商，逗号分隔')
+    parser.add_argument('--config-types', type=lambda value: value.split(','), help='只处理指定配置类型，逗号分隔')
+    parser.add_argument('--jobs', type=int, help='并行进程数（默认：CPU核数）')
+    args = parser.parse_args(argv)
+
+    return record(args) if args.command == 'record' else check(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+命令结构检查
+运行配置解析、配置段合并、增量下发和结构化输出都依赖厂商方言划分视图；
+方言漏掉某个视图的开始命令时，该视图的子命令会被当作系统视图下的命令，输出仍然“看起来正常”。
+本工具逐项检查这些模块在典型输入和金标准语料（tools/golden）上的结构，任一检查失败时返回非0。
+
+用法：
+    python tools/structure_check.py
+    python tools/structure_check.py --checks parser_nesting
+"""
+
+import os
+import sys
+import argparse
+from typing import Callable, Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+class CheckFailed(Exception):
+    """检查未通过"""
+
+def expect(condition: bool, message: str):
+    if not condition:
+        raise CheckFailed(message)
+
+# 检查名称 -> (说明, 检查函数)，按注册顺序执行
+CHECKS: Dict[str, tuple] = {}
+
+def register(name: str, description: str):
+    def decorator(func: Callable[[], None]):
+        CHECKS[name] = (description, func)
+        return func
+    return decorator
+
+BFD_TEMPLATE_RUNNING = """#
+bfd
+#
+bfd-template vrrp-bfd
+ min-tx-interval {interval}
+ min-rx-interval {interval}
+ detect-multiplier 3
+#
+interface Vlanif100
+ vrrp vrid 1 virtual-ip 192.168.100.254
+ vrrp vrid 1 track bfd-template vrrp-bfd reduced 10
+#
+nqa test-instance nqa-test-uplink
+ test-type icmp
+#
+return
+"""
+
+@register('parser_nesting', 'bfd-template 等视图的子命令解析到视图之下（华为/H3C）')
+def check_parser_nesting():
+    from app.running_config import parse_lines
+
+    for vendor in ('huawei', 'h3c'):
+        tree = parse_lines(BFD_TEMPLATE_RUNNING.format(interval=100).splitlines(), vendor)
+        template = tree.find('bfd-template vrrp-bfd')
+        expect(template is not None, f'{vendor}: 没有解析出 bfd-template 视图')
+        expect([child.text for child in template] == ['min-tx-interval 100', 'min-rx-interval 100',
+                                                     'detect-multiplier 3'],
+               f'{vendor}: bfd-template 的子命令不正确: {[child.text for child in template]}')
+        expect(tree.find('min-tx-interval 100') is None, f'{vendor}: min-tx-interval 出现在系统视图下')
+        nqa = tree.find('nqa test-instance nqa-test-uplink')
+        expect(nqa is not None and nqa.find('test-type icmp') is not None,
+               f'{vendor}: nqa test-instance 视图不完整')
+
+        # 生成的配置（quit 退出视图）同样嵌套，且没有多余的退出命令
+        from app.command_tree import MODE_KEYWORD, TreeBuilder
+        from app.running_config import get_dialect
+        builder = TreeBuilder(get_dialect(vendor), MODE_KEYWORD)
+        builder.feed_lines(['bfd-template vrrp-bfd', 'min-tx-interval 100', 'quit',
+                            'nqa test-instance nqa-test-uplink', 'test-type icmp', 'quit'])
+        expect(builder.stray_exits == 0, f'{vendor}: 生成的配置中有 {builder.stray_exits} 个退出命令落在系统视图')
+        expect(builder.root.find('bfd-template vrrp-bfd').find('min-tx-interval 100') is not None,
+               f'{vendor}: 生成的 bfd-template 子命令没有嵌套')
+
+def _golden_cases():
+    """逐个返回金标准语料中生成成功的用例 (厂商, 配置类型, 用例)"""
+    import json
+    golden_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+    for vendor in sorted(os.listdir(golden_dir)):
+        for name in sorted(os.listdir(os.path.join(golden_dir, vendor))):
+            if not name.endswith('.json'):
+                continue
+            with open(os.path.join(golden_dir, vendor, name), 'r', encoding='utf-8') as f:
+                golden = json.load(f)
+            for case in golden['cases']:
+                if case.get('commands'):
+                    yield vendor, golden['config_type'], case
+
+def _stray_exits(vendor: str, commands: List[str]) -> int:
+    from app.command_tree import MODE_KEYWORD, TreeBuilder
+    from app.running_config import get_dialect
+    builder = TreeBuilder(get_dialect(vendor), MODE_KEYWORD)
+    builder.feed_lines(commands)
+    return builder.stray_exits
+
+@register('golden_exits', '金标准语料的每个用例中，退出命令都对应一个已识别的视图')
+def check_golden_exits():
+    problems = [f"{vendor}/{config_type}#{case['name']}" for vendor, config_type, case in _golden_cases()
+                if _stray_exits(vendor, case['commands'])]
+    expect(not problems, f"以下用例有落在系统视图的退出命令（方言缺少视图的开始命令）: {', '.join(problems[:10])}")
+
+@register('merge_sections', '同一设备的全部配置段合并后，每个视图都正确退出')
+def check_merge_sections():
+    from app.section_merge import merge_sections
+
+    # 每个厂商把各配置类型中命令最多的用例作为同一台设备的配置段合并
+    largest: Dict[tuple, List[str]] = {}
+    for vendor, config_type, case in _golden_cases():
+        if len(case['commands']) > len(largest.get((vendor, config_type), [])):
+            largest[(vendor, config_type)] = case['commands']
+    devices: Dict[str, List[List[str]]] = {}
+    for (vendor, _), commands in sorted(largest.items()):
+        devices.setdefault(vendor, []).append(commands)
+
+    for vendor, sections in devices.items():
+        merged = merge_sections(vendor, sections)
+        stray = _stray_exits(vendor, merged)
+        expect(stray == 0, f'{vendor}: 合并结果中有 {stray} 个退出命令落在系统视图')
+
+    # 华为VRRP动态BFD：bfd-template 视图退出后才进入NQA视图
+    cases = [case for vendor, config_type, case in _golden_cases()
+             if vendor == 'huawei' and config_type == 'vrrp_config'
+             and case['parameters'].get('configure_dynamic_bfd') and any(
+                 line.startswith('bfd-template') for line in case['commands'])]
+    expect(cases, 'huawei: 金标准语料中没有启用动态BFD的 vrrp_config 用例')
+    for case in cases:
+        merged = merge_sections('huawei', [case['commands']])
+        start = next(i for i, line in enumerate(merged) if line.startswith('bfd-template'))
+        end = next(i for i in range(start + 1, len(merged)) if not merged[i].startswith(' '))
+        expect(merged[end - 1] == ' quit', f"huawei/vrrp_config#{case['name']}: bfd-template 视图没有退出")
+
+@register('delta_bfd_template', 'bfd-template 参数变化时，增量命令在 bfd-template 视图内下发')
+def check_delta_bfd_template():
+    import tempfile
+    from app.config_delta import compute_delta
+    from app.running_config import parse_lines
+
+    with tempfile.TemporaryDirectory() as directory:
+        running_path = os.path.join(directory, 'running.cfg')
+        with open(running_path, 'w', encoding='utf-8') as f:
+            f.write(BFD_TEMPLATE_RUNNING.format(interval=100))
+        for vendor in ('huawei', 'h3c'):
+            # 期望的配置同样是运行配置格式（缩进划分视图），只有 bfd-template 的收发间隔不同
+            desired = parse_lines(BFD_TEMPLATE_RUNNING.format(interval=300).splitlines(), vendor)
+            generated = ['system-view'] + desired.to_lines(' ', 'quit') + ['return']
+            for replace in (False, True):
+                delta = compute_delta(generated, running_path, vendor, replace=replace)
+                commands = delta['commands']
+                expected = ['system-view', 'bfd-template vrrp-bfd']
+                if replace:
+                    expected += [' undo min-rx-interval 100', ' undo min-tx-interval 100']
+                expected += [' min-tx-interval 300', ' min-rx-interval 300', ' quit', 'return']
+                expect(commands == expected, f'{vendor} replace={replace}: 增量命令不正确: {commands}')
+                expect([section['context'] for section in delta['sections']] == ['bfd-template vrrp-bfd'],
+                       f"{vendor} replace={replace}: 变更的视图不正确: {delta['sections']}")
+
+@register('generate_tree', '华为VRRP启用动态BFD时，tree/NDJSON 输出中 bfd-template 的参数嵌套在视图之下')
+def check_generate_tree():
+    import json
+    from app import create_app
+
+    parameters = next(case['parameters'] for vendor, config_type, case in _golden_cases()
+                      if vendor == 'huawei' and config_type == 'vrrp_config'
+                      and case['name'] == 'flip:configure_dynamic_bfd')
+    parameters = dict(parameters, dynamic_bfd_template='vrrp-bfd')
+    client = create_app().test_client()
+
+    def check_nodes(output: str, nodes: List[dict]):
+        template = next((node for node in nodes if node['command'].startswith('bfd-template')), None)
+        expect(template is not None, f'{output}: 没有 bfd-template 节点')
+        children = [child['command'] for child in template.get('children', [])]
+        expect('min-tx-interval 100' in children, f'{output}: bfd-template 的子节点不正确: {children}')
+        misplaced = [node['command'] for node in nodes
+                     if node['command'].split()[0] in ('min-tx-interval', 'min-rx-interval', 'detect-multiplier')]
+        expect(not misplaced, f'{output}: 以下命令成为顶层节点: {misplaced}')
+
+    response = client.post('/api/generate', json={'vendor': 'huawei', 'config_type': 'vrrp_config',
+                                                  'parameters': parameters, 'output': 'tree'})
+    result = response.get_json()
+    expect(result.get('success'), f"tree: 生成失败: {result.get('error')}")
+    check_nodes('tree', result['tree'])
+
+    response = client.post('/api/generate', json={'vendor': 'huawei', 'config_type': 'vrrp_config',
+                                                  'parameters': parameters, 'output': 'ndjson'})
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    expect(records and records[0]['type'] == 'summary', f'ndjson: 首行不是概要: {records[:1]}')
+    check_nodes('ndjson', [record for record in records if record['type'] == 'node'])
+
+def run(names: Optional[List[str]] = None) -> int:
+    failed = 0
+    for name, (description, func) in CHECKS.items():
+        if names and name not in names:
+            continue
+        try:
+            func()
+        except CheckFailed as e:
+            failed += 1
+            print(f"[失败] {name}（{description}）: {e}")
+        else:
+            print(f"[通过] {name}（{description}）")
+    if failed:
+        print(f"{failed} 项检查未通过")
+        return 1
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='命令结构检查')
+    parser.add_argument('--checks', type=lambda value: value.split(','),
+                        help=f"只运行指定的检查，逗号分隔（可选：{', '.join(CHECKS)}）")
+    args = parser.parse_args(argv)
+    return run(args.checks)
+
+if __name__ == '__main__':
+    sys.exit(main())
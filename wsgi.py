@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+交换机配置命令生成Web平台
+生产环境入口文件
+
+配合预分叉（pre-fork）WSGI服务器使用，例如：
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+应用在主进程中创建，模板在fork之前全部加载并编译，随后冻结这些长期对象，
+各个worker通过写时复制共享同一份模板内存。
+"""
+
+from app import create_app
+from app.template_engine import freeze_shared_state
+
+# 创建Flask应用实例（同时预热配置生成器）
+app = create_app()
+
+# 冻结已加载的长期对象，避免worker中的GC触碰共享内存页
+freeze_shared_state()